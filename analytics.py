@@ -0,0 +1,291 @@
+import argparse
+import time
+
+import pandas as pd
+
+import cache
+from transcript import GRADE_POINTS, SEMESTER_ORDER
+
+# Dean-level dashboards read only from the rollup tables of migration 8, so
+# their cost depends on the number of departments, courses and rooms, not on
+# the size of takes:
+#   dept_term_enrollment  enrollments per department and term    (takes/course triggers)
+#   course_grade_counts   grade histogram per course and term     (takes triggers)
+#   dept_salary_stats     instructor count and salary per dept    (instructor triggers)
+#   room_utilization      sections, booked minutes, seats filled  (refresh(), on a schedule)
+# Section fill rates come straight from section_seats, which the enrollment
+# engine already keeps current. rebuild() recomputes everything, e.g. after
+# a reseed with triggers off.
+ROLLUP_TABLES = ["dept_term_enrollment", "course_grade_counts", "dept_salary_stats", "room_utilization"]
+
+ENROLLMENT_SELECT = """
+    SELECT c.dept_name, t.semester, t.year, COUNT(*)
+    FROM takes t
+    JOIN course c ON c.course_id = t.course_id
+    WHERE c.dept_name IS NOT NULL
+    GROUP BY c.dept_name, t.semester, t.year
+"""
+
+GRADE_COUNTS_SELECT = """
+    SELECT course_id, semester, year, TRIM(grade), COUNT(*)
+    FROM takes
+    WHERE grade IS NOT NULL
+    GROUP BY course_id, semester, year, TRIM(grade)
+"""
+
+SALARY_STATS_SELECT = """
+    SELECT dept_name, COUNT(*), COUNT(salary), COALESCE(SUM(salary), 0), MIN(salary), MAX(salary)
+    FROM instructor
+    GROUP BY dept_name
+"""
+
+ROOM_UTILIZATION_COLUMNS = """
+    building, room_number, semester, year, capacity, sections, weekly_minutes, seats_filled
+"""
+
+ROOM_UTILIZATION_SELECT = """
+    SELECT s.building, s.room_number, s.semester, s.year, MAX(c.capacity), COUNT(*),
+           COALESCE(SUM(m.minutes), 0), COALESCE(SUM(ss.enrolled), 0)
+    FROM section s
+    JOIN classroom c ON c.building = s.building AND c.room_number = s.room_number
+    LEFT JOIN section_seats ss
+        ON (ss.course_id, ss.sec_id, ss.semester, ss.year) = (s.course_id, s.sec_id, s.semester, s.year)
+    LEFT JOIN LATERAL (
+        SELECT SUM((ts.end_hour * 60 + ts.end_minute) - (ts.start_hour * 60 + ts.start_minute)) AS minutes
+        FROM time_slot ts
+        WHERE ts.time_slot_id = s.time_slot_id
+    ) m ON true
+    {where}
+    GROUP BY s.building, s.room_number, s.semester, s.year
+"""
+
+# Stored rollup rows next to the query that recomputes them, for drift()
+_CHECKS = {
+    "dept_term_enrollment": (
+        "SELECT dept_name, semester, year, enrollments FROM dept_term_enrollment WHERE enrollments <> 0",
+        ENROLLMENT_SELECT,
+    ),
+    "course_grade_counts": (
+        "SELECT course_id, semester, year, grade, students FROM course_grade_counts WHERE students <> 0",
+        GRADE_COUNTS_SELECT,
+    ),
+    "dept_salary_stats": (
+        """SELECT dept_name, instructors, salaried, total_salary, min_salary, max_salary
+           FROM dept_salary_stats""",
+        SALARY_STATS_SELECT,
+    ),
+}
+
+
+def term_label(semester, year):
+    return f"{year} {semester}"
+
+
+def _term_rank(semester, year):
+    return year * 10 + SEMESTER_ORDER.get(semester, 9)
+
+
+# Recompute room_utilization for the given (semester, year) terms, or for
+# every term (caller commits)
+def refresh_room_utilization(conn, terms=None):
+    with conn.cursor() as cursor:
+        if terms is None:
+            cursor.execute("DELETE FROM room_utilization")
+            cursor.execute(f"""
+                INSERT INTO room_utilization ({ROOM_UTILIZATION_COLUMNS})
+                {ROOM_UTILIZATION_SELECT.format(where="")}
+            """)
+            return
+        semesters, years = (list(column) for column in zip(*sorted(set(terms))))
+        cursor.execute("""
+            DELETE FROM room_utilization
+            WHERE (semester, year) IN (SELECT * FROM unnest(%s::VARCHAR[], %s::INT[]))
+        """, (semesters, years))
+        where = "WHERE (s.semester, s.year) IN (SELECT * FROM unnest(%s::VARCHAR[], %s::INT[]))"
+        cursor.execute(f"""
+            INSERT INTO room_utilization ({ROOM_UTILIZATION_COLUMNS})
+            {ROOM_UTILIZATION_SELECT.format(where=where)}
+        """, (semesters, years))
+
+
+# The scheduled part of the rollups (cron, or the dashboard's refresh button)
+def refresh(conn, terms=None):
+    try:
+        refresh_room_utilization(conn, terms)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    cache.invalidate("analytics")
+
+
+# Recompute every rollup from the base tables inside the caller's
+# transaction. The exclusive locks hold back trigger updates from concurrent
+# writers until the rebuilt rows are committed, so none are lost.
+def rebuild(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {', '.join(ROLLUP_TABLES)} IN EXCLUSIVE MODE")
+        cursor.execute("DELETE FROM dept_term_enrollment")
+        cursor.execute(f"INSERT INTO dept_term_enrollment (dept_name, semester, year, enrollments) {ENROLLMENT_SELECT}")
+        cursor.execute("DELETE FROM course_grade_counts")
+        cursor.execute(f"INSERT INTO course_grade_counts (course_id, semester, year, grade, students) "
+                       f"{GRADE_COUNTS_SELECT}")
+        cursor.execute("DELETE FROM dept_salary_stats")
+        cursor.execute(f"""
+            INSERT INTO dept_salary_stats (dept_name, instructors, salaried, total_salary, min_salary, max_salary)
+            {SALARY_STATS_SELECT}
+        """)
+    refresh_room_utilization(conn)
+
+
+# {rollup table: number of rows that differ from a fresh aggregate} for the
+# trigger-maintained rollups
+def drift(conn):
+    found = {}
+    with conn.cursor() as cursor:
+        for table, (stored, fresh) in _CHECKS.items():
+            cursor.execute(f"""
+                SELECT COUNT(*) FROM (
+                    ({stored} EXCEPT {fresh})
+                    UNION ALL
+                    ({fresh} EXCEPT {stored})
+                ) differing
+            """)
+            found[table] = cursor.fetchone()[0]
+    conn.rollback()
+    return found
+
+
+# Dashboard readers. Writes through the app announce takes, course and
+# instructor changes; refresh() announces "analytics".
+
+# Enrollments per term (rows, calendar order) and department (columns)
+@cache.cached("takes", "course", "analytics")
+def enrollment_by_department(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT dept_name, semester, year, enrollments FROM dept_term_enrollment WHERE enrollments > 0
+        """)
+        rows = pd.DataFrame(cursor.fetchall(), columns=["dept_name", "semester", "year", "enrollments"])
+    if rows.empty:
+        return pd.DataFrame()
+    terms = sorted({(semester, year) for semester, year in zip(rows["semester"], rows["year"])},
+                   key=lambda term: _term_rank(*term))
+    rows["term"] = [term_label(semester, year) for semester, year in zip(rows["semester"], rows["year"])]
+    table = rows.pivot_table(index="term", columns="dept_name", values="enrollments", aggfunc="sum", fill_value=0)
+    return table.reindex([term_label(*term) for term in terms])
+
+
+# Students per grade of one course, over all its terms or one term, in
+# grade order (grades outside GRADE_POINTS last)
+@cache.cached("takes", "analytics")
+def grade_distribution(conn, course_id, semester=None, year=None):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT grade, SUM(students)
+            FROM course_grade_counts
+            WHERE course_id = %s AND (%s::VARCHAR IS NULL OR (semester = %s AND year = %s))
+            GROUP BY grade
+            HAVING SUM(students) > 0
+        """, (course_id, semester, semester, year))
+        counts = dict(cursor.fetchall())
+    order = [grade for grade in GRADE_POINTS if grade in counts] + sorted(set(counts) - set(GRADE_POINTS))
+    return pd.Series([int(counts[grade]) for grade in order], index=order, name="students", dtype="int64")
+
+
+# Instructor count and average, lowest and highest salary per department
+@cache.cached("instructor", "analytics")
+def salary_stats(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT dept_name, instructors, total_salary::NUMERIC / NULLIF(salaried, 0), min_salary, max_salary
+            FROM dept_salary_stats
+            WHERE instructors > 0
+            ORDER BY dept_name
+        """)
+        rows = cursor.fetchall()
+    table = pd.DataFrame(rows, columns=["dept_name", "instructors", "average_salary", "min_salary", "max_salary"])
+    table["average_salary"] = table["average_salary"].astype("float64").round(2)
+    return table
+
+
+# Per room of one term: sections, weekly hours booked and seat fill, as of
+# the last refresh
+@cache.cached("analytics")
+def room_utilization(conn, semester, year):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT building, room_number, capacity, sections, weekly_minutes, seats_filled, refreshed_at
+            FROM room_utilization
+            WHERE semester = %s AND year = %s
+            ORDER BY building, room_number
+        """, (semester, year))
+        rows = cursor.fetchall()
+    table = pd.DataFrame(rows, columns=["building", "room_number", "capacity", "sections", "weekly_minutes",
+                                        "seats_filled", "refreshed_at"])
+    seats_offered = table["capacity"] * table["sections"]
+    table["weekly_hours"] = (table["weekly_minutes"] / 60).round(1)
+    table["fill_rate"] = (table["seats_filled"] / seats_offered).where(seats_offered > 0).round(3)
+    return table.drop(columns="weekly_minutes")
+
+
+# Seats taken per section of one term, fullest first
+@cache.cached("takes", "section", "analytics")
+def section_fill_rates(conn, semester, year):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT course_id, sec_id, capacity, enrolled
+            FROM section_seats
+            WHERE semester = %s AND year = %s
+        """, (semester, year))
+        table = pd.DataFrame(cursor.fetchall(), columns=["course_id", "sec_id", "capacity", "enrolled"])
+    table["fill_rate"] = (table["enrolled"] / table["capacity"]).where(table["capacity"] > 0).round(3)
+    return table.sort_values(["fill_rate", "course_id", "sec_id"], ascending=[False, True, True],
+                             ignore_index=True)
+
+
+# Terms that have sections, latest first
+@cache.cached("section")
+def terms(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT DISTINCT semester, year FROM section")
+        return sorted(cursor.fetchall(), key=lambda term: _term_rank(*term), reverse=True)
+
+
+# python analytics.py refresh                    (e.g. hourly from cron)
+# python analytics.py refresh --term Fall 2024
+# python analytics.py check
+# python analytics.py rebuild
+def main(argv=None):
+    import db
+
+    parser = argparse.ArgumentParser(description="Maintain the analytics rollup tables.")
+    parser.add_argument("command", choices=["refresh", "check", "rebuild"])
+    parser.add_argument("--term", nargs=2, metavar=("SEMESTER", "YEAR"), help="refresh one term only")
+    args = parser.parse_args(argv)
+
+    conn = db.connect()
+    try:
+        started = time.perf_counter()
+        if args.command == "refresh":
+            terms_to_refresh = [(args.term[0], int(args.term[1]))] if args.term else None
+            refresh(conn, terms_to_refresh)
+            print(f"Refreshed room utilization in {time.perf_counter() - started:.2f}s")
+        elif args.command == "check":
+            for table, differing in drift(conn).items():
+                print(f"{table}: {differing} row(s) off")
+        else:
+            try:
+                rebuild(conn)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            cache.invalidate("analytics")
+            print(f"Rebuilt {', '.join(ROLLUP_TABLES)} in {time.perf_counter() - started:.2f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
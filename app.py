@@ -1,978 +1,1319 @@
-import streamlit as st
-import psycopg2
-import pandas as pd
-from streamlit_option_menu import option_menu
-
-# Database connection
-def connect_db():
-    try:
-        conn = psycopg2.connect(
-            dbname="assignment",
-            user="postgres",
-            password="1513",
-            host="localhost"
-        )
-        conn.autocommit = False
-        return conn
-    except Exception as e:
-        st.error("Error connecting to the database.")
-        return None
-
-
-# Migration - Create tables if they don't exist
-def create_tables(conn):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(""" 
-            CREATE TABLE IF NOT EXISTS classroom (
-                building VARCHAR(50),
-                room_number VARCHAR(10),
-                capacity INT,
-                PRIMARY KEY (building, room_number)
-            );
-
-            CREATE TABLE IF NOT EXISTS department (
-                dept_name VARCHAR(50),
-                building VARCHAR(50),
-                budget INT,
-                PRIMARY KEY (dept_name)
-            );
-
-            CREATE TABLE IF NOT EXISTS course (
-                course_id VARCHAR(10),
-                title VARCHAR(100),
-                dept_name VARCHAR(50),
-                credits INT,
-                PRIMARY KEY (course_id),
-                FOREIGN KEY (dept_name) REFERENCES department(dept_name)
-            );
-
-            CREATE TABLE instructor (
-                ID INT PRIMARY KEY,
-                name VARCHAR(50) NOT NULL,
-                dept_name VARCHAR(50) NOT NULL,
-                salary INT CHECK (salary >= 0),
-                FOREIGN KEY (dept_name) REFERENCES department(dept_name) ON DELETE CASCADE
-            );
-
-
-            CREATE TABLE IF NOT EXISTS section (
-                course_id VARCHAR(10),
-                sec_id VARCHAR(10),
-                semester VARCHAR(10),
-                year INT,
-                building VARCHAR(50),
-                room_number VARCHAR(10),
-                time_slot_id VARCHAR(5),
-                PRIMARY KEY (course_id, sec_id, semester, year),
-                FOREIGN KEY (course_id) REFERENCES course(course_id),
-                FOREIGN KEY (building, room_number) REFERENCES classroom(building, room_number)
-            );
-
-            CREATE TABLE IF NOT EXISTS teaches (
-                ID INT,
-                course_id VARCHAR(10),
-                sec_id VARCHAR(10),
-                semester VARCHAR(10),
-                year INT,
-                PRIMARY KEY (ID, course_id, sec_id, semester, year),
-                FOREIGN KEY (ID) REFERENCES instructor(ID),
-                FOREIGN KEY (course_id, sec_id, semester, year) REFERENCES section(course_id, sec_id, semester, year)
-            );
-
-            CREATE TABLE IF NOT EXISTS student (
-                ID VARCHAR(10),
-                name VARCHAR(50),
-                dept_name VARCHAR(50),
-                tot_cred INT,
-                PRIMARY KEY (ID),
-                FOREIGN KEY (dept_name) REFERENCES department(dept_name)
-            );
-
-            CREATE TABLE IF NOT EXISTS takes (
-                ID VARCHAR(10),
-                course_id VARCHAR(10),
-                sec_id VARCHAR(10),
-                semester VARCHAR(10),
-                year INT,
-                grade CHAR(2),
-                PRIMARY KEY (ID, course_id, sec_id, semester, year),
-                FOREIGN KEY (ID) REFERENCES student(ID),
-                FOREIGN KEY (course_id, sec_id, semester, year) REFERENCES section(course_id, sec_id, semester, year)
-            );
-
-            CREATE TABLE IF NOT EXISTS advisor (
-                s_ID VARCHAR(10),
-                i_ID INT,
-                PRIMARY KEY (s_ID),
-                FOREIGN KEY (s_ID) REFERENCES student(ID),
-                FOREIGN KEY (i_ID) REFERENCES instructor(ID)
-            );
-
-            CREATE TABLE time_slot (
-    time_slot_id VARCHAR(5),
-    day VARCHAR(1),
-    start_hour INT,
-    start_minute INT,
-    end_hour INT,
-    end_minute INT,
-    PRIMARY KEY (time_slot_id, day, start_hour, start_minute)
-);
-
-            CREATE TABLE IF NOT EXISTS prereq (
-                course_id VARCHAR(10),
-                prereq_id VARCHAR(10),
-                PRIMARY KEY (course_id, prereq_id),
-                FOREIGN KEY (course_id) REFERENCES course(course_id),
-                FOREIGN KEY (prereq_id) REFERENCES course(course_id)
-            );
-            """)
-            conn.commit()
-            st.success("Tables created successfully.")
-    except Exception as e:
-        st.error(f"Error creating tables: {e}")
-
-# Seed data
-def seed_data(conn):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                -- Delete existing data
-                DELETE FROM prereq;
-                DELETE FROM time_slot;
-                DELETE FROM advisor;
-                DELETE FROM takes;
-                DELETE FROM student;
-                DELETE FROM teaches;
-                DELETE FROM section;
-                DELETE FROM instructor;
-                DELETE FROM course;
-                DELETE FROM department;
-                DELETE FROM classroom;
-
-                -- Insert Classroom data
-                INSERT INTO classroom VALUES 
-                    ('Packard', '101', '500'),
-                    ('Painter', '514', '10'),
-                    ('Taylor', '3128', '70'),
-                    ('Watson', '100', '30'),
-                    ('Watson', '120', '50');
-
-                -- Insert Department data
-                INSERT INTO department VALUES 
-                    ('Biology', 'Watson', '90000'),
-                    ('Comp. Sci.', 'Taylor', '100000'),
-                    ('Elec. Eng.', 'Taylor', '85000'),
-                    ('Finance', 'Painter', '120000'),
-                    ('History', 'Painter', '50000'),
-                    ('Music', 'Packard', '80000'),
-                    ('Physics', 'Watson', '70000');
-
-                -- Insert Course data
-                INSERT INTO course VALUES 
-                    ('BIO-101', 'Intro. to Biology', 'Biology', '4'),
-                    ('BIO-301', 'Genetics', 'Biology', '4'),
-                    ('BIO-399', 'Computational Biology', 'Biology', '3'),
-                    ('CS-101', 'Intro. to Computer Science', 'Comp. Sci.', '4'),
-                    ('CS-190', 'Game Design', 'Comp. Sci.', '4'),
-                    ('CS-315', 'Robotics', 'Comp. Sci.', '3'),
-                    ('CS-319', 'Image Processing', 'Comp. Sci.', '3'),
-                    ('CS-347', 'Database System Concepts', 'Comp. Sci.', '3'),
-                    ('EE-181', 'Intro. to Digital Systems', 'Elec. Eng.', '3'),
-                    ('FIN-201', 'Investment Banking', 'Finance', '3'),
-                    ('HIS-351', 'World History', 'History', '3'),
-                    ('MU-199', 'Music Video Production', 'Music', '3'),
-                    ('PHY-101', 'Physical Principles', 'Physics', '4');
-
-                -- Insert Instructor data
-                INSERT INTO instructor VALUES 
-                    ('10101', 'Srinivasan', 'Comp. Sci.', '65000'),
-                    ('12121', 'Wu', 'Finance', '90000'),
-                    ('15151', 'Mozart', 'Music', '40000'),
-                    ('22222', 'Einstein', 'Physics', '95000'),
-                    ('32343', 'El Said', 'History', '60000'),
-                    ('33456', 'Gold', 'Physics', '87000'),
-                    ('45565', 'Katz', 'Comp. Sci.', '75000'),
-                    ('58583', 'Califieri', 'History', '62000'),
-                    ('76543', 'Singh', 'Finance', '80000'),
-                    ('76766', 'Crick', 'Biology', '72000'),
-                    ('83821', 'Brandt', 'Comp. Sci.', '92000'),
-                    ('98345', 'Kim', 'Elec. Eng.', '80000');
-
-                -- Insert Section data
-                INSERT INTO section VALUES 
-                    ('BIO-101', '1', 'Summer', '2017', 'Painter', '514', 'B'),
-                    ('BIO-301', '1', 'Summer', '2018', 'Painter', '514', 'A'),
-                    ('CS-101', '1', 'Fall', '2017', 'Packard', '101', 'H'),
-                    ('CS-101', '1', 'Spring', '2018', 'Packard', '101', 'F'),
-                    ('CS-190', '1', 'Spring', '2017', 'Taylor', '3128', 'E'),
-                    ('CS-190', '2', 'Spring', '2017', 'Taylor', '3128', 'A'),
-                    ('CS-315', '1', 'Spring', '2018', 'Watson', '120', 'D'),
-                    ('CS-319', '1', 'Spring', '2018', 'Watson', '100', 'B'),
-                    ('CS-319', '2', 'Spring', '2018', 'Taylor', '3128', 'C'),
-                    ('CS-347', '1', 'Fall', '2017', 'Taylor', '3128', 'A'),
-                    ('EE-181', '1', 'Spring', '2017', 'Taylor', '3128', 'C'),
-                    ('FIN-201', '1', 'Spring', '2018', 'Packard', '101', 'B'),
-                    ('HIS-351', '1', 'Spring', '2018', 'Painter', '514', 'C'),
-                    ('MU-199', '1', 'Spring', '2018', 'Packard', '101', 'D'),
-                    ('PHY-101', '1', 'Fall', '2017', 'Watson', '100', 'A');
-
-                -- Insert Teaches data
-                INSERT INTO teaches VALUES 
-                    ('10101', 'CS-101', '1', 'Fall', '2017'),
-                    ('10101', 'CS-315', '1', 'Spring', '2018'),
-                    ('10101', 'CS-347', '1', 'Fall', '2017'),
-                    ('12121', 'FIN-201', '1', 'Spring', '2018'),
-                    ('15151', 'MU-199', '1', 'Spring', '2018'),
-                    ('22222', 'PHY-101', '1', 'Fall', '2017'),
-                    ('32343', 'HIS-351', '1', 'Spring', '2018'),
-                    ('45565', 'CS-101', '1', 'Spring', '2018'),
-                    ('45565', 'CS-319', '1', 'Spring', '2018'),
-                    ('76766', 'BIO-101', '1', 'Summer', '2017'),
-                    ('76766', 'BIO-301', '1', 'Summer', '2018'),
-                    ('83821', 'CS-190', '1', 'Spring', '2017'),
-                    ('83821', 'CS-190', '2', 'Spring', '2017'),
-                    ('83821', 'CS-319', '2', 'Spring', '2018'),
-                    ('98345', 'EE-181', '1', 'Spring', '2017');
-
-                -- Insert Student data
-                INSERT INTO student VALUES 
-                    ('00128', 'Zhang', 'Comp. Sci.', '102'),
-                    ('12345', 'Shankar', 'Comp. Sci.', '32'),
-                    ('19991', 'Brandt', 'History', '80'),
-                    ('23121', 'Chavez', 'Finance', '110'),
-                    ('44553', 'Peltier', 'Physics', '56'),
-                    ('45678', 'Levy', 'Physics', '46'),
-                    ('54321', 'Williams', 'Comp. Sci.', '54'),
-                    ('55739', 'Sanchez', 'Music', '38'),
-                    ('70557', 'Snow', 'Physics', '0'),
-                    ('76543', 'Brown', 'Comp. Sci.', '58'),
-                    ('76653', 'Aoi', 'Elec. Eng.', '60'),
-                    ('98765', 'Bourikas', 'Elec. Eng.', '98'),
-                    ('98988', 'Tanaka', 'Biology', '120');
-
-                -- Insert Takes data
-                INSERT INTO takes VALUES 
-                    ('00128', 'CS-101', '1', 'Fall', '2017', 'A'),
-                    ('00128', 'CS-347', '1', 'Fall', '2017', 'A-'),
-                    ('12345', 'CS-101', '1', 'Fall', '2017', 'C'),
-                    ('12345', 'CS-190', '2', 'Spring', '2017', 'A'),
-                    ('12345', 'CS-315', '1', 'Spring', '2018', 'A'),
-                    ('12345', 'CS-347', '1', 'Fall', '2017', 'A'),
-                    ('19991', 'HIS-351', '1', 'Spring', '2018', 'B'),
-                    ('23121', 'FIN-201', '1', 'Spring', '2018', 'C+'),
-                    ('44553', 'PHY-101', '1', 'Fall', '2017', 'B-'),
-                    ('45678', 'CS-101', '1', 'Fall', '2017', 'F'),
-                    ('45678', 'CS-101', '1', 'Spring', '2018', 'B+'),
-                    ('45678', 'CS-319', '1', 'Spring', '2018', 'B'),
-                    ('54321', 'CS-101', '1', 'Fall', '2017', 'A-'),
-                    ('54321', 'CS-190', '2', 'Spring', '2017', 'B+'),
-                    ('55739', 'MU-199', '1', 'Spring', '2018', 'A-'),
-                    ('76543', 'CS-101', '1', 'Fall', '2017', 'A'),
-                    ('76653', 'EE-181', '1', 'Spring', '2017', 'C'),
-                    ('98765', 'EE-181', '1', 'Spring', '2017', 'A'),
-                    ('98988', 'BIO-101', '1', 'Summer', '2017', 'A');
-
-                -- Insert Advisor data
-                INSERT INTO advisor VALUES 
-                    ('00128', '45565'),
-                    ('12345', '10101'),
-                    ('23121', '76543'),
-                    ('44553', '22222'),
-                    ('45678', '22222'),
-                    ('76543', '10101'),
-                    ('76653', '98345'),
-                    ('98765', '98345'),
-                    ('98988', '76766');
-
-                -- Insert Time_Slot data
-                insert into time_slot values ('A', 'M', '8', '0', '8', '50');
-insert into time_slot values ('A', 'W', '8', '0', '8', '50');
-insert into time_slot values ('A', 'F', '8', '0', '8', '50');
-insert into time_slot values ('B', 'M', '9', '0', '9', '50');
-insert into time_slot values ('B', 'W', '9', '0', '9', '50');
-insert into time_slot values ('B', 'F', '9', '0', '9', '50');
-insert into time_slot values ('C', 'M', '11', '0', '11', '50');
-insert into time_slot values ('C', 'W', '11', '0', '11', '50');
-insert into time_slot values ('C', 'F', '11', '0', '11', '50');
-insert into time_slot values ('D', 'M', '13', '0', '13', '50');
-insert into time_slot values ('D', 'W', '13', '0', '13', '50');
-insert into time_slot values ('D', 'F', '13', '0', '13', '50');
-insert into time_slot values ('E', 'T', '10', '30', '11', '45 ');
-insert into time_slot values ('E', 'R', '10', '30', '11', '45 ');
-insert into time_slot values ('F', 'T', '14', '30', '15', '45 ');
-insert into time_slot values ('F', 'R', '14', '30', '15', '45 ');
-insert into time_slot values ('G', 'M', '16', '0', '16', '50');
-insert into time_slot values ('G', 'W', '16', '0', '16', '50');
-insert into time_slot values ('G', 'F', '16', '0', '16', '50');
-insert into time_slot values ('H', 'W', '10', '0', '12', '30');
-
-                -- Insert Prereq data
-                INSERT INTO prereq VALUES 
-                    ('BIO-301', 'BIO-101'),
-                    ('BIO-399', 'BIO-101'),
-                    ('CS-190', 'CS-101'),
-                    ('CS-315', 'CS-101'),
-                    ('CS-319', 'CS-101'),
-                    ('CS-347', 'CS-101');
-            """)
-            conn.commit()
-            print("Data seeding complete!")
-    except Exception as e:
-        conn.rollback()
-        print(f"Error seeding data: {e}")
-# View data functions
-def view_courses(conn):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT * FROM course")
-            return cursor.fetchall()
-    except Exception as e:
-        st.error(f"Error retrieving courses: {e}")
-        return []
-
-
-def view_students(conn):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT ID, name, tot_cred, dept_name FROM student")
-            return cursor.fetchall()
-    except Exception as e:
-        st.error(f"Error retrieving students: {e}")
-        return []
-#function to check whether a student has completed the required prerequisites for a course
-def check_prerequisites(conn, student_id, course_id):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT prereq_id
-                FROM prereq
-                WHERE course_id = %s
-            """, (course_id,))
-            prereqs = cursor.fetchall()
-
-            # Check if the student has completed all prerequisites
-            for prereq in prereqs:
-                cursor.execute("""
-                    SELECT grade
-                    FROM takes
-                    WHERE ID = %s AND course_id = %s
-                """, (student_id, prereq[0]))
-                grade = cursor.fetchone()
-                if grade is None or grade[0] == 'F':  # Assuming 'F' means not passed
-                    return False
-            return True
-    except Exception as e:
-        st.error(f"Error checking prerequisites: {e}")
-        return False
-
-
-
-def view_instructors(conn):
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT * FROM Instructors")
-        return cursor.fetchall()
-
-def view_student_advisors(conn):
-    with conn.cursor() as cursor:
-        cursor.execute("""
-            SELECT Students.name AS student, Instructors.name AS advisor
-            FROM StudentAdvisors
-            JOIN Students ON StudentAdvisors.student_id = Students.student_id
-            JOIN Instructors ON StudentAdvisors.instructor_id = Instructors.instructor_id
-        """)
-        return cursor.fetchall()
-
-# Detailed view of a course
-def course_details(conn, course_id):
-    with conn.cursor() as cursor:
-        cursor.execute("""
-            SELECT Courses.name, Courses.credits, Departments.name AS department, Instructors.name AS instructor
-            FROM Courses 
-            JOIN Departments ON Courses.department_id = Departments.department_id
-            LEFT JOIN CourseSections ON Courses.course_id = CourseSections.course_id
-            LEFT JOIN Instructors ON CourseSections.instructor_id = Instructors.instructor_id
-            WHERE Courses.course_id = %s
-        """, (course_id,))
-        course = cursor.fetchone()
-
-        cursor.execute("""
-            SELECT Students.name 
-            FROM Enrollments 
-            JOIN Students ON Enrollments.student_id = Students.student_id 
-            WHERE Enrollments.course_id = %s
-        """, (course_id,))
-        students = cursor.fetchall()
-
-        return course, students
-
-def section_exists(conn, course_id, sec_id, semester, year):
-    with conn.cursor() as cursor:
-        cursor.execute("""
-            SELECT COUNT(*) FROM section 
-            WHERE course_id = %s AND sec_id = %s AND semester = %s AND year = %s
-        """, (course_id, sec_id, semester, year))
-        count = cursor.fetchone()[0]
-    return count > 0
-
-def assign_instructor_to_course(conn, instructor_id, course_id, sec_id, semester, year):
-    try:
-        # Check if the section exists
-        if not section_exists(conn, course_id, sec_id, semester, year):
-            st.error("The specified section does not exist. Please check the course ID, section ID, semester, and year.")
-            return
-        
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO teaches (ID, course_id, sec_id, semester, year) 
-                VALUES (%s, %s, %s, %s, %s)
-            """, (instructor_id, course_id, sec_id, semester, year))
-            conn.commit()
-            st.success("Instructor assigned to course successfully.")
-    except Exception as e:
-        conn.rollback()  # Rollback if there is an error
-        st.error(f"Error assigning instructor to course: {e}")
-
-
-def add_student(conn, student_id, name, dept_name, tot_cred):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(
-                "INSERT INTO student (ID, name, dept_name, tot_cred) VALUES (%s, %s, %s, %s)",
-                (student_id, name, dept_name, tot_cred)
-            )
-            conn.commit()
-            st.success("Student added successfully!")
-    except Exception as e:
-        conn.rollback()  # Rollback if there is an error
-        st.error(f"Error adding student: {e}")
-
-
-def add_instructor(conn, name, dept_name, salary):
-    try:
-        with conn.cursor() as cursor:
-            # Ensure the instructor ID is unique by finding the maximum existing ID and adding 1
-            cursor.execute("SELECT MAX(ID) FROM instructor")
-            max_id = cursor.fetchone()[0]
-            new_id = max_id + 1 if max_id is not None else 1
-            
-            cursor.execute(
-                "INSERT INTO instructor (ID, name, dept_name, salary) VALUES (%s, %s, %s, %s)",
-                (new_id, name, dept_name, salary)
-            )
-            conn.commit()
-    except Exception as e:
-        conn.rollback()  # Rollback if there is an error
-        st.error(f"Error adding instructor: {e}")
-
-
-def add_course(conn, course_id, title, dept_name, credits):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(
-                "INSERT INTO course (course_id, title, dept_name, credits) VALUES (%s, %s, %s, %s)",
-                (course_id, title, dept_name, credits)
-            )
-            conn.commit()
-    except Exception as e:
-        conn.rollback()  # Rollback if there is an error
-        st.error(f"Error adding course: {e}")
-
-
-# Assign student to a course
-def enroll_student(conn, student_id, course_id, sec_id, semester, year):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO takes (ID, course_id, sec_id, semester, year)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (student_id, course_id, sec_id, semester, year))
-            conn.commit()
-    except Exception as e:
-        conn.rollback()  # Rollback if there is an error
-        st.error(f"Error enrolling student: {e}")
-
-
-
-# Assign instructor to a course section
-def assign_instructor(conn, course_id, instructor_id, room_capacity, schedule):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("INSERT INTO CourseSections (course_id, instructor_id, room_capacity, schedule) VALUES (%s, %s, %s, %s)", (course_id, instructor_id, room_capacity, schedule))
-            conn.commit()
-    except Exception as e:
-        conn.rollback()  # Rollback if there is an error
-        st.error(f"Error assigning instructor to course section: {e}")
-
-# Search functionality
-def view_courses_with_department(conn):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT c.course_id, c.title, c.credits, d.dept_name 
-                FROM course c
-                JOIN department d ON c.dept_name = d.dept_name
-            """)
-            return cursor.fetchall()
-    except Exception as e:
-        st.error(f"Error retrieving courses: {e}")
-        return None
-
-def view_students_with_advisors(conn):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT s.ID, s.name, a.i_ID, i.name 
-                FROM student s
-                LEFT JOIN advisor a ON s.ID = a.s_ID
-                LEFT JOIN instructor i ON a.i_ID = i.ID
-            """)
-            return [(student_id, student_name, int(advisor_id) if advisor_id is not None else None, advisor_name) 
-                    for student_id, student_name, advisor_id, advisor_name in cursor.fetchall()]
-    except Exception as e:
-        st.error(f"Error fetching students with advisors: {e}")
-        return None
-    
-def view_average_salary_by_department(conn):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT dept_name, AVG(salary) AS average_salary
-                FROM instructor
-                GROUP BY dept_name
-            """)
-            return cursor.fetchall()
-    except Exception as e:
-        st.error(f"Error fetching average salary by department: {e}")
-        return None
-    
-def view_instructors(conn):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT ID, name, dept_name, salary
-                FROM instructor
-            """)
-            return cursor.fetchall()
-    except Exception as e:
-        st.error(f"Error fetching instructors: {e}")
-        return None
-    
-def find_students_by_course(conn, course_id):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT s.ID, s.name, s.dept_name, t.grade
-                FROM student s
-                JOIN takes t ON s.ID = t.ID
-                WHERE t.course_id = %s
-            """, (course_id,))
-            return cursor.fetchall()
-    except Exception as e:
-        st.error(f"Error fetching students for course {course_id}: {e}")
-        return None
-
-def find_instructors_by_course(conn, course_id):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT i.ID, i.name, i.salary
-                FROM instructor i
-                JOIN teaches t ON i.ID = t.ID
-                WHERE t.course_id = %s
-            """, (course_id,))
-            return cursor.fetchall()
-    except Exception as e:
-        st.error(f"Error fetching instructors for course {course_id}: {e}")
-        return None
-
-def view_course_sections_with_capacity(conn):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT s.course_id, s.sec_id, s.semester, s.year, c.building, c.room_number, c.capacity
-                FROM section s
-                JOIN classroom c ON s.building = c.building AND s.room_number = c.room_number;
-            """)
-            return cursor.fetchall()
-    except Exception as e:
-        st.error(f"Error fetching course sections with room capacity: {e}")
-        return None
-    
-def find_students_by_minimum_credits(conn, min_credits):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT ID, name, dept_name, tot_cred
-                FROM student
-                WHERE tot_cred >= %s;
-            """, (min_credits,))
-            return cursor.fetchall()
-    except Exception as e:
-        st.error(f"Error fetching students by minimum credits: {e}")
-        return None
-
-
-
-
-# Function to retrieve department names for the dropdown
-def get_departments(conn):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT dept_name FROM department")
-            departments = cursor.fetchall()
-            return [dept[0] for dept in departments]
-    except Exception as e:
-        st.error(f"Error fetching departments: {e}")
-        return []
-    
-# Function to get the next student ID
-def get_next_student_id(conn):
-    try:
-        with conn.cursor() as cursor:
-            # Fetch the latest student ID
-            cursor.execute("SELECT ID FROM student ORDER BY ID DESC LIMIT 1")
-            last_id = cursor.fetchone()
-            if last_id:
-                # Increment the last ID by 1 (assuming the IDs are numerical)
-                next_id = str(int(last_id[0]) + 1).zfill(10)  # Zero-pad to maintain ID format, if needed
-            else:
-                next_id = "0000000001"  # Starting ID if no records are found
-            return next_id
-    except Exception as e:
-        st.error(f"Error generating student ID: {e}")
-        return None
-    
-def get_sections_for_course(conn, course_id):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT sec_id, semester, year
-                FROM section
-                WHERE course_id = %s
-            """, (course_id,))
-            return cursor.fetchall()  # Returns a list of tuples (sec_id, semester, year)
-    except Exception as e:
-        st.error(f"Error fetching sections for course {course_id}: {e}")
-        return []
-
-def get_course_details(conn, course_id):
-    try:
-        with conn.cursor() as cursor:
-            query = """
-            SELECT 
-                c.course_id, 
-                c.title AS course_title, 
-                STRING_AGG(DISTINCT i.name, ', ') AS instructor_names, 
-                s.semester, 
-                s.year, 
-                ts.day, 
-                ts.start_hour, 
-                ts.start_minute, 
-                ts.end_hour, 
-                ts.end_minute,
-                STRING_AGG(DISTINCT st.name, ', ') AS enrolled_students
-            FROM 
-                course c
-            JOIN 
-                section s ON c.course_id = s.course_id
-            JOIN 
-                teaches t ON s.course_id = t.course_id AND s.sec_id = t.sec_id AND s.semester = t.semester AND s.year = t.year
-            JOIN 
-                instructor i ON t.ID = i.ID
-            JOIN 
-                time_slot ts ON s.time_slot_id = ts.time_slot_id
-            LEFT JOIN 
-                takes tk ON tk.course_id = c.course_id AND tk.sec_id = s.sec_id AND tk.semester = s.semester AND tk.year = s.year
-            LEFT JOIN 
-                student st ON tk.ID = st.ID
-            WHERE 
-                c.course_id = %s
-            GROUP BY 
-                c.course_id, c.title, s.semester, s.year, ts.day, ts.start_hour, ts.start_minute, ts.end_hour, ts.end_minute
-            ORDER BY 
-                ts.day, ts.start_hour, ts.start_minute;
-            """
-            cursor.execute(query, (course_id,))
-            return cursor.fetchall()
-    except Exception as e:
-        st.error(f"Error fetching course details: {e}")
-        return None
-
-# Streamlit UI
-def main():
-    st.title("College Management System")
-    conn = connect_db()
-    if not conn:
-        st.stop()
-
-    if st.sidebar.button("Create Database"):
-        create_tables(conn)
-        seed_data(conn)
-        st.success("Database created and seeded successfully.")
-
-    # Sidebar menu using option_menu
-    with st.sidebar:
-        selected = option_menu(
-            menu_title="Menu",
-            options=["View Courses", "Add Student", "View Students", "Search", "Enroll a Student", "Assign Instructor","Add Instructor", "Add Course","View Course Details","Exit"],
-            icons=["book", "person-plus", "people", "search", "plus-circle", "person-video3","person", "book-half","credit-card-2-front-fill","door-closed"], 
-            menu_icon="app-indicator",
-            default_index=0,
-            )
-
-    if selected == "View Courses":
-        st.subheader("Courses")
-        courses = view_courses(conn)
-        if courses:
-            # Define column names based on the course schema
-            columns = ["Course ID", "Title", "Department Name", "Credits"]
-            # Create a DataFrame with course data and display in a table format
-            courses_df = pd.DataFrame(courses, columns=columns)
-            st.table(courses_df)
-        else:
-            st.write("No courses found.")
-
-
-
-    # Add Student section with auto-generated student ID
-    elif selected == "Add Student":
-        student_id = get_next_student_id(conn)  # Automatically generate student ID
-        if student_id:
-            st.write(f"Generated Student ID: {student_id}")
-            name = st.text_input("Student Name")
-            dept_name = st.selectbox("Department Name", get_departments(conn))  # Dropdown for department names
-            tot_cred = st.number_input("Total Credits", min_value=0, step=1)
-    
-            if st.button("Add Student"):
-                add_student(conn, student_id, name, dept_name, tot_cred)
-                st.success("Student added successfully.")
-
-    elif selected == "View Students":
-        st.subheader("Students")
-        students = view_students(conn)
-        if students:
-            # Create a DataFrame to display results in a table format
-            columns = ["Student ID", "Name", "Total Credits", "Department Name"]
-            students_df = pd.DataFrame(students, columns=columns)
-            st.table(students_df)
-        else:
-            st.write("No students found.")
-    elif selected == "Assign Instructor":
-        instructor_id = st.number_input("Instructor ID", min_value=1, step=1)
-        course_id = st.text_input("Course ID")
-        sec_id = st.text_input("Section ID")
-        semester = st.text_input("Semester (e.g., Fall, Spring)")
-        year = st.number_input("Year", min_value=2000, max_value=2100, step=1)
-
-        if st.button("Assign Instructor"):
-            if instructor_id and course_id and sec_id and semester and year:
-                assign_instructor_to_course(conn, instructor_id, course_id, sec_id, semester, year)
-            else:
-                st.error("Please fill in all fields.")
-
-    # Adding New Instructor Form
-    elif selected == "Add Instructor":
-        st.subheader("Add Instructor")
-        name = st.text_input("Instructor Name")
-        dept_name = st.selectbox("Department Name", get_departments(conn))  # Function to fetch department names
-        salary = st.number_input("Salary", min_value=0)
-        if st.button("Add Instructor"):
-            add_instructor(conn, name, dept_name, salary)
-            st.success("Instructor added successfully.")
-    # Adding New Course Form
-    elif selected == "Add Course":
-        st.subheader("Add Course")
-        course_id = st.text_input("Course ID")
-        title = st.text_input("Course Title")
-        dept_name = st.selectbox("Department Name", get_departments(conn))  # Function to fetch department names
-        credits = st.number_input("Credits", min_value=1)
-    
-        if st.button("Add Course"):
-            add_course(conn, course_id, title, dept_name, credits)
-            st.success("Course added successfully.")
-    
-    elif selected == "Search":
-        search_menu = [
-            "Courses with Department Details", 
-            "Students with Advisors",
-            "Average Salary by Department",
-            "View Instructors",
-            "Find Students by Course",
-            "Find Instructors by Course",
-            "View Course Sections with Room Capacity",
-            "Find Students by Minimum Credits"
-        ]
-        search_choice = st.selectbox("Select Search Option", search_menu)
-
-        if search_choice == "Courses with Department Details":
-            st.subheader("Courses with Department Details")
-            courses = view_courses_with_department(conn)
-            if courses:
-                # Create a DataFrame to display results in a table format
-                columns = ["Course ID", "Course Title", "Credits", "Department Name"]
-                courses_df = pd.DataFrame(courses, columns=columns)
-                st.table(courses_df)
-            else:
-                st.write("No courses found.")
-
-        elif search_choice == "Students with Advisors":
-            st.subheader("Students and their Advisors")
-            student_advisor_data = view_students_with_advisors(conn)
-            if student_advisor_data:
-                # Create a DataFrame to display results in a table format
-                columns = ["Student ID", "Student Name", "Advisor ID", "Advisor Name"]
-                students_advisors_df = pd.DataFrame(student_advisor_data, columns=columns)
-
-                # Convert Advisor ID to integer (it should already be, but to ensure no formatting issues)
-                students_advisors_df["Advisor ID"] = students_advisors_df["Advisor ID"].astype('Int64')  # Int64 handles NA gracefully
-
-                # Display the DataFrame
-                st.table(students_advisors_df)
-            else:
-                st.write("No students found or no advisors assigned.")
-
-
-        elif search_choice == "Average Salary by Department":
-            st.subheader("Average Salary by Department")
-            average_salaries = view_average_salary_by_department(conn)
-
-            if average_salaries:
-                # Create a DataFrame to display results in a table format
-                columns = ["Department Name", "Average Salary"]
-                avg_salaries_df = pd.DataFrame(average_salaries, columns=columns)
-
-                # Display the DataFrame
-                st.table(avg_salaries_df)
-            else:
-                st.write("No salary data found.")
-
-        elif search_choice == "View Instructors":
-            st.subheader("Instructors List")
-            instructors = view_instructors(conn)
-
-            if instructors:
-                # Create a DataFrame to display results in a table format
-                columns = ["Instructor ID", "Instructor Name", "Department Name", "Salary"]
-                instructors_df = pd.DataFrame(instructors, columns=columns)
-
-                # Display the DataFrame
-                st.table(instructors_df)
-            else:
-                st.write("No instructors found.")
-
-
-        elif search_choice == "Find Students by Course":
-            st.subheader("Find Students by Course")
-
-            # Retrieve all courses to populate the dropdown
-            courses = view_courses(conn)  # Assuming you have this function from previous implementation
-            if courses:
-                course_options = [course[0] for course in courses]  # Assuming course[0] is course_id
-                selected_course = st.selectbox("Select a Course", course_options)
-
-                if st.button("Find Students"):
-                    students = find_students_by_course(conn, selected_course)
-                    if students:
-                        # Create a DataFrame to display results in a table format
-                        columns = ["Student ID", "Student Name", "Department Name", "Grade"]
-                        students_df = pd.DataFrame(students, columns=columns)
-                        st.table(students_df)
-                    else:
-                        st.write("No students found for the selected course.")
-            else:
-                st.write("No courses available.")
-
-        
-        elif search_choice == "Find Instructors by Course":
-            st.subheader("Find Instructors by Course")
-
-            # Retrieve all courses to populate the dropdown
-            courses = view_courses(conn)  # Assuming you have this function from previous implementation
-            if courses:
-                course_options = [course[0] for course in courses]  # Assuming course[0] is course_id
-                selected_course = st.selectbox("Select a Course", course_options)
-
-                if st.button("Find Instructors"):
-                    instructors = find_instructors_by_course(conn, selected_course)
-                    if instructors:
-                        # Create a DataFrame to display results in a table format
-                        columns = ["Instructor ID", "Instructor Name", "Salary"]
-                        instructors_df = pd.DataFrame(instructors, columns=columns)
-                        st.table(instructors_df)
-                    else:
-                        st.write("No instructors found for the selected course.")
-            else:
-                st.write("No courses available.")
-
-
-        elif search_choice == "View Course Sections with Room Capacity":
-            st.subheader("Course Sections with Room Capacity")
-
-            sections = view_course_sections_with_capacity(conn)
-            if sections:
-                # Create a DataFrame to display results in a table format
-                columns = ["Course ID", "Section ID", "Semester", "Year", "Building", "Room Number", "Capacity"]
-                sections_df = pd.DataFrame(sections, columns=columns)
-                st.table(sections_df)
-            else:
-                st.write("No course sections found.")
-
-
-        elif search_choice == "Find Students by Minimum Credits":
-            st.subheader("Find Students by Minimum Credits")
-
-            # Input for minimum credits
-            min_credits = st.number_input("Enter Minimum Credits", min_value=0, step=1)
-
-            if st.button("Find Students"):
-                students = find_students_by_minimum_credits(conn, min_credits)
-                if students:
-                    # Create a DataFrame to display results in a table format
-                    columns = ["Student ID", "Name", "Department Name", "Total Credits"]
-                    students_df = pd.DataFrame(students, columns=columns)
-                    st.table(students_df)
-                else:
-                    st.write("No students found with the specified minimum credits.")
-
-    elif selected == "Enroll a Student":
-        student_id = st.text_input("Student ID")
-
-        courses = view_courses(conn)
-        course_options = {course[0]: course[1] for course in courses}
-        # Display courses in dropdown
-        selected_course_id = st.selectbox("Select Course", options=list(course_options.keys()), format_func=lambda x: course_options[x])
-        # Fetch available sections for the selected course
-        sections = get_sections_for_course(conn, selected_course_id)
-
-        # Prepare section options to show in the dropdown
-        section_options = {f"{section[0]} - {section[1]} {section[2]}": section for section in sections}  # (sec_id, semester, year)
-
-        if section_options:  # Check if there are any sections available
-            selected_section = st.selectbox("Select Section", options=list(section_options.keys()))
-            selected_sec_id, selected_semester, selected_year = section_options[selected_section]
-
-            if st.button("Enroll Student"):
-                enroll_student(conn, student_id, selected_course_id, selected_sec_id, selected_semester, selected_year)
-                st.success("Student enrolled successfully.")
-        else:
-            st.write("No sections available for the selected course.")
-
-    elif selected == "View Course Details":
-        course_id = st.text_input("Enter Course ID:")
-        if st.button("Get Course Details"):
-            course_details = get_course_details(conn, course_id)
-            if course_details:
-                columns = ["Course ID", "Course Title", "Instructor Names", "Semester", "Year", "Day", "Start Hour", "Start Minute", "End Hour", "End Minute", "Enrolled Students"]
-                course_details_df = pd.DataFrame(course_details, columns=columns)
-                st.table(course_details_df)
-            else:
-                st.write("No course details found.")
-
-    elif selected == "Exit":
-        st.write("Thank you for using the College Management System!")
-        conn.close()
-        st.stop()
-
-if __name__ == "__main__":
-    main()
+import streamlit as st
+import psycopg2
+import pandas as pd
+import functools
+import time
+from collections import namedtuple
+from streamlit_option_menu import option_menu
+
+import analytics
+import async_db
+import batch
+import bulk_import
+import cache
+import course_details
+import db
+import enrollment
+import export
+import grid
+import ids
+import instrumentation
+import migrations
+import pagination
+import prerequisites
+import reference_data
+import routing
+import search
+import seeding
+import timetable
+import transcript
+
+try:
+    from st_keyup import st_keyup  # optional: search while typing
+except ImportError:
+    st_keyup = None
+
+# Database connection pool, shared by every session in this process
+@st.cache_resource
+def get_pool():
+    return db.ConnectionPool(cursor_factory=instrumentation.TimedCursor)
+
+
+# Database connection - checked out from the pool for one script run
+def connect_db():
+    try:
+        return get_pool().getconn()
+    except Exception as e:
+        st.error("Error connecting to the database.")
+        return None
+
+
+# Return the connection to the pool at the end of the script run
+def release_db(conn):
+    get_pool().putconn(conn)
+
+
+# Read/write routing: uncached read-only reports go to the replica pool
+# (COLLEGE_DB_REPLICA_DSN) when one is configured and caught up, everything
+# else stays on the script run's primary connection
+@st.cache_resource
+def get_router():
+    replica_pool = None
+    if db.REPLICA_DSN:
+        replica_pool = db.ConnectionPool(dsn=db.REPLICA_DSN, cursor_factory=instrumentation.TimedCursor)
+    return routing.Router(replica_pool)
+
+
+# Decorator for helpers fn(conn, ...) that only read. Cached loaders are not
+# routed: their results are shared by every session of the process, and a
+# replica still replaying an invalidated write would put the old rows back.
+def reads(fn):
+    @functools.wraps(fn)
+    def wrapper(conn, *args, **kwargs):
+        with get_router().reading(conn, st.session_state.get("written_lsn")) as read_conn:
+            return fn(read_conn, *args, **kwargs)
+    return wrapper
+
+
+# Decorator for helpers fn(conn, ...) that commit on the primary: remembers
+# the session's write position so its next reads see the write
+def writes(fn):
+    @functools.wraps(fn)
+    def wrapper(conn, *args, **kwargs):
+        try:
+            return fn(conn, *args, **kwargs)
+        finally:
+            lsn = get_router().write_position(conn)
+            if lsn is not None:
+                st.session_state["written_lsn"] = lsn
+    return wrapper
+
+
+# Migration - Create tables if they don't exist and apply pending schema migrations
+@writes
+def create_tables(conn):
+    try:
+        applied = migrations.migrate(conn)
+        cache.invalidate()
+        if applied:
+            st.success(f"Schema migrated to version {applied[-1]}.")
+        else:
+            st.success("Schema is up to date.")
+    except Exception as e:
+        st.error(f"Error creating tables: {e}")
+
+
+def get_schema_version(conn):
+    try:
+        return reference_data.schema_version(conn)
+    except Exception as e:
+        st.error(f"Error reading schema version: {e}")
+        return None
+
+
+# Seed data - reload the textbook university fixture set
+@writes
+def seed_data(conn):
+    try:
+        seeding.seed(conn, "textbook")
+        print("Data seeding complete!")
+    except Exception as e:
+        print(f"Error seeding data: {e}")
+# View data functions
+def view_courses(conn):
+    try:
+        return reference_data.courses(conn)
+    except Exception as e:
+        st.error(f"Error retrieving courses: {e}")
+        return []
+
+
+@reads
+def view_students(conn):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT ID, name, tot_cred, dept_name FROM student")
+            return cursor.fetchall()
+    except Exception as e:
+        st.error(f"Error retrieving students: {e}")
+        return []
+
+
+# Paginated listings - keyset pagination on the primary key, one page per query
+@reads
+def view_courses_page(conn, after=None, page_size=pagination.DEFAULT_PAGE_SIZE, view=None):
+    try:
+        return pagination.keyset_page(conn, "course", ["course_id", "title", "dept_name", "credits"],
+                                      ["course_id"], after, page_size, view)
+    except Exception as e:
+        st.error(f"Error retrieving courses: {e}")
+        return None
+
+
+@reads
+def view_students_page(conn, after=None, page_size=pagination.DEFAULT_PAGE_SIZE, view=None):
+    try:
+        return pagination.keyset_page(conn, "student", ["id", "name", "tot_cred", "dept_name"],
+                                      ["id"], after, page_size, view)
+    except Exception as e:
+        st.error(f"Error retrieving students: {e}")
+        return None
+
+
+@reads
+def view_instructors_page(conn, after=None, page_size=pagination.DEFAULT_PAGE_SIZE, view=None):
+    try:
+        return pagination.keyset_page(conn, "instructor", ["id", "name", "dept_name", "salary"],
+                                      ["id"], after, page_size, view)
+    except Exception as e:
+        st.error(f"Error fetching instructors: {e}")
+        return None
+
+
+def count_rows(conn, table):
+    try:
+        return pagination.estimate_row_count(conn, table)
+    except Exception as e:
+        st.error(f"Error counting rows in {table}: {e}")
+        return None
+#function to check whether a student has completed the required prerequisites for a course
+def check_prerequisites(conn, student_id, course_id):
+    missing = check_prerequisites_batch(conn, [(student_id, course_id)])
+    return missing is not None and not missing[(student_id, course_id)]
+
+
+# Prerequisite check for many (student_id, course_id) pairs in one query;
+# returns {pair: [missing prereq_id, ...]} or None on error
+def check_prerequisites_batch(conn, pairs):
+    try:
+        return prerequisites.missing_prerequisites(conn, pairs)
+    except Exception as e:
+        st.error(f"Error checking prerequisites: {e}")
+        return None
+
+
+# Prerequisite planning - answered from the in-memory prerequisite graph
+def plan_prerequisites(conn, student_id, course_id):
+    try:
+        return prerequisites.remaining_prerequisites(conn, [student_id], course_id)[student_id]
+    except Exception as e:
+        st.error(f"Error planning prerequisites: {e}")
+        return None
+
+
+def courses_unlocked_after(conn, student_ids, semester, year):
+    try:
+        return prerequisites.unlocked_after(conn, student_ids, semester, year)
+    except Exception as e:
+        st.error(f"Error finding unlocked courses: {e}")
+        return None
+
+
+@writes
+def add_prerequisite(conn, course_id, prereq_id):
+    try:
+        prerequisites.add_prerequisite(conn, course_id, prereq_id)
+        conn.commit()
+        cache.invalidate("prereq")
+        return True
+    except prerequisites.PrerequisiteCycleError as e:
+        conn.rollback()
+        st.error(f"Cannot add prerequisite: {e}")
+        return False
+    except Exception as e:
+        conn.rollback()  # Rollback if there is an error
+        st.error(f"Error adding prerequisite: {e}")
+        return False
+
+
+# Batched writes for admin scripts and integrations: one set-based check per
+# kind and one INSERT for the whole batch, committed together. Each returns a
+# batch.Outcome per record, or None on error.
+@writes
+def add_students(conn, records):
+    try:
+        outcomes = batch.add_students(conn, records)
+        conn.commit()
+        cache.invalidate("student")
+        return outcomes
+    except Exception as e:
+        conn.rollback()  # Rollback if there is an error
+        st.error(f"Error adding students: {e}")
+        return None
+
+
+@writes
+def add_instructors(conn, records):
+    try:
+        outcomes = batch.add_instructors(conn, records)
+        conn.commit()
+        cache.invalidate("instructor")
+        return outcomes
+    except Exception as e:
+        conn.rollback()  # Rollback if there is an error
+        st.error(f"Error adding instructors: {e}")
+        return None
+
+
+@writes
+def add_courses(conn, records):
+    try:
+        outcomes = batch.add_courses(conn, records)
+        conn.commit()
+        cache.invalidate("course")
+        return outcomes
+    except Exception as e:
+        conn.rollback()  # Rollback if there is an error
+        st.error(f"Error adding courses: {e}")
+        return None
+
+
+@writes
+def assign_instructors(conn, records):
+    try:
+        outcomes = batch.assign_instructors(conn, records)
+        conn.commit()
+        cache.invalidate("teaches", added=[outcome.record for outcome in outcomes if outcome.status == batch.INSERTED])
+        return outcomes
+    except Exception as e:
+        conn.rollback()  # Rollback if there is an error
+        st.error(f"Error assigning instructors: {e}")
+        return None
+
+
+@writes
+def enroll_students(conn, requests, waitlist=True):
+    try:
+        outcomes = batch.enroll_students(conn, requests, waitlist)
+        conn.commit()
+        cache.invalidate("takes", added=[outcome.record for outcome in outcomes
+                                         if outcome.status == enrollment.ENROLLED])
+        return outcomes
+    except Exception as e:
+        conn.rollback()  # Rollback if there is an error
+        st.error(f"Error enrolling students: {e}")
+        return None
+
+
+# Single-row writes from the forms go through the batched paths
+def describe_outcome(outcome):
+    return f"{outcome.status} ({outcome.detail})" if outcome.status == batch.INVALID else outcome.status
+
+
+def assign_instructor_to_course(conn, instructor_id, course_id, sec_id, semester, year):
+    outcomes = assign_instructors(conn, [(instructor_id, course_id, sec_id, semester, year)])
+    if outcomes is None:
+        return
+    status, detail = outcomes[0].status, outcomes[0].detail
+    if status == batch.INSERTED:
+        st.success("Instructor assigned to course successfully.")
+    elif status == batch.NO_SECTION:
+        st.error("The specified section does not exist. Please check the course ID, section ID, semester, and year.")
+    elif status == batch.CLASH:
+        others = ", ".join(f"{other[0]} section {other[1]}" for other in detail)
+        st.error(f"Timetable clash for instructor {instructor_id}: {others}")
+    else:
+        st.error(f"Instructor {instructor_id} was not assigned: {describe_outcome(outcomes[0])}.")
+
+
+def add_student(conn, student_id, name, dept_name, tot_cred):
+    outcomes = add_students(conn, [(student_id, name, dept_name, tot_cred)])
+    if outcomes is None:
+        return
+    if outcomes[0].status == batch.INSERTED:
+        st.success("Student added successfully!")
+    else:
+        st.error(f"Error adding student: {describe_outcome(outcomes[0])}")
+
+
+def add_instructor(conn, name, dept_name, salary):
+    # The instructor ID comes from instructor_id_seq, so concurrent adds never collide
+    outcomes = add_instructors(conn, [(name, dept_name, salary)])
+    if outcomes is None:
+        return None
+    if outcomes[0].status != batch.INSERTED:
+        st.error(f"Error adding instructor: {describe_outcome(outcomes[0])}")
+        return None
+    return outcomes[0].detail
+
+
+def add_course(conn, course_id, title, dept_name, credits):
+    outcomes = add_courses(conn, [(course_id, title, dept_name, credits)])
+    if outcomes is None:
+        return False
+    if outcomes[0].status != batch.INSERTED:
+        st.error(f"Error adding course: {describe_outcome(outcomes[0])}")
+        return False
+    return True
+
+
+# Show timetable clashes as an error; True if there were any
+def report_clashes(clashes):
+    if not clashes:
+        return False
+    meetings = ", ".join(
+        f"{clash.other[0]} section {clash.other[1]} ({timetable.format_minute(clash.start)}-"
+        f"{timetable.format_minute(clash.end)[2:]})" for clash in clashes
+    )
+    st.error(f"Timetable clash for {clashes[0].kind} {clashes[0].resource}: {meetings}")
+    return True
+
+
+# Assign student to a course - the enrollment engine checks the seat counter
+# and puts the student on the waitlist when the section is full
+@writes
+def enroll_student(conn, student_id, course_id, sec_id, semester, year):
+    try:
+        if report_clashes(timetable.clashes(conn, timetable.STUDENT, student_id, course_id, sec_id, semester, year)):
+            return None
+        admission = enrollment.enroll(conn, student_id, course_id, sec_id, semester, year)
+        conn.commit()
+        if admission.status == enrollment.ENROLLED:
+            cache.invalidate("takes", added=[(student_id, course_id, sec_id, semester, year)])
+        return admission
+    except Exception as e:
+        conn.rollback()  # Rollback if there is an error
+        st.error(f"Error enrolling student: {e}")
+        return None
+
+
+# Drop a student from a section or its waitlist; freed seats go to the waitlist
+@writes
+def drop_student(conn, student_id, course_id, sec_id, semester, year):
+    try:
+        dropped, promoted = enrollment.drop(conn, student_id, course_id, sec_id, semester, year)
+        conn.commit()
+        if dropped:
+            section = (course_id, sec_id, semester, year)
+            cache.invalidate("takes", removed=[(student_id, *section)],
+                             added=[(promoted_id, *section) for promoted_id in promoted])
+        return dropped, promoted
+    except Exception as e:
+        conn.rollback()  # Rollback if there is an error
+        st.error(f"Error dropping student: {e}")
+        return None
+
+
+def get_section_seats(conn, course_id, sec_id, semester, year):
+    try:
+        return enrollment.seats(conn, course_id, sec_id, semester, year)
+    except Exception as e:
+        st.error(f"Error fetching seats for section {sec_id}: {e}")
+        return None
+
+
+
+# Ranked name/title search, one keyset page at a time
+@reads
+def quick_search(conn, kind, query, after=None, page_size=pagination.DEFAULT_PAGE_SIZE):
+    try:
+        return search.search(conn, kind, query, after, page_size)
+    except Exception as e:
+        conn.rollback()
+        st.error(f"Error searching {kind}: {e}")
+        return None
+
+
+# Search functionality
+COURSES_WITH_DEPARTMENT_SQL = """
+    SELECT c.course_id, c.title, c.credits, d.dept_name 
+    FROM course c
+    JOIN department d ON c.dept_name = d.dept_name
+"""
+
+STUDENTS_WITH_ADVISORS_SQL = """
+    SELECT s.ID, s.name, a.i_ID, i.name 
+    FROM student s
+    LEFT JOIN advisor a ON s.ID = a.s_ID
+    LEFT JOIN instructor i ON a.i_ID = i.ID
+"""
+
+# Read from the trigger-maintained rollup instead of grouping instructor
+AVERAGE_SALARY_BY_DEPARTMENT_SQL = """
+    SELECT dept_name, total_salary::NUMERIC / NULLIF(salaried, 0) AS average_salary
+    FROM dept_salary_stats
+    WHERE instructors > 0
+"""
+
+INSTRUCTORS_SQL = """
+    SELECT ID, name, dept_name, salary
+    FROM instructor
+"""
+
+STUDENTS_BY_COURSE_SQL = """
+    SELECT s.ID, s.name, s.dept_name, t.grade, t.sec_id, t.semester, t.year
+    FROM student s
+    JOIN takes t ON s.ID = t.ID
+    WHERE t.course_id = %s
+"""
+
+INSTRUCTORS_BY_COURSE_SQL = """
+    SELECT i.ID, i.name, i.salary, t.sec_id, t.semester, t.year
+    FROM instructor i
+    JOIN teaches t ON i.ID = t.ID
+    WHERE t.course_id = %s
+"""
+
+COURSE_SECTIONS_WITH_CAPACITY_SQL = """
+    SELECT s.course_id, s.sec_id, s.semester, s.year, c.building, c.room_number, c.capacity
+    FROM section s
+    JOIN classroom c ON s.building = c.building AND s.room_number = c.room_number
+"""
+
+STUDENTS_BY_MINIMUM_CREDITS_SQL = """
+    SELECT ID, name, dept_name, tot_cred
+    FROM student
+    WHERE tot_cred >= %s
+"""
+
+@reads
+def view_courses_with_department(conn):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(COURSES_WITH_DEPARTMENT_SQL)
+            return cursor.fetchall()
+    except Exception as e:
+        st.error(f"Error retrieving courses: {e}")
+        return None
+
+@reads
+def view_students_with_advisors(conn):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(STUDENTS_WITH_ADVISORS_SQL)
+            return [(student_id, student_name, int(advisor_id) if advisor_id is not None else None, advisor_name) 
+                    for student_id, student_name, advisor_id, advisor_name in cursor.fetchall()]
+    except Exception as e:
+        st.error(f"Error fetching students with advisors: {e}")
+        return None
+    
+@reads
+def view_average_salary_by_department(conn):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(AVERAGE_SALARY_BY_DEPARTMENT_SQL)
+            return cursor.fetchall()
+    except Exception as e:
+        st.error(f"Error fetching average salary by department: {e}")
+        return None
+    
+@reads
+def view_instructors(conn):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(INSTRUCTORS_SQL)
+            return cursor.fetchall()
+    except Exception as e:
+        st.error(f"Error fetching instructors: {e}")
+        return None
+    
+@reads
+def find_students_by_course(conn, course_id):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(STUDENTS_BY_COURSE_SQL, (course_id,))
+            return cursor.fetchall()
+    except Exception as e:
+        st.error(f"Error fetching students for course {course_id}: {e}")
+        return None
+
+@reads
+def find_instructors_by_course(conn, course_id):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(INSTRUCTORS_BY_COURSE_SQL, (course_id,))
+            return cursor.fetchall()
+    except Exception as e:
+        st.error(f"Error fetching instructors for course {course_id}: {e}")
+        return None
+
+@reads
+def view_course_sections_with_capacity(conn):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(COURSE_SECTIONS_WITH_CAPACITY_SQL)
+            return cursor.fetchall()
+    except Exception as e:
+        st.error(f"Error fetching course sections with room capacity: {e}")
+        return None
+    
+@reads
+def find_students_by_minimum_credits(conn, min_credits):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(STUDENTS_BY_MINIMUM_CREDITS_SQL, (min_credits,))
+            return cursor.fetchall()
+    except Exception as e:
+        st.error(f"Error fetching students by minimum credits: {e}")
+        return None
+
+
+# Every search option, keyed by its menu label: the query, its output
+# columns as labels and as names, and the columns that identify a row. The
+# Search page pages through it with pagination.keyset_page; exports stream
+# all of it.
+SearchExport = namedtuple("SearchExport", ["slug", "query", "columns", "fields", "key_columns"])
+
+SEARCH_EXPORTS = {
+    "Courses with Department Details": SearchExport(
+        "courses-with-departments", COURSES_WITH_DEPARTMENT_SQL,
+        ["Course ID", "Course Title", "Credits", "Department Name"],
+        ["course_id", "title", "credits", "dept_name"], ["course_id"]),
+    "Students with Advisors": SearchExport(
+        "students-with-advisors", STUDENTS_WITH_ADVISORS_SQL,
+        ["Student ID", "Student Name", "Advisor ID", "Advisor Name"],
+        ["id", "name", "advisor_id", "advisor_name"], ["id"]),
+    "Average Salary by Department": SearchExport(
+        "average-salary-by-department", AVERAGE_SALARY_BY_DEPARTMENT_SQL,
+        ["Department Name", "Average Salary"],
+        ["dept_name", "average_salary"], ["dept_name"]),
+    "View Instructors": SearchExport(
+        "instructors", INSTRUCTORS_SQL,
+        ["Instructor ID", "Instructor Name", "Department Name", "Salary"],
+        ["id", "name", "dept_name", "salary"], ["id"]),
+    "Find Students by Course": SearchExport(
+        "students-by-course", STUDENTS_BY_COURSE_SQL,
+        ["Student ID", "Student Name", "Department Name", "Grade", "Section ID", "Semester", "Year"],
+        ["id", "name", "dept_name", "grade", "sec_id", "semester", "year"], ["id", "sec_id", "semester", "year"]),
+    "Find Instructors by Course": SearchExport(
+        "instructors-by-course", INSTRUCTORS_BY_COURSE_SQL,
+        ["Instructor ID", "Instructor Name", "Salary", "Section ID", "Semester", "Year"],
+        ["id", "name", "salary", "sec_id", "semester", "year"], ["id", "sec_id", "semester", "year"]),
+    "View Course Sections with Room Capacity": SearchExport(
+        "course-sections-with-capacity", COURSE_SECTIONS_WITH_CAPACITY_SQL,
+        ["Course ID", "Section ID", "Semester", "Year", "Building", "Room Number", "Capacity"],
+        ["course_id", "sec_id", "semester", "year", "building", "room_number", "capacity"],
+        ["course_id", "sec_id", "semester", "year"]),
+    "Find Students by Minimum Credits": SearchExport(
+        "students-by-minimum-credits", STUDENTS_BY_MINIMUM_CREDITS_SQL,
+        ["Student ID", "Name", "Department Name", "Total Credits"],
+        ["id", "name", "dept_name", "tot_cred"], ["id"]),
+}
+
+
+# One page of a search option: its query runs as a subquery, so the seek,
+# sort and filter are done in SQL and only page_size rows are fetched
+@reads
+def search_page(conn, search_choice, params, after=None, page_size=pagination.DEFAULT_PAGE_SIZE, view=None):
+    option = SEARCH_EXPORTS[search_choice]
+    try:
+        return pagination.keyset_page(conn, pagination.subquery(option.query, option.fields), option.fields,
+                                      option.key_columns, after, page_size, view, params)
+    except Exception as e:
+        conn.rollback()
+        st.error(f"Error running {search_choice}: {e}")
+        return None
+
+
+def render_search(conn, search_choice, params, empty_message):
+    option = SEARCH_EXPORTS[search_choice]
+    pagination.render_paged_table(
+        f"search_{option.slug}",
+        lambda after, page_size, view: search_page(conn, search_choice, params, after, page_size, view),
+        lambda: None,
+        option.columns,
+        empty_message,
+        dict(zip(option.columns, option.fields)),
+        params=params,
+    )
+
+
+# Exports stream the whole result set, so they read from the replica too
+export_to_path = reads(export.export_to_path)
+# Bulk imports commit on the primary like the other write paths
+import_file = writes(bulk_import.import_file)
+
+
+# Function to retrieve department names for the dropdown
+def get_departments(conn):
+    try:
+        return reference_data.departments(conn)
+    except Exception as e:
+        st.error(f"Error fetching departments: {e}")
+        return []
+    
+# Function to get the next student ID - allocated from student_id_seq, so it
+# never scans the table and two sessions never get the same ID
+def get_next_student_id(conn):
+    try:
+        return ids.next_student_id(conn)
+    except Exception as e:
+        st.error(f"Error generating student ID: {e}")
+        return None
+    
+def get_sections_for_course(conn, course_id):
+    try:
+        return reference_data.sections_for_course(conn, course_id)
+    except Exception as e:
+        st.error(f"Error fetching sections for course {course_id}: {e}")
+        return []
+
+# Every student, instructor and room double-booking of a term
+def audit_timetable(conn, semester, year):
+    try:
+        return timetable.audit(conn, semester, year)
+    except Exception as e:
+        st.error(f"Error auditing the timetable: {e}")
+        return None
+
+# Transcripts - GPAs come from the cached whole-student-body GPA table
+@reads
+def get_transcript(conn, student_id):
+    try:
+        return transcript.transcript(conn, student_id)
+    except Exception as e:
+        st.error(f"Error fetching transcript: {e}")
+        return None
+
+
+def get_student_gpa(conn, student_id):
+    try:
+        return transcript.student_gpa(conn, student_id)
+    except Exception as e:
+        st.error(f"Error computing GPA: {e}")
+        return None
+
+
+@writes
+def record_grade(conn, student_id, course_id, sec_id, semester, year, grade):
+    try:
+        updated = transcript.set_grade(conn, student_id, course_id, sec_id, semester, year, grade)
+        conn.commit()
+        if updated:
+            # Only this term's GPAs are recomputed; the triggers updated tot_cred
+            cache.invalidate("takes", grades=[(student_id, course_id, sec_id, semester, year)])
+            cache.invalidate("student")
+        return updated
+    except Exception as e:
+        conn.rollback()  # Rollback if there is an error
+        st.error(f"Error recording grade: {e}")
+        return False
+
+# Dashboards - read only from the analytics rollup tables
+def get_analytics(conn, loader, *args):
+    try:
+        return loader(conn, *args)
+    except Exception as e:
+        st.error(f"Error loading analytics: {e}")
+        return None
+
+
+@writes
+def refresh_analytics(conn, semester, year):
+    try:
+        analytics.refresh(conn, [(semester, year)])
+        return True
+    except Exception as e:
+        st.error(f"Error refreshing analytics: {e}")
+        return False
+
+# Course details are read from the precomputed course_details_summary table,
+# which the write paths keep up to date section by section
+@reads
+def get_course_details(conn, course_id):
+    try:
+        return course_details.get_course_details(conn, course_id)
+    except Exception as e:
+        st.error(f"Error fetching course details: {e}")
+        return None
+
+# Streamlit UI
+# Shared datasets pages can depend on: name -> loader(conn, *args). The
+# loaders raise on error, so a failure is reported and never memoized.
+DATA_LOADERS = {
+    "courses": reference_data.courses,
+    "departments": reference_data.departments,
+    "sections": reference_data.sections_for_course,
+    "terms": analytics.terms,
+}
+
+
+# The datasets one page declared. Each is loaded on first use only and kept
+# in the session until a write bumps reference_data.data_generation() or
+# cache.DEFAULT_TTL passes, so reruns of the page (and of every other page)
+# don't fetch it again.
+class PageData:
+    def __init__(self, conn, names):
+        self.conn = conn
+        self.names = names
+
+    def get(self, name, *args):
+        if name not in self.names:
+            raise KeyError(f"Page data {name!r} was not declared")
+        memo = st.session_state.setdefault("page_data", {})
+        entry = memo.get((name, args))
+        now = time.monotonic()
+        generation = reference_data.data_generation()
+        if entry is not None and entry[0] == generation and entry[1] + cache.DEFAULT_TTL > now:
+            return entry[2]
+        try:
+            value = DATA_LOADERS[name](self.conn, *args)
+        except Exception as e:
+            st.error(f"Error loading {name}: {e}")
+            return None
+        memo[(name, args)] = (generation, now, value)
+        return value
+
+
+def page_view_courses(conn, data):
+    st.subheader("Courses")
+    # Define column names based on the course schema
+    columns = ["Course ID", "Title", "Department Name", "Credits"]
+    pagination.render_paged_table(
+        "courses",
+        lambda after, page_size, view: view_courses_page(conn, after, page_size, view),
+        lambda: count_rows(conn, "course"),
+        columns,
+        "No courses found.",
+        dict(zip(columns, ["course_id", "title", "dept_name", "credits"])),
+    )
+
+
+# Add Student section with auto-generated student ID
+def page_add_student(conn, data):
+    # The student ID is only allocated when the student is actually added
+    st.caption("A student ID is generated automatically when the student is added.")
+    with st.form("add_student"):
+        name = st.text_input("Student Name")
+        dept_name = st.selectbox("Department Name", data.get("departments") or [])  # Dropdown for department names
+        submitted = st.form_submit_button("Add Student")
+    if submitted:
+        student_id = get_next_student_id(conn)  # Automatically generate student ID
+        if student_id:
+            # New students start with no credits; passing grades in takes add them
+            add_student(conn, student_id, name, dept_name, 0)
+            st.write(f"Generated Student ID: {student_id}")
+
+
+def page_view_students(conn, data):
+    st.subheader("Students")
+    columns = ["Student ID", "Name", "Total Credits", "Department Name"]
+    pagination.render_paged_table(
+        "students",
+        lambda after, page_size, view: view_students_page(conn, after, page_size, view),
+        lambda: count_rows(conn, "student"),
+        columns,
+        "No students found.",
+        dict(zip(columns, ["id", "name", "tot_cred", "dept_name"])),
+    )
+
+
+def page_assign_instructor(conn, data):
+    with st.form("assign_instructor"):
+        instructor_id = st.number_input("Instructor ID", min_value=1, step=1)
+        course_id = st.text_input("Course ID")
+        sec_id = st.text_input("Section ID")
+        semester = st.text_input("Semester (e.g., Fall, Spring)")
+        year = st.number_input("Year", min_value=2000, max_value=2100, step=1)
+        submitted = st.form_submit_button("Assign Instructor")
+
+    if submitted:
+        if instructor_id and course_id and sec_id and semester and year:
+            assign_instructor_to_course(conn, instructor_id, course_id, sec_id, semester, year)
+        else:
+            st.error("Please fill in all fields.")
+
+
+# Adding New Instructor Form
+def page_add_instructor(conn, data):
+    st.subheader("Add Instructor")
+    with st.form("add_instructor"):
+        name = st.text_input("Instructor Name")
+        dept_name = st.selectbox("Department Name", data.get("departments") or [])
+        salary = st.number_input("Salary", min_value=0)
+        submitted = st.form_submit_button("Add Instructor")
+    if submitted:
+        instructor_id = add_instructor(conn, name, dept_name, salary)
+        if instructor_id is not None:
+            st.success(f"Instructor added successfully with ID {instructor_id}.")
+
+
+# Adding New Course Form
+def page_add_course(conn, data):
+    st.subheader("Add Course")
+    with st.form("add_course"):
+        course_id = st.text_input("Course ID")
+        title = st.text_input("Course Title")
+        dept_name = st.selectbox("Department Name", data.get("departments") or [])
+        credits = st.number_input("Credits", min_value=1)
+        submitted = st.form_submit_button("Add Course")
+
+    if submitted:
+        if add_course(conn, course_id, title, dept_name, credits):
+            st.success("Course added successfully.")
+
+
+def page_search(conn, data):
+    st.subheader("Quick Search")
+    kind = st.radio("Search in", list(search.SEARCHES), horizontal=True, format_func=str.capitalize)
+    # Typeahead on purpose: the debounced box reruns while typing
+    if st_keyup is not None:
+        query = st_keyup("Name, title or ID", debounce=300, key="quick_search_query")
+    else:
+        query = st.text_input("Name, title or ID", key="quick_search_query")
+    query = (query or "").strip()
+    if query:
+        if len(query) < search.MIN_QUERY_LENGTH:
+            st.caption(f"Type at least {search.MIN_QUERY_LENGTH} characters.")
+        else:
+            quick_search_columns = {
+                "students": ["Student ID", "Name", "Department Name", "Total Credits"],
+                "instructors": ["Instructor ID", "Name", "Department Name"],
+                "courses": ["Course ID", "Title", "Department Name", "Credits"],
+            }
+            pagination.render_paged_table(
+                f"search_{kind}",
+                lambda after, page_size: quick_search(conn, kind, query, after, page_size),
+                lambda: None,
+                quick_search_columns[kind],
+                f"No {kind} match \"{query}\".",
+                params=query,
+            )
+    st.divider()
+
+    search_menu = [
+        "Courses with Department Details",
+        "Students with Advisors",
+        "Average Salary by Department",
+        "View Instructors",
+        "Find Students by Course",
+        "Find Instructors by Course",
+        "View Course Sections with Room Capacity",
+        "Find Students by Minimum Credits"
+    ]
+    search_choice = st.selectbox("Select Search Option", search_menu)
+    export_params = ()
+
+    if search_choice == "Courses with Department Details":
+        st.subheader("Courses with Department Details")
+        render_search(conn, search_choice, (), "No courses found.")
+
+    elif search_choice == "Students with Advisors":
+        st.subheader("Students and their Advisors")
+        render_search(conn, search_choice, (), "No students found or no advisors assigned.")
+
+    elif search_choice == "Average Salary by Department":
+        st.subheader("Average Salary by Department")
+        render_search(conn, search_choice, (), "No salary data found.")
+
+    elif search_choice == "View Instructors":
+        st.subheader("Instructors List")
+        columns = ["Instructor ID", "Instructor Name", "Department Name", "Salary"]
+        pagination.render_paged_table(
+            "instructors",
+            lambda after, page_size, view: view_instructors_page(conn, after, page_size, view),
+            lambda: count_rows(conn, "instructor"),
+            columns,
+            "No instructors found.",
+            dict(zip(columns, ["id", "name", "dept_name", "salary"])),
+        )
+
+    elif search_choice == "Find Students by Course":
+        st.subheader("Find Students by Course")
+
+        # The course list is memoized for the session
+        courses = data.get("courses")
+        if courses:
+            course_options = [course[0] for course in courses]
+            with st.form("find_students_by_course"):
+                selected_course = st.selectbox("Select a Course", course_options)
+                st.form_submit_button("Find Students")
+            export_params = (selected_course,)
+            render_search(conn, search_choice, export_params, "No students found for the selected course.")
+        else:
+            st.write("No courses available.")
+
+    elif search_choice == "Find Instructors by Course":
+        st.subheader("Find Instructors by Course")
+
+        # The course list is memoized for the session
+        courses = data.get("courses")
+        if courses:
+            course_options = [course[0] for course in courses]
+            with st.form("find_instructors_by_course"):
+                selected_course = st.selectbox("Select a Course", course_options)
+                st.form_submit_button("Find Instructors")
+            export_params = (selected_course,)
+            render_search(conn, search_choice, export_params, "No instructors found for the selected course.")
+        else:
+            st.write("No courses available.")
+
+    elif search_choice == "View Course Sections with Room Capacity":
+        st.subheader("Course Sections with Room Capacity")
+        render_search(conn, search_choice, (), "No course sections found.")
+
+    elif search_choice == "Find Students by Minimum Credits":
+        st.subheader("Find Students by Minimum Credits")
+
+        with st.form("find_students_by_minimum_credits"):
+            # Input for minimum credits
+            min_credits = st.number_input("Enter Minimum Credits", min_value=0, step=1)
+            st.form_submit_button("Find Students")
+        export_params = (min_credits,)
+        render_search(conn, search_choice, export_params, "No students found with the specified minimum credits.")
+
+    # Full export of the selected search, streamed in chunks
+    search_export = SEARCH_EXPORTS[search_choice]
+    if len(export_params) == search_export.query.count("%s"):
+        st.divider()
+        export.render_export(conn, search_export.slug, search_export.query, export_params,
+                             search_export.columns, search_export.slug, export_to_path)
+
+
+def page_enroll_student(conn, data):
+    # Course and section stay outside the form: the section list and the seat
+    # counts follow them. Both lists are memoized for the session.
+    courses = data.get("courses") or []
+    course_options = {course[0]: course[1] for course in courses}
+    # Display courses in dropdown
+    selected_course_id = st.selectbox("Select Course", options=list(course_options.keys()), format_func=lambda x: course_options[x], key="enroll_course")
+    # Fetch available sections for the selected course
+    sections = []
+    if selected_course_id is not None:
+        sections = data.get("sections", selected_course_id) or []
+
+    # Prepare section options to show in the dropdown
+    section_options = {f"{section[0]} - {section[1]} {section[2]}": section for section in sections}  # (sec_id, semester, year)
+
+    if not section_options:  # Check if there are any sections available
+        st.write("No sections available for the selected course.")
+        return
+
+    selected_section = st.selectbox("Select Section", options=list(section_options.keys()))
+    selected_sec_id, selected_semester, selected_year = section_options[selected_section]
+    section = (selected_course_id, selected_sec_id, selected_semester, selected_year)
+
+    seat_info = get_section_seats(conn, *section)
+    if seat_info:
+        capacity, enrolled, waiting = seat_info
+        st.caption(f"Seats taken: {enrolled} of {capacity if capacity is not None else 'unlimited'}, "
+                   f"waitlist: {waiting}")
+
+    with st.form("enroll_student"):
+        student_id = st.text_input("Student ID")
+        enroll_column, drop_column = st.columns(2)
+        enroll_clicked = enroll_column.form_submit_button("Enroll Student")
+        drop_clicked = drop_column.form_submit_button("Drop Student")
+
+    if enroll_clicked:
+        missing = check_prerequisites_batch(conn, [(student_id, selected_course_id)])
+        if missing is None:
+            pass
+        elif missing[(student_id, selected_course_id)]:
+            st.error(f"Student {student_id} has not passed the prerequisite(s): "
+                     f"{', '.join(missing[(student_id, selected_course_id)])}")
+        else:
+            admission = enroll_student(conn, student_id, *section)
+            if admission is None:
+                pass
+            elif admission.status == enrollment.ENROLLED:
+                st.success("Student enrolled successfully.")
+            elif admission.status in (enrollment.WAITLISTED, enrollment.ALREADY_WAITLISTED):
+                st.warning(f"The section is full. Student {student_id} is number "
+                           f"{admission.position} on the waitlist.")
+            else:
+                st.error(f"Student {student_id} was not enrolled: {admission.status}.")
+
+    if drop_clicked:
+        result = drop_student(conn, student_id, *section)
+        if result is None:
+            pass
+        elif not result[0]:
+            st.error(f"Student {student_id} is not enrolled in or waitlisted for this section.")
+        elif result[1]:
+            st.success(f"Student dropped. Promoted from the waitlist: {', '.join(result[1])}")
+        else:
+            st.success("Student dropped.")
+
+
+def page_course_details(conn, data):
+    with st.form("course_details"):
+        course_id = st.text_input("Enter Course ID:")
+        submitted = st.form_submit_button("Get Course Details")
+    if submitted:
+        course_details = get_course_details(conn, course_id)
+        if course_details:
+            columns = ["Course ID", "Course Title", "Section ID", "Instructor Names", "Semester", "Year", "Day", "Start Hour", "Start Minute", "End Hour", "End Minute", "Enrolled Students"]
+            course_details_df = pd.DataFrame(course_details, columns=columns)
+            grid.render_grid(course_details_df)
+        else:
+            st.write("No course details found.")
+
+
+def page_prerequisites(conn, data):
+    st.subheader("Prerequisite Planner")
+    courses = data.get("courses") or []
+    course_options = {course[0]: course[1] for course in courses}
+    with st.form("plan_prerequisites"):
+        student_id = st.text_input("Student ID")
+        target_course_id = st.selectbox("Target Course", options=list(course_options.keys()), format_func=lambda x: f"{x} - {course_options[x]}")
+        submitted = st.form_submit_button("Plan")
+    if submitted and student_id:
+        remaining = plan_prerequisites(conn, student_id, target_course_id)
+        if remaining:
+            st.write("Still to pass, in an order they can be taken:")
+            grid.render_grid(pd.DataFrame([(course_id, course_options.get(course_id, "")) for course_id in remaining],
+                                  columns=["Course ID", "Title"]))
+        elif remaining is not None:
+            st.success(f"Student {student_id} has passed every prerequisite of {target_course_id}.")
+
+    st.divider()
+    st.write("Courses unlocked by passing a term (leave the student ID empty for every student)")
+    with st.form("unlocked_courses"):
+        unlocked_student_id = st.text_input("Student ID", key="unlocked_student")
+        semester = st.text_input("Semester (e.g., Fall, Spring)")
+        year = st.number_input("Year", min_value=2000, max_value=2100, step=1)
+        submitted = st.form_submit_button("Show Unlocked Courses")
+    if submitted and semester:
+        unlocked = courses_unlocked_after(conn, [unlocked_student_id] if unlocked_student_id else None, semester, year)
+        if unlocked:
+            unlocked_df = pd.DataFrame([(unlocked_id, ", ".join(course_ids)) for unlocked_id, course_ids in sorted(unlocked.items())],
+                                       columns=["Student ID", "Unlocked Courses"])
+            grid.render_grid(unlocked_df)
+        elif unlocked is not None:
+            st.write("No courses are unlocked by that term.")
+
+    st.divider()
+    st.write("Add Prerequisite")
+    with st.form("add_prerequisite"):
+        course_id = st.selectbox("Course", options=list(course_options.keys()), key="prereq_course")
+        prereq_id = st.selectbox("Requires", options=list(course_options.keys()), key="prereq_required")
+        submitted = st.form_submit_button("Add Prerequisite")
+    if submitted:
+        if add_prerequisite(conn, course_id, prereq_id):
+            st.success(f"{course_id} now requires {prereq_id}.")
+
+
+def page_transcript(conn, data):
+    st.subheader("Transcript")
+    with st.form("transcript"):
+        student_id = st.text_input("Student ID")
+        st.form_submit_button("Show Transcript")
+    if not student_id:
+        return
+    # The course list and the GPA table don't depend on each other: fetch
+    # them concurrently on their own pooled connections
+    courses_taken, gpas = async_db.gather(get_pool(), (get_transcript, student_id), (get_student_gpa, student_id))
+    if courses_taken is not None and courses_taken.empty:
+        st.write("No courses found for this student.")
+    elif courses_taken is not None:
+        if gpas is not None and not gpas.empty:
+            latest = gpas.iloc[-1]
+            gpa_column, credits_column = st.columns(2)
+            gpa_column.metric("Cumulative GPA", f"{latest['cumulative_gpa']:.2f}")
+            credits_column.metric("Graded Credits", int(latest["cumulative_credits"]))
+        columns = ["Course ID", "Title", "Section ID", "Semester", "Year", "Credits", "Grade", "Grade Points"]
+        grid.render_grid(courses_taken.set_axis(columns, axis=1))
+        if gpas is not None and not gpas.empty:
+            st.write("Term GPA")
+            term_columns = ["Semester", "Year", "Credits", "Term GPA", "Cumulative Credits", "Cumulative GPA"]
+            grid.render_grid(gpas.drop(columns="id").set_axis(term_columns, axis=1))
+
+        with st.expander("Record Grade"):
+            taken_options = {f"{row.course_id} section {row.sec_id}, {row.semester} {row.year}": row
+                             for row in courses_taken.itertuples()}
+            with st.form("record_grade"):
+                chosen = st.selectbox("Course", options=list(taken_options.keys()))
+                grade = st.selectbox("Grade", ["(none)"] + list(transcript.GRADE_POINTS))
+                submitted = st.form_submit_button("Save Grade")
+            if submitted:
+                row = taken_options[chosen]
+                if record_grade(conn, student_id, row.course_id, row.sec_id, row.semester, int(row.year),
+                                None if grade == "(none)" else grade):
+                    st.rerun()
+
+
+def page_timetable_audit(conn, data):
+    st.subheader("Timetable Audit")
+    with st.form("timetable_audit"):
+        semester = st.text_input("Semester (e.g., Fall, Spring)")
+        year = st.number_input("Year", min_value=2000, max_value=2100, step=1)
+        submitted = st.form_submit_button("Run Audit")
+    if submitted and semester:
+        clashes = audit_timetable(conn, semester, year)
+        if clashes:
+            st.warning(f"{len(clashes)} clash(es) in {semester} {year}.")
+            grid.render_grid(timetable.audit_frame(clashes))
+        elif clashes is not None:
+            st.success(f"No clashes in {semester} {year}.")
+
+
+def page_analytics(conn, data):
+    st.subheader("Analytics")
+    st.write("Enrollments by Department")
+    by_department = get_analytics(conn, analytics.enrollment_by_department)
+    if by_department is not None and not by_department.empty:
+        st.bar_chart(by_department)
+    elif by_department is not None:
+        st.write("No enrollments yet.")
+
+    st.write("Salaries by Department")
+    salaries = get_analytics(conn, analytics.salary_stats)
+    if salaries is not None and not salaries.empty:
+        st.bar_chart(salaries.set_index("dept_name")["average_salary"])
+        salary_columns = ["Department Name", "Instructors", "Average Salary", "Lowest Salary", "Highest Salary"]
+        grid.render_grid(salaries.set_axis(salary_columns, axis=1))
+
+    st.write("Grade Distribution")
+    course_options = [course[0] for course in data.get("courses") or []]
+    course_id = st.selectbox("Course", course_options, key="analytics_course")
+    if course_id:
+        grades = get_analytics(conn, analytics.grade_distribution, course_id)
+        if grades is not None and not grades.empty:
+            st.bar_chart(grades)
+        elif grades is not None:
+            st.write("No grades recorded for this course.")
+
+    term_options = data.get("terms") or []
+    if term_options:
+        semester, year = st.selectbox("Term", term_options,
+                                      format_func=lambda term: analytics.term_label(*term))
+        st.write("Section Fill Rates")
+        fill_rates = get_analytics(conn, analytics.section_fill_rates, semester, year)
+        if fill_rates is not None and not fill_rates.empty:
+            fill_columns = ["Course ID", "Section ID", "Capacity", "Enrolled", "Fill Rate"]
+            grid.render_grid(fill_rates.set_axis(fill_columns, axis=1))
+
+        st.write("Room Utilization")
+        rooms = get_analytics(conn, analytics.room_utilization, semester, year)
+        if rooms is not None and not rooms.empty:
+            st.caption(f"As of {rooms['refreshed_at'].min()}")
+            room_columns = ["Building", "Room Number", "Capacity", "Sections", "Seats Filled", "Weekly Hours",
+                            "Fill Rate"]
+            grid.render_grid(rooms.drop(columns="refreshed_at").set_axis(room_columns, axis=1))
+        elif rooms is not None:
+            st.write("Not computed for this term yet.")
+        if st.button("Refresh Room Utilization"):
+            if refresh_analytics(conn, semester, year):
+                st.rerun()
+
+
+def page_bulk_import(conn, data):
+    st.subheader("Bulk Import")
+    kind = st.radio("Import", ["students", "enrollments"], format_func=str.title, horizontal=True)
+    columns = ", ".join(bulk_import.IMPORT_KINDS[kind]["columns"])
+    st.caption(f"CSV or Excel file with the columns: {columns}")
+    uploaded = st.file_uploader("File", type=["csv", "xlsx", "xls"])
+
+    if uploaded is not None and st.button("Import"):
+        try:
+            result = import_file(conn, uploaded, uploaded.name, kind)
+        except Exception as e:
+            st.error(f"Error importing {kind}: {e}")
+        else:
+            counts = result.report["status"].value_counts()
+            st.success(f"Inserted {result.inserted} rows; skipped {counts.get('skipped', 0)}, "
+                       f"rejected {counts.get('error', 0)}.")
+            problems = result.report[result.report["status"] != "inserted"]
+            if not problems.empty:
+                grid.render_grid(problems)
+            st.download_button("Download Report", result.report.to_csv(index=False),
+                               file_name=f"{kind}_import_report.csv")
+
+
+def page_performance(conn, data):
+    st.subheader("Query Performance")
+    st.caption(f"Last {instrumentation.BUFFER_SIZE} statements of this app process")
+    query_summary = instrumentation.summary()
+    if query_summary:
+        st.dataframe(pd.DataFrame(query_summary), hide_index=True)
+    else:
+        st.write("No queries recorded yet.")
+
+    threshold = st.number_input("Slow query threshold (ms)", min_value=0.0,
+                                value=float(instrumentation.SLOW_QUERY_MS), step=10.0)
+    slow = instrumentation.slow_queries(threshold)
+    st.write(f"Slow queries: {len(slow)}")
+    if slow:
+        slow_df = pd.DataFrame(slow, columns=instrumentation.QueryRecord._fields)
+        slow_df["at"] = pd.to_datetime(slow_df["at"], unit="s")
+        st.dataframe(slow_df, hide_index=True)
+
+    st.write("Connection pool")
+    st.json(get_pool().stats())
+
+    st.write("Read routing")
+    st.json(get_router().stats())
+
+    metrics = instrumentation.prometheus_text()
+    with st.expander("Prometheus metrics"):
+        st.code(metrics, language="text")
+    st.download_button("Download Metrics", metrics, file_name="metrics.txt")
+    if st.button("Clear Query Log"):
+        instrumentation.clear()
+        st.rerun()
+
+
+def page_exit(conn, data):
+    st.write("Thank you for using the College Management System!")
+    st.stop()
+
+
+# Menu entry -> (icon, render(conn, data), names of the DATA_LOADERS it uses).
+# Only the selected page's render function runs.
+Page = namedtuple("Page", ["icon", "render", "data"])
+
+PAGES = {
+    "View Courses": Page("book", page_view_courses, ()),
+    "Add Student": Page("person-plus", page_add_student, ("departments",)),
+    "View Students": Page("people", page_view_students, ()),
+    "Search": Page("search", page_search, ("courses",)),
+    "Enroll a Student": Page("plus-circle", page_enroll_student, ("courses", "sections")),
+    "Assign Instructor": Page("person-video3", page_assign_instructor, ()),
+    "Add Instructor": Page("person", page_add_instructor, ("departments",)),
+    "Add Course": Page("book-half", page_add_course, ("departments",)),
+    "View Course Details": Page("credit-card-2-front-fill", page_course_details, ()),
+    "Prerequisites": Page("diagram-3", page_prerequisites, ("courses",)),
+    "Transcript": Page("mortarboard", page_transcript, ()),
+    "Timetable Audit": Page("calendar-x", page_timetable_audit, ()),
+    "Analytics": Page("bar-chart", page_analytics, ("courses", "terms")),
+    "Bulk Import": Page("upload", page_bulk_import, ()),
+    "Performance": Page("speedometer2", page_performance, ()),
+    "Exit": Page("door-closed", page_exit, ()),
+}
+MENU_OPTIONS = list(PAGES)
+MENU_ICONS = [page.icon for page in PAGES.values()]
+
+def main():
+    st.title("College Management System")
+    conn = connect_db()
+    if not conn:
+        st.stop()
+    try:
+        show_menu(conn)
+    finally:
+        release_db(conn)
+
+
+def show_menu(conn):
+    if st.sidebar.button("Create Database"):
+        create_tables(conn)
+        seed_data(conn)
+        st.success("Database created and seeded successfully.")
+
+    # Sidebar menu using option_menu
+    with st.sidebar:
+        selected = option_menu(
+            menu_title="Menu",
+            options=MENU_OPTIONS,
+            icons=MENU_ICONS,
+            menu_icon="app-indicator",
+            default_index=0,
+            )
+        schema_version = get_schema_version(conn)
+        if schema_version is not None:
+            st.caption(f"Schema version {schema_version} of {migrations.LATEST_VERSION}")
+        with st.expander("Connection Pool"):
+            pool_stats = get_pool().stats()
+            st.write(f"In use: {pool_stats['in_use']} / {pool_stats['max_size']} (idle: {pool_stats['idle']}, waiting: {pool_stats['waiting']})")
+            st.write(f"Checkouts: {pool_stats['checkouts']}, waits: {pool_stats['waits']}, timeouts: {pool_stats['timeouts']}")
+            st.write(f"Total wait: {pool_stats['wait_time_total']:.3f}s, max wait: {pool_stats['wait_time_max']:.3f}s")
+            routing_stats = get_router().stats()
+            if routing_stats["replica_configured"]:
+                st.write(f"Reads: {routing_stats['replica_reads']} on the replica, {routing_stats['primary_reads']} on the primary")
+
+    page = PAGES[selected]
+    page.render(conn, PageData(conn, page.data))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import asyncio
+import functools
+import threading
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except ImportError:  # command line tools, or a Streamlit without the runtime API
+    add_script_run_ctx = get_script_run_ctx = None
+
+# Async layer over the blocking data-access helpers. Every call borrows its own
+# pooled connection and runs the helper in a worker thread, so the independent
+# queries of a page overlap and the page waits for the slowest one instead of
+# the sum. The helpers keep their signature minus the leading conn argument:
+#
+#   courses, sections = async_db.gather(pool, (view_courses,), (get_sections_for_course, course_id))
+#
+# psycopg2 has no asyncio support, hence threads; each query still holds a
+# connection for its whole duration, so a page issuing n calls at once needs n
+# pool slots.
+
+
+def _script_context():
+    if get_script_run_ctx is None:
+        return None
+    return get_script_run_ctx()
+
+
+def _call_with_connection(pool, context, fn, args):
+    # Let st.error & co. in the helper reach the page that asked for the data
+    if context is not None:
+        add_script_run_ctx(threading.current_thread(), context)
+    with pool.connection() as conn:
+        return fn(conn, *args)
+
+
+async def run(pool, fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _call_with_connection, pool, _script_context(), fn, args)
+
+
+# Async version of a helper fn(conn, *args): await wrap(pool, fn)(*args)
+def wrap(pool, fn):
+    @functools.wraps(fn)
+    async def wrapper(*args):
+        return await run(pool, fn, *args)
+    return wrapper
+
+
+# Run (fn, *args) calls concurrently from synchronous code (a Streamlit script
+# run) and return their results in order. The event loop and its worker
+# threads only live for this call.
+def gather(pool, *calls):
+    async def run_all():
+        return await asyncio.gather(*(run(pool, fn, *args) for fn, *args in calls))
+
+    if len(calls) == 1:
+        fn, *args = calls[0]
+        with pool.connection() as conn:
+            return [fn(conn, *args)]
+    return asyncio.run(run_all())
@@ -0,0 +1,348 @@
+from collections import defaultdict, namedtuple
+
+import course_details
+import enrollment
+import ids
+import prerequisites
+import timetable
+
+# Multi-row write API for admin scripts and integrations. Each function takes
+# a list of records, runs its existence checks as one set-based query per
+# kind of check, writes the accepted records with a single INSERT ... SELECT
+# FROM unnest(...) and returns one Outcome per record, in input order. All of
+# it happens inside the caller's transaction: commit once per batch, then
+# announce the change (cache.invalidate) like the single-row paths do.
+INSERTED = "inserted"
+EXISTS = "already exists"
+DUPLICATE = "duplicate in batch"
+UNKNOWN_DEPARTMENT = "unknown department"
+UNKNOWN_INSTRUCTOR = "unknown instructor"
+UNKNOWN_STUDENT = "unknown student"
+NO_SECTION = enrollment.NO_SECTION
+CLASH = "timetable clash"
+MISSING_PREREQUISITES = "missing prerequisites"
+INVALID = "invalid record"
+
+# detail: the new ID (add_students/add_instructors), the clashing or missing
+# sections/courses of a rejected record, what is wrong with an invalid one,
+# or the waitlist position
+Outcome = namedtuple("Outcome", ["record", "status", "detail"])
+
+_SECTION_KEYS = "SELECT * FROM unnest(%s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[])"
+
+
+def _columns(rows, width):
+    return [list(column) for column in zip(*rows)] if rows else [[] for _ in range(width)]
+
+
+# Record fields checked against the column types; problems go to errors
+def _text(value, field, width, errors, required=True):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if required:
+            errors.append(f"{field} is missing")
+        return None
+    value = str(value)
+    if len(value) > width:
+        errors.append(f"{field} is longer than {width} characters")
+    return value
+
+
+def _number(value, field, errors, required=False):
+    if value is None:
+        if required:
+            errors.append(f"{field} is missing")
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        errors.append(f"{field} is not a whole number")
+        return None
+    if number != value and not isinstance(value, str):
+        errors.append(f"{field} is not a whole number")
+    elif number < 0:
+        errors.append(f"{field} is negative")
+    return number
+
+
+def _student_record(record, errors):
+    student_id, name, dept_name, tot_cred = record
+    return (_text(student_id, "student ID", 10, errors, required=False), _text(name, "name", 50, errors),
+            _text(dept_name, "department", 50, errors), _number(tot_cred, "total credits", errors))
+
+
+def _instructor_record(record, errors):
+    name, dept_name, salary = record
+    return _text(name, "name", 50, errors), _text(dept_name, "department", 50, errors), _number(salary, "salary", errors)
+
+
+def _course_record(record, errors):
+    course_id, title, dept_name, credits = record
+    return (_text(course_id, "course ID", 10, errors), _text(title, "title", 100, errors, required=False),
+            _text(dept_name, "department", 50, errors), _number(credits, "credits", errors))
+
+
+# (resource, course_id, sec_id, semester, year) of teaches and takes records
+def _section_record(resource, record, errors):
+    resource_id, course_id, sec_id, semester, year = record
+    return (resource(resource_id, errors), _text(course_id, "course ID", 10, errors),
+            _text(sec_id, "section ID", 10, errors), _text(semester, "semester", 10, errors),
+            _number(year, "year", errors, required=True))
+
+
+def _teaches_record(record, errors):
+    return _section_record(lambda value, errors: _number(value, "instructor ID", errors, required=True), record, errors)
+
+
+def _takes_record(record, errors):
+    return _section_record(lambda value, errors: _text(value, "student ID", 10, errors), record, errors)
+
+
+# Records normalized by check(record, errors), and {index: INVALID outcome}
+# for those that do not fit the columns, so one bad record never fails the
+# whole batch
+def _validated(records, check):
+    normalized = []
+    outcomes = {}
+    for index, record in enumerate(records):
+        record = tuple(record)
+        errors = []
+        try:
+            fixed = check(record, errors)
+        except (TypeError, ValueError):
+            fixed, errors = record, ["wrong number of fields"]
+        if errors:
+            outcomes[index] = Outcome(record, INVALID, "; ".join(errors))
+        normalized.append(fixed)
+    return normalized, outcomes
+
+
+# Mark every repeat of a key among the records without an outcome yet as a
+# DUPLICATE; returns the indexes of the records still to be checked
+def _first_of_each(records, key, outcomes):
+    seen = set()
+    remaining = []
+    for index, record in enumerate(records):
+        if index in outcomes:
+            continue
+        if key(record) in seen:
+            outcomes[index] = Outcome(record, DUPLICATE, None)
+        else:
+            seen.add(key(record))
+            remaining.append(index)
+    return remaining
+
+
+def _existing_departments(cursor, dept_names):
+    cursor.execute("SELECT dept_name FROM department WHERE dept_name = ANY(%s)", (sorted(set(dept_names)),))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _existing_sections(cursor, sections):
+    cursor.execute(f"""
+        SELECT course_id, sec_id, semester, year FROM section
+        WHERE (course_id, sec_id, semester, year) IN ({_SECTION_KEYS})
+    """, _columns(sorted(set(sections)), 4))
+    return {tuple(row) for row in cursor.fetchall()}
+
+
+# {index: clashing sections} for (resource, course_id, sec_id, semester, year)
+# records of `kind`, checked against the in-memory timetable and against the
+# earlier records of the same batch
+def _clashes(conn, kind, records):
+    found = {}
+    in_batch = defaultdict(timetable.IntervalIndex)
+    for index, (resource, *section) in records:
+        section = tuple(section)
+        schedule = timetable.term_schedule(conn, section[2], section[3])
+        others = [clash.other for clash in schedule.clashes(kind, resource, section)]
+        intervals = schedule.section_intervals.get(section, ())
+        batch_index = in_batch[(resource, section[2], section[3])]
+        for start, end in intervals:
+            others.extend(other for _, _, other in batch_index.overlapping(start, end) if other != section)
+        if others:
+            found[index] = sorted(set(others))
+        else:
+            for start, end in intervals:
+                batch_index.add(start, end, section)
+    return found
+
+
+# (student_id, name, dept_name, tot_cred) records; a student_id of None is
+# allocated from student_id_seq. detail is the student ID.
+def add_students(conn, records):
+    records, outcomes = _validated(records, _student_record)
+    remaining = _first_of_each(records, lambda record: record[0] if record[0] is not None else object(), outcomes)
+    with conn.cursor() as cursor:
+        departments = _existing_departments(cursor, [records[index][2] for index in remaining])
+        cursor.execute("SELECT ID FROM student WHERE ID = ANY(%s)",
+                       (sorted({records[index][0] for index in remaining if records[index][0] is not None}),))
+        existing = {row[0] for row in cursor.fetchall()}
+
+        accepted = []
+        for index in remaining:
+            record = records[index]
+            if record[2] not in departments:
+                outcomes[index] = Outcome(record, UNKNOWN_DEPARTMENT, None)
+            elif record[0] in existing:
+                outcomes[index] = Outcome(record, EXISTS, record[0])
+            else:
+                accepted.append(index)
+
+        new_ids = iter(ids.next_student_ids(conn, sum(records[index][0] is None for index in accepted)))
+        rows = {index: (records[index][0] if records[index][0] is not None else next(new_ids),
+                        *records[index][1:3], records[index][3] or 0) for index in accepted}
+        inserted = set()
+        if rows:
+            cursor.execute("""
+                INSERT INTO student (ID, name, dept_name, tot_cred)
+                SELECT * FROM unnest(%s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[])
+                ON CONFLICT DO NOTHING
+                RETURNING ID
+            """, _columns(list(rows.values()), 4))
+            inserted = {row[0] for row in cursor.fetchall()}
+    ids.advance_student_sequence(conn, [records[index][0] for index in accepted if records[index][0] is not None])
+    for index, row in rows.items():
+        outcomes[index] = Outcome(records[index], INSERTED if row[0] in inserted else EXISTS, row[0])
+    return [outcomes[index] for index in range(len(records))]
+
+
+# (name, dept_name, salary) records; IDs come from instructor_id_seq in one
+# round-trip. detail is the new instructor ID.
+def add_instructors(conn, records):
+    records, outcomes = _validated(records, _instructor_record)
+    remaining = [index for index in range(len(records)) if index not in outcomes]
+    with conn.cursor() as cursor:
+        departments = _existing_departments(cursor, [records[index][1] for index in remaining])
+        accepted = []
+        for index in remaining:
+            record = records[index]
+            if record[1] not in departments:
+                outcomes[index] = Outcome(record, UNKNOWN_DEPARTMENT, None)
+            else:
+                accepted.append(index)
+        new_ids = ids.next_instructor_ids(conn, len(accepted))
+        if accepted:
+            rows = [(new_id, *records[index]) for new_id, index in zip(new_ids, accepted)]
+            cursor.execute("""
+                INSERT INTO instructor (ID, name, dept_name, salary)
+                SELECT * FROM unnest(%s::INT[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[])
+            """, _columns(rows, 4))
+    for new_id, index in zip(new_ids, accepted):
+        outcomes[index] = Outcome(records[index], INSERTED, new_id)
+    return [outcomes[index] for index in range(len(records))]
+
+
+# (course_id, title, dept_name, credits) records
+def add_courses(conn, records):
+    records, outcomes = _validated(records, _course_record)
+    remaining = _first_of_each(records, lambda record: record[0], outcomes)
+    with conn.cursor() as cursor:
+        departments = _existing_departments(cursor, [records[index][2] for index in remaining])
+        cursor.execute("SELECT course_id FROM course WHERE course_id = ANY(%s)",
+                       (sorted({records[index][0] for index in remaining}),))
+        existing = {row[0] for row in cursor.fetchall()}
+        accepted = []
+        for index in remaining:
+            record = records[index]
+            if record[2] not in departments:
+                outcomes[index] = Outcome(record, UNKNOWN_DEPARTMENT, None)
+            elif record[0] in existing:
+                outcomes[index] = Outcome(record, EXISTS, None)
+            else:
+                accepted.append(index)
+        inserted = set()
+        if accepted:
+            cursor.execute("""
+                INSERT INTO course (course_id, title, dept_name, credits)
+                SELECT * FROM unnest(%s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[])
+                ON CONFLICT DO NOTHING
+                RETURNING course_id
+            """, _columns([records[index] for index in accepted], 4))
+            inserted = {row[0] for row in cursor.fetchall()}
+    for index in accepted:
+        outcomes[index] = Outcome(records[index], INSERTED if records[index][0] in inserted else EXISTS, None)
+    return [outcomes[index] for index in range(len(records))]
+
+
+# (instructor_id, course_id, sec_id, semester, year) records. Unknown
+# instructors and sections, existing assignments and timetable clashes are
+# rejected; the course details summary of the touched sections is refreshed.
+def assign_instructors(conn, records):
+    records, outcomes = _validated(records, _teaches_record)
+    remaining = _first_of_each(records, lambda record: record, outcomes)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT ID FROM instructor WHERE ID = ANY(%s)",
+                       (sorted({records[index][0] for index in remaining}),))
+        instructors = {row[0] for row in cursor.fetchall()}
+        sections = _existing_sections(cursor, [records[index][1:] for index in remaining])
+        cursor.execute("""
+            SELECT ID, course_id, sec_id, semester, year FROM teaches
+            WHERE (ID, course_id, sec_id, semester, year) IN (
+                SELECT * FROM unnest(%s::INT[], %s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[])
+            )
+        """, _columns(sorted({records[index] for index in remaining}), 5))
+        existing = {tuple(row) for row in cursor.fetchall()}
+
+        candidates = []
+        for index in remaining:
+            record = records[index]
+            if record[0] not in instructors:
+                outcomes[index] = Outcome(record, UNKNOWN_INSTRUCTOR, None)
+            elif record[1:] not in sections:
+                outcomes[index] = Outcome(record, NO_SECTION, None)
+            elif record in existing:
+                outcomes[index] = Outcome(record, EXISTS, None)
+            else:
+                candidates.append((index, record))
+        clashes = _clashes(conn, timetable.INSTRUCTOR, candidates)
+        for index, others in clashes.items():
+            outcomes[index] = Outcome(records[index], CLASH, others)
+        accepted = [index for index, _ in candidates if index not in clashes]
+
+        inserted = set()
+        if accepted:
+            cursor.execute("""
+                INSERT INTO teaches (ID, course_id, sec_id, semester, year)
+                SELECT * FROM unnest(%s::INT[], %s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[])
+                ON CONFLICT DO NOTHING
+                RETURNING ID, course_id, sec_id, semester, year
+            """, _columns([records[index] for index in accepted], 5))
+            inserted = {tuple(row) for row in cursor.fetchall()}
+    course_details.refresh_sections(conn, [row[1:] for row in inserted])
+    for index in accepted:
+        outcomes[index] = Outcome(records[index], INSERTED if records[index] in inserted else EXISTS, None)
+    return [outcomes[index] for index in range(len(records))]
+
+
+# (student_id, course_id, sec_id, semester, year) requests: unknown students,
+# missing prerequisites and timetable clashes are rejected up front, the rest
+# go through enrollment.enroll_many. Statuses of admitted requests are the
+# enrollment engine's (ENROLLED, WAITLISTED, FULL, ...); detail is the
+# waitlist position.
+def enroll_students(conn, requests, waitlist=True):
+    requests, outcomes = _validated(requests, _takes_record)
+    remaining = _first_of_each(requests, lambda record: record, outcomes)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT ID FROM student WHERE ID = ANY(%s)",
+                       (sorted({requests[index][0] for index in remaining}),))
+        students = {row[0] for row in cursor.fetchall()}
+    missing = prerequisites.missing_prerequisites(conn, sorted({requests[index][:2] for index in remaining}))
+
+    candidates = []
+    for index in remaining:
+        record = requests[index]
+        if record[0] not in students:
+            outcomes[index] = Outcome(record, UNKNOWN_STUDENT, None)
+        elif missing.get(record[:2]):
+            outcomes[index] = Outcome(record, MISSING_PREREQUISITES, missing[record[:2]])
+        else:
+            candidates.append((index, record))
+    clashes = _clashes(conn, timetable.STUDENT, candidates)
+    for index, others in clashes.items():
+        outcomes[index] = Outcome(requests[index], CLASH, others)
+
+    accepted = [index for index, _ in candidates if index not in clashes]
+    admissions = enrollment.enroll_many(conn, [requests[index] for index in accepted], waitlist)
+    for index, admission in zip(accepted, admissions):
+        outcomes[index] = Outcome(requests[index], admission.status, admission.position)
+    return [outcomes[index] for index in range(len(requests))]
@@ -0,0 +1,218 @@
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import async_db
+import reference_data
+
+# Benchmark suite: times every data-access function and every page of the app
+# against whatever data is loaded (use --students to generate a synthetic
+# college first) and writes JSON that can be compared across commits:
+#
+#   python benchmark.py --students 100000 --output before.json
+#   python benchmark.py --output after.json --compare before.json
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _rows(result):
+    if result is None:
+        return None
+    if hasattr(result, "rows"):  # pagination.Page
+        return len(result.rows)
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def measure(name, kind, fn, repeat, warmup=1):
+    try:
+        for _ in range(warmup):
+            fn()
+        samples = []
+        result = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = fn()
+            samples.append((time.perf_counter() - started) * 1000)
+    except Exception as e:
+        return {"name": name, "kind": kind, "error": f"{type(e).__name__}: {e}"}
+    samples.sort()
+    return {
+        "name": name,
+        "kind": kind,
+        "runs": repeat,
+        "rows": _rows(result),
+        "min_ms": samples[0],
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+        "max_ms": samples[-1],
+    }
+
+
+# Representative arguments for the parameterized functions, taken from the data
+def _sample_arguments(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT course_id FROM takes GROUP BY course_id ORDER BY COUNT(*) DESC LIMIT 1
+        """)
+        row = cursor.fetchone()
+        popular_course = row[0] if row else None
+        cursor.execute("SELECT percentile_disc(0.5) WITHIN GROUP (ORDER BY tot_cred) FROM student")
+        median_credits = cursor.fetchone()[0] or 0
+        cursor.execute("""
+            SELECT s.ID, p.course_id
+            FROM (SELECT ID FROM student ORDER BY random() LIMIT 1000) s
+            CROSS JOIN LATERAL (SELECT course_id FROM prereq ORDER BY random() LIMIT 1) p
+        """)
+        prereq_pairs = cursor.fetchall()
+    conn.rollback()
+    return popular_course, median_credits, prereq_pairs
+
+
+def query_benchmarks(app, conn):
+    popular_course, median_credits, prereq_pairs = _sample_arguments(conn)
+
+    def uncached(loader, fn, *more_loaders):
+        def run():
+            for cached_loader in (loader,) + more_loaders:
+                cached_loader.clear()
+            return fn()
+        return run
+
+    def enroll_page_data():
+        return async_db.gather(app.get_pool(), (app.view_courses,),
+                               (app.get_sections_for_course, popular_course))
+
+    return [
+        ("view_courses (uncached)", uncached(reference_data.courses, lambda: app.view_courses(conn))),
+        ("view_courses (cached)", lambda: app.view_courses(conn)),
+        ("get_departments (uncached)", uncached(reference_data.departments, lambda: app.get_departments(conn))),
+        ("get_sections_for_course (uncached)",
+         uncached(reference_data.sections_for_course, lambda: app.get_sections_for_course(conn, popular_course))),
+        ("view_courses + get_sections_for_course (concurrent, uncached)",
+         uncached(reference_data.courses, enroll_page_data, reference_data.sections_for_course)),
+        ("view_students", lambda: app.view_students(conn)),
+        ("view_students_page", lambda: app.view_students_page(conn)),
+        ("view_courses_page", lambda: app.view_courses_page(conn)),
+        ("view_instructors_page", lambda: app.view_instructors_page(conn)),
+        ("count_rows student", lambda: app.count_rows(conn, "student")),
+        ("view_instructors", lambda: app.view_instructors(conn)),
+        ("view_courses_with_department", lambda: app.view_courses_with_department(conn)),
+        ("view_students_with_advisors", lambda: app.view_students_with_advisors(conn)),
+        ("view_average_salary_by_department", lambda: app.view_average_salary_by_department(conn)),
+        ("find_students_by_course", lambda: app.find_students_by_course(conn, popular_course)),
+        ("find_instructors_by_course", lambda: app.find_instructors_by_course(conn, popular_course)),
+        ("view_course_sections_with_capacity", lambda: app.view_course_sections_with_capacity(conn)),
+        ("find_students_by_minimum_credits", lambda: app.find_students_by_minimum_credits(conn, median_credits)),
+        ("get_next_student_id", lambda: app.get_next_student_id(conn)),
+        ("get_course_details", lambda: app.get_course_details(conn, popular_course)),
+        ("check_prerequisites_batch (1000 pairs)", lambda: app.check_prerequisites_batch(conn, prereq_pairs)),
+    ]
+
+
+# Every menu page rendered once per run, Streamlit in bare mode: widgets
+# return their defaults, so this is the cost of a plain rerun of that page
+def page_benchmarks(app):
+    def render(page):
+        def run():
+            app.option_menu = lambda *args, **kwargs: page
+            app.main()
+        return run
+    return [(page, render(page)) for page in app.MENU_OPTIONS if page != "Exit"]
+
+
+def compare(results, baseline, threshold):
+    previous = {(entry["kind"], entry["name"]): entry for entry in baseline["results"]}
+    regressions = []
+    print(f"\n{'benchmark':<50} {'before':>10} {'after':>10} {'change':>8}")
+    for entry in results:
+        before = previous.get((entry["kind"], entry["name"]))
+        if not before or "median_ms" not in before or "median_ms" not in entry:
+            continue
+        change = (entry["median_ms"] - before["median_ms"]) / before["median_ms"] if before["median_ms"] else 0.0
+        flag = " !" if change > threshold else ""
+        print(f"{entry['kind'] + ': ' + entry['name']:<50} {before['median_ms']:>9.2f}ms "
+              f"{entry['median_ms']:>9.2f}ms {change:>+7.0%}{flag}")
+        if change > threshold:
+            regressions.append(entry["name"])
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the query functions and pages.")
+    parser.add_argument("--students", type=int, help="first load a synthetic college of this many students")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-pages", action="store_true")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="median slowdown counted as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    import app
+    import datagen
+
+    pool = app.get_pool()
+    conn = pool.getconn()
+    try:
+        dataset = None
+        if args.students:
+            dataset = datagen.load(conn, args.students, args.seed)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM student")
+            students = cursor.fetchone()[0]
+        conn.rollback()
+
+        results = []
+        for name, fn in query_benchmarks(app, conn):
+            results.append(measure(name, "query", fn, args.repeat))
+            conn.rollback()
+            print(f"query: {name}: {results[-1].get('median_ms', results[-1].get('error'))}")
+    finally:
+        pool.putconn(conn)
+
+    if not args.skip_pages:
+        for name, fn in page_benchmarks(app):
+            results.append(measure(name, "page", fn, args.repeat))
+            print(f"page: {name}: {results[-1].get('median_ms', results[-1].get('error'))}")
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "students": students,
+            "generated": dataset,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as fileobj:
+            json.dump(report, fileobj, indent=2, default=str)
+
+    if args.compare:
+        with open(args.compare) as fileobj:
+            regressions = compare(results, json.load(fileobj), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import argparse
+import io
+import os
+from collections import namedtuple
+
+import pandas as pd
+
+import cache
+import course_details
+import enrollment
+import ids
+import prerequisites
+import timetable
+
+# Column layout of each importable file, in table column order
+IMPORT_KINDS = {
+    "students": {
+        "table": "student",
+        "columns": ["id", "name", "dept_name", "tot_cred"],
+        "required": ["id", "name", "dept_name"],
+        "key": ["id"],
+    },
+    "enrollments": {
+        "table": "takes",
+        "columns": ["id", "course_id", "sec_id", "semester", "year", "grade"],
+        "required": ["id", "course_id", "sec_id", "semester", "year"],
+        "key": ["id", "course_id", "sec_id", "semester", "year"],
+    },
+}
+
+# Widths of the VARCHAR/CHAR columns, checked before COPY so a long value is a
+# row error rather than a failed batch
+COLUMN_WIDTHS = {
+    "id": 10, "name": 50, "dept_name": 50, "course_id": 10, "sec_id": 10, "semester": 10, "grade": 2,
+}
+
+ImportResult = namedtuple("ImportResult", ["inserted", "report"])
+
+
+# Read an uploaded CSV or Excel file into a DataFrame of strings
+def read_file(fileobj, file_name):
+    if os.path.splitext(file_name)[1].lower() in (".xls", ".xlsx"):
+        df = pd.read_excel(fileobj, dtype=str)
+    else:
+        df = pd.read_csv(fileobj, dtype=str, skipinitialspace=True)
+    df.columns = [str(column).strip().lower() for column in df.columns]
+    return df
+
+
+# Append `message` to the error text of every row selected by `mask`
+def _add_errors(errors, mask, message):
+    if mask.any():
+        current = errors[mask]
+        errors[mask] = current.where(current == "", current + "; ") + message
+
+
+# Vectorized checks shared by every kind: missing columns/values, widths,
+# numeric columns and duplicate primary keys within the file. Returns the
+# normalized frame and a Series of error messages ("" for good rows).
+def _validate_common(df, spec):
+    missing_columns = [column for column in spec["required"] if column not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing column(s): {', '.join(missing_columns)}")
+    df = df.reindex(columns=spec["columns"]).astype(object)
+    for column in spec["columns"]:
+        values = df[column].str.strip()
+        df[column] = values.mask(values == "")
+
+    errors = pd.Series("", index=df.index, dtype=object)
+    for column in spec["required"]:
+        _add_errors(errors, df[column].isna(), f"{column} is required")
+    for column in spec["columns"]:
+        width = COLUMN_WIDTHS.get(column)
+        if width:
+            _add_errors(errors, df[column].str.len() > width, f"{column} is longer than {width} characters")
+    for column in ("tot_cred", "year"):
+        if column in df.columns:
+            numbers = pd.to_numeric(df[column], errors="coerce")
+            bad = df[column].notna() & (numbers.isna() | (numbers < 0) | (numbers % 1 != 0))
+            _add_errors(errors, bad, f"{column} must be a whole number >= 0")
+            df[column] = numbers.where(~bad).astype("Int64")
+
+    duplicated = df.duplicated(spec["key"], keep="first") & df[spec["key"]].notna().all(axis=1)
+    _add_errors(errors, duplicated, "duplicate key in file")
+    return df, errors
+
+
+def _validate_students(conn, df, errors):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT dept_name FROM department")
+        departments = {row[0] for row in cursor.fetchall()}
+    _add_errors(errors, df["dept_name"].notna() & ~df["dept_name"].isin(departments), "unknown department")
+    df["tot_cred"] = df["tot_cred"].fillna(0)
+
+
+def _validate_enrollments(conn, df, errors):
+    student_ids = df["id"].dropna().unique().tolist()
+    course_ids = df["course_id"].dropna().unique().tolist()
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT id FROM student WHERE id = ANY(%s)", (student_ids,))
+        students = {row[0] for row in cursor.fetchall()}
+        cursor.execute("""
+            SELECT course_id, sec_id, semester, year
+            FROM section
+            WHERE course_id = ANY(%s)
+        """, (course_ids,))
+        sections = pd.DataFrame(cursor.fetchall(), columns=["course_id", "sec_id", "semester", "year"])
+    _add_errors(errors, df["id"].notna() & ~df["id"].isin(students), "unknown student")
+
+    sections["year"] = sections["year"].astype("Int64")
+    found = df[["course_id", "sec_id", "semester", "year"]].merge(
+        sections.assign(_found=True), how="left", on=["course_id", "sec_id", "semester", "year"]
+    )["_found"].fillna(False).to_numpy(dtype=bool)
+    key_complete = df[["course_id", "sec_id", "semester", "year"]].notna().all(axis=1)
+    _add_errors(errors, key_complete & ~found, "unknown section")
+    prerequisites.validate_enrollments(conn, df, errors)
+    timetable.validate_enrollments(conn, df, errors)
+
+
+# Load good rows with COPY into a temporary staging table and merge them into
+# the target with a single INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+# Returns the keys that were actually inserted.
+def _copy_and_merge(conn, df, spec):
+    table, columns, key = spec["table"], spec["columns"], spec["key"]
+    staging = f"import_{table}"
+    column_list = ", ".join(columns)
+    buffer = io.StringIO()
+    df[columns].to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE TEMP TABLE {staging} (LIKE {table}) ON COMMIT DROP")
+        cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(f"""
+            INSERT INTO {table} ({column_list})
+            SELECT {column_list} FROM {staging}
+            ON CONFLICT ({", ".join(key)}) DO NOTHING
+            RETURNING {", ".join(key)}
+        """)
+        return pd.DataFrame(cursor.fetchall(), columns=key)
+
+
+# Validate and bulk-load a students or enrollments file. Bad rows are reported
+# and skipped; the good ones go in together in one transaction. The report has
+# one line per input row with its spreadsheet line number, status and message.
+def import_frame(conn, df, kind, validators=None):
+    spec = IMPORT_KINDS[kind]
+    df, errors = _validate_common(df, spec)
+    validator = {"students": _validate_students, "enrollments": _validate_enrollments}[kind]
+    validator(conn, df, errors)
+    for extra in validators or ():
+        extra(conn, df, errors)
+
+    report = df[spec["key"]].copy()
+    report.insert(0, "line", df.index + 2)  # +1 for the header, +1 for 1-based lines
+    report["status"] = "error"
+    report["message"] = errors
+
+    good = errors == ""
+    inserted = 0
+    if good.any():
+        try:
+            merged = _copy_and_merge(conn, df[good], spec)
+            if spec["table"] == "student":
+                ids.sync_sequences(conn)
+            if spec["table"] == "takes":
+                # Imported enrollments are authoritative and bypass the seat
+                # check; the seat counters are recounted instead
+                sections = list(merged[["course_id", "sec_id", "semester", "year"]].itertuples(index=False, name=None))
+                course_details.refresh_sections(conn, sections)
+                enrollment.refresh_counts(conn, sections)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        cache.invalidate(spec["table"])
+        inserted = len(merged)
+        merged["_inserted"] = True
+        if "year" in merged.columns:
+            merged["year"] = merged["year"].astype("Int64")
+        was_inserted = df[spec["key"]].merge(merged, how="left", on=spec["key"])["_inserted"]
+        was_inserted = was_inserted.fillna(False).to_numpy(dtype=bool)
+        report.loc[good & was_inserted, "status"] = "inserted"
+        already = good & ~was_inserted
+        report.loc[already, "status"] = "skipped"
+        report.loc[already, "message"] = "already exists"
+    return ImportResult(inserted, report)
+
+
+def import_file(conn, fileobj, file_name, kind, validators=None):
+    return import_frame(conn, read_file(fileobj, file_name), kind, validators)
+
+
+# Command line entry point, e.g.
+#   python bulk_import.py enrollments fall_2024.csv --report errors.csv
+def main(argv=None):
+    import db
+
+    parser = argparse.ArgumentParser(description="Bulk import students or enrollments from CSV/Excel.")
+    parser.add_argument("kind", choices=sorted(IMPORT_KINDS))
+    parser.add_argument("file")
+    parser.add_argument("--report", help="write the per-row report to this CSV file")
+    args = parser.parse_args(argv)
+
+    conn = db.connect()
+    try:
+        with open(args.file, "rb") as fileobj:
+            result = import_file(conn, fileobj, args.file, args.kind)
+    finally:
+        conn.close()
+
+    counts = result.report["status"].value_counts()
+    print(f"Inserted: {result.inserted}, skipped: {counts.get('skipped', 0)}, errors: {counts.get('error', 0)}")
+    if args.report:
+        result.report.to_csv(args.report, index=False)
+    else:
+        problems = result.report[result.report["status"] != "inserted"]
+        if not problems.empty:
+            print(problems.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
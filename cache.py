@@ -0,0 +1,73 @@
+import functools
+import os
+import threading
+import time
+from collections import defaultdict
+
+# How long cached reference data may be served before it is re-read. Writes made
+# through this app invalidate immediately; the TTL only bounds how stale data
+# written by another process (or by hand in psql) can get.
+DEFAULT_TTL = float(os.environ.get("COLLEGE_CACHE_TTL", "300"))
+
+_listeners = defaultdict(list)
+_listeners_lock = threading.Lock()
+
+
+# Register callback(table, **detail) to run whenever one of `tables` changes
+def subscribe(callback, *tables):
+    with _listeners_lock:
+        for table in tables:
+            _listeners[table].append(callback)
+
+
+# Announce that `tables` were written (no tables means everything changed).
+# Extra keyword arguments are passed through to the listeners, e.g. the keys
+# of the rows that changed.
+def invalidate(*tables, **detail):
+    with _listeners_lock:
+        if tables:
+            targets = [(table, callback) for table in tables for callback in _listeners.get(table, ())]
+        else:
+            targets = [(table, callback) for table, callbacks in _listeners.items() for callback in callbacks]
+    seen = set()
+    for table, callback in targets:
+        if tables or callback not in seen:
+            seen.add(callback)
+            callback(table, **detail)
+
+
+# Read-through cache for loader(conn, *args). Results are shared by every
+# session in the process, keyed on args (the connection is ignored), kept for
+# `ttl` seconds and dropped as soon as one of `tables` is invalidated.
+# Loaders must raise on error so failures are never cached, and callers must
+# treat the returned value as read-only.
+def cached(*tables, ttl=None):
+    def decorator(loader):
+        store = {}
+        lock = threading.Lock()
+        generation = [0]
+
+        @functools.wraps(loader)
+        def wrapper(conn, *args):
+            now = time.monotonic()
+            with lock:
+                hit = store.get(args)
+                if hit is not None and hit[0] > now:
+                    return hit[1]
+                seen_generation = generation[0]
+            value = loader(conn, *args)
+            with lock:
+                # Don't keep a result read before a concurrent invalidation
+                if generation[0] == seen_generation:
+                    store[args] = (now + (DEFAULT_TTL if ttl is None else ttl), value)
+            return value
+
+        def clear(table=None, **detail):
+            with lock:
+                generation[0] += 1
+                store.clear()
+
+        wrapper.clear = clear
+        subscribe(clear, *tables)
+        return wrapper
+    return decorator
@@ -0,0 +1,79 @@
+# Precomputed "View Course Details" rows, one per section meeting time, kept in
+# course_details_summary (migration 3). Instructors and students are
+# aggregated in separate lateral subqueries instead of one big join, so a
+# section with n students and m instructors costs n + m rows, not n * m.
+SUMMARY_COLUMNS = """
+    course_id, sec_id, semester, year, day, start_hour, start_minute,
+    course_title, instructor_names, end_hour, end_minute, enrolled_students
+"""
+
+SUMMARY_SELECT = """
+    SELECT
+        s.course_id, s.sec_id, s.semester, s.year, ts.day, ts.start_hour, ts.start_minute,
+        c.title, ins.names, ts.end_hour, ts.end_minute, stu.names
+    FROM section s
+    JOIN course c ON c.course_id = s.course_id
+    JOIN time_slot ts ON ts.time_slot_id = s.time_slot_id
+    CROSS JOIN LATERAL (
+        SELECT STRING_AGG(DISTINCT i.name, ', ') AS names
+        FROM teaches t
+        JOIN instructor i ON t.ID = i.ID
+        WHERE t.course_id = s.course_id AND t.sec_id = s.sec_id AND t.semester = s.semester AND t.year = s.year
+    ) ins
+    CROSS JOIN LATERAL (
+        SELECT STRING_AGG(DISTINCT st.name, ', ') AS names
+        FROM takes tk
+        JOIN student st ON tk.ID = st.ID
+        WHERE tk.course_id = s.course_id AND tk.sec_id = s.sec_id AND tk.semester = s.semester AND tk.year = s.year
+    ) stu
+    WHERE ins.names IS NOT NULL  -- like the old inner join on teaches: only taught sections
+"""
+
+
+# Recompute the summary rows of the given sections, (course_id, sec_id,
+# semester, year) tuples, inside the caller's transaction. A transaction-level
+# advisory lock per section serializes concurrent refreshes of the same
+# section, so the last writer always rebuilds from everyone's committed rows.
+def refresh_sections(conn, sections):
+    sections = sorted(set(sections))
+    if not sections:
+        return
+    columns = [list(column) for column in zip(*sections)]
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT pg_advisory_xact_lock(hashtext(concat_ws('|', 'course_details', c, s, m, y::TEXT)))
+            FROM unnest(%s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[]) AS k(c, s, m, y)
+        """, columns)
+        cursor.execute("""
+            DELETE FROM course_details_summary
+            WHERE (course_id, sec_id, semester, year) IN (
+                SELECT * FROM unnest(%s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[])
+            )
+        """, columns)
+        cursor.execute(f"""
+            INSERT INTO course_details_summary ({SUMMARY_COLUMNS})
+            {SUMMARY_SELECT}
+            AND (s.course_id, s.sec_id, s.semester, s.year) IN (
+                SELECT * FROM unnest(%s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[])
+            )
+        """, columns)
+
+
+# Full rebuild inside the caller's transaction, e.g. after reseeding
+def rebuild(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("LOCK TABLE course_details_summary IN EXCLUSIVE MODE")
+        cursor.execute("DELETE FROM course_details_summary")
+        cursor.execute(f"INSERT INTO course_details_summary ({SUMMARY_COLUMNS}) {SUMMARY_SELECT}")
+
+
+def get_course_details(conn, course_id):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT course_id, course_title, sec_id, instructor_names, semester, year,
+                   day, start_hour, start_minute, end_hour, end_minute, enrolled_students
+            FROM course_details_summary
+            WHERE course_id = %s
+            ORDER BY semester, year, sec_id, day, start_hour, start_minute
+        """, (course_id,))
+        return cursor.fetchall()
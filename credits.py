@@ -0,0 +1,98 @@
+import argparse
+
+from prerequisites import PASSING_GRADE_SQL
+
+# student.tot_cred is transfer_cred (credits earned elsewhere, migration 10)
+# plus the credits of every passed course. The takes and course triggers of
+# migration 6 keep it current: a passing grade appearing or disappearing adds
+# or subtracts the course's credits, so find_students_by_minimum_credits never
+# has to recompute it. rebuild() is the one-shot repair for drift, e.g. from
+# rows loaded with triggers off.
+EARNED_SQL = f"""
+    SELECT t.ID, SUM(c.credits) AS earned
+    FROM takes t
+    JOIN course c ON c.course_id = t.course_id
+    WHERE t.{PASSING_GRADE_SQL}
+    GROUP BY t.ID
+"""
+
+
+# (ID, tot_cred, transfer_cred, earned) of every student whose tot_cred is off
+def drift(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT st.ID, st.tot_cred, st.transfer_cred, COALESCE(e.earned, 0)
+            FROM student st
+            LEFT JOIN ({EARNED_SQL}) e ON e.ID = st.ID
+            WHERE st.tot_cred IS DISTINCT FROM st.transfer_cred + COALESCE(e.earned, 0)
+            ORDER BY st.ID
+        """)
+        rows = cursor.fetchall()
+    conn.rollback()
+    return rows
+
+
+# Set every student's tot_cred to their transfer credits plus the credits of
+# their passed courses in one statement, touching only the rows that are off;
+# returns how many were fixed (caller commits)
+def rebuild(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE student st SET tot_cred = fixed.total
+            FROM (
+                SELECT s.ID, s.transfer_cred + COALESCE(e.earned, 0) AS total
+                FROM student s
+                LEFT JOIN ({EARNED_SQL}) e ON e.ID = s.ID
+            ) fixed
+            WHERE st.ID = fixed.ID AND st.tot_cred IS DISTINCT FROM fixed.total
+        """)
+        return cursor.rowcount
+
+
+# Split tot_cred of rows loaded with triggers off (fixtures) into transfer
+# credits and passed courses: whatever tot_cred holds beyond the passed
+# courses was earned elsewhere. tot_cred below the passed courses is raised to
+# them. (caller commits)
+def derive_transfer(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE student st
+            SET transfer_cred = GREATEST(COALESCE(st.tot_cred, 0) - fixed.earned, 0),
+                tot_cred = GREATEST(COALESCE(st.tot_cred, 0), fixed.earned)
+            FROM (
+                SELECT s.ID, COALESCE(e.earned, 0) AS earned
+                FROM student s
+                LEFT JOIN ({EARNED_SQL}) e ON e.ID = s.ID
+            ) fixed
+            WHERE st.ID = fixed.ID
+        """)
+
+
+# python credits.py --check
+# python credits.py
+def main(argv=None):
+    import cache
+    import db
+
+    parser = argparse.ArgumentParser(description="Recompute student.tot_cred from transfer credits and passed courses.")
+    parser.add_argument("--check", action="store_true", help="only report students whose tot_cred is off")
+    args = parser.parse_args(argv)
+
+    conn = db.connect()
+    try:
+        if args.check:
+            rows = drift(conn)
+            for student_id, tot_cred, transfer_cred, earned in rows[:50]:
+                print(f"{student_id}: tot_cred {tot_cred}, transfer {transfer_cred} + earned {earned}")
+            print(f"{len(rows)} student(s) drifted")
+            return
+        fixed = rebuild(conn)
+        conn.commit()
+        cache.invalidate("student")
+        print(f"Fixed tot_cred of {fixed} student(s)")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import argparse
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+import seeding
+
+# Synthetic large-college data in the textbook university schema, scaled from
+# the number of students. Everything is generated with NumPy and loaded with
+# COPY, students (with their advisors and enrollments) in batches so memory
+# stays flat however many students are asked for.
+STUDENT_BATCH_SIZE = 50000
+COPY_CHUNK_ROWS = 200000
+
+SEMESTERS = ["Spring", "Summer", "Fall"]
+# Enrollment share of each semester, summer being quiet
+SEMESTER_WEIGHTS = [0.46, 0.08, 0.46]
+GRADES = ["A", "A-", "B+", "B", "B-", "C+", "C", "C-", "D", "F"]
+GRADE_WEIGHTS = [0.17, 0.13, 0.13, 0.14, 0.1, 0.09, 0.09, 0.05, 0.05, 0.05]
+
+# The textbook time slots (time_slot_id, day, start_hour, start_minute, end_hour, end_minute)
+TIME_SLOTS = [
+    ("A", "M", 8, 0, 8, 50), ("A", "W", 8, 0, 8, 50), ("A", "F", 8, 0, 8, 50),
+    ("B", "M", 9, 0, 9, 50), ("B", "W", 9, 0, 9, 50), ("B", "F", 9, 0, 9, 50),
+    ("C", "M", 11, 0, 11, 50), ("C", "W", 11, 0, 11, 50), ("C", "F", 11, 0, 11, 50),
+    ("D", "M", 13, 0, 13, 50), ("D", "W", 13, 0, 13, 50), ("D", "F", 13, 0, 13, 50),
+    ("E", "T", 10, 30, 11, 45), ("E", "R", 10, 30, 11, 45),
+    ("F", "T", 14, 30, 15, 45), ("F", "R", 14, 30, 15, 45),
+    ("G", "M", 16, 0, 16, 50), ("G", "W", 16, 0, 16, 50), ("G", "F", 16, 0, 16, 50),
+    ("H", "W", 10, 0, 12, 30),
+]
+
+_SYLLABLES = ["ka", "ri", "mo", "an", "el", "so", "ta", "vi", "ne", "lu", "ha", "per", "zo", "ist", "ban",
+              "dor", "mi", "chen", "ow", "ski", "ra", "te", "lin", "gu", "ya", "ber", "to", "sa", "ng", "es"]
+_SUBJECTS = ["Biology", "Chemistry", "Comp. Sci.", "Economics", "Elec. Eng.", "Finance", "History", "Linguistics",
+             "Mathematics", "Mech. Eng.", "Music", "Philosophy", "Physics", "Psychology", "Sociology", "Statistics"]
+_TOPICS = ["Introduction to", "Foundations of", "Topics in", "Advanced", "Applied", "Principles of",
+           "Seminar in", "Methods in", "Theory of", "Laboratory in"]
+_BUILDINGS = ["Packard", "Painter", "Taylor", "Watson", "Lamberton", "Chandler", "Fairchild", "Nassau",
+              "Whitman", "Saucon", "Alumni", "Garfield"]
+
+
+# Table sizes for a given number of students
+def scale(students):
+    return {
+        "students": students,
+        "departments": int(min(len(_SUBJECTS) * 4, max(7, students // 2500))),
+        "instructors": max(12, students // 20),
+        "courses": max(13, students // 25),
+        "classrooms": max(5, students // 150),
+        "years": 4,
+        "enrollments_per_student": 10,
+    }
+
+
+def _names(rng, count, syllables=3):
+    parts = rng.choice(_SYLLABLES, size=(count, syllables))
+    names = pd.Series(["".join(row) for row in parts])
+    return names.str.capitalize().str.slice(0, 50)
+
+
+def _copy(cursor, table, df):
+    for start in range(0, len(df), COPY_CHUNK_ROWS):
+        buffer = io.StringIO()
+        df.iloc[start:start + COPY_CHUNK_ROWS].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+# Generate the reference tables: departments, classrooms, time slots, courses
+# (with a prerequisite DAG), instructors, sections and teaches
+def generate_reference(rng, sizes, first_year):
+    n_depts = sizes["departments"]
+    depts = pd.DataFrame({
+        "dept_name": [_SUBJECTS[i % len(_SUBJECTS)] + (f" {i // len(_SUBJECTS) + 1}" if i >= len(_SUBJECTS) else "")
+                      for i in range(n_depts)],
+    })
+    depts["building"] = rng.choice(_BUILDINGS, n_depts)
+    depts["budget"] = rng.integers(50, 150, n_depts) * 1000
+
+    n_rooms = sizes["classrooms"]
+    rooms = pd.DataFrame({
+        "building": rng.choice(_BUILDINGS, n_rooms),
+        "room_number": rng.integers(100, 4000, n_rooms).astype(str),
+    }).drop_duplicates(ignore_index=True)
+    # Mostly small rooms, a few lecture halls
+    rooms["capacity"] = np.clip(rng.lognormal(3.6, 0.6, len(rooms)).astype(int), 10, 500)
+
+    time_slots = pd.DataFrame(TIME_SLOTS, columns=["time_slot_id", "day", "start_hour", "start_minute",
+                                                   "end_hour", "end_minute"])
+
+    # Courses: numbered within their department; higher numbers are more advanced
+    n_courses = sizes["courses"]
+    course_dept = rng.integers(0, n_depts, n_courses)
+    course_number = rng.integers(100, 500, n_courses)
+    courses = pd.DataFrame({
+        "dept_index": course_dept,
+        "number": course_number,
+        "dept_name": depts["dept_name"].to_numpy()[course_dept],
+    })
+    courses["course_id"] = ("C" + courses["dept_index"].astype(str) + "-" + courses["number"].astype(str))
+    courses = courses.drop_duplicates("course_id", ignore_index=True)
+    courses["title"] = (pd.Series(rng.choice(_TOPICS, len(courses))) + " " + courses["dept_name"]
+                        + " " + courses["number"].astype(str)).str.slice(0, 100)
+    courses["credits"] = rng.choice([3, 4], len(courses), p=[0.6, 0.4])
+    # Popularity follows a power law: a few courses get most of the enrollments
+    courses["popularity"] = rng.pareto(1.2, len(courses)) + 1
+
+    # Prerequisites: up to three lower-numbered courses of the same department,
+    # so the graph is acyclic by construction
+    prereqs = []
+    for _, group in courses.groupby("dept_index"):
+        ordered = group.sort_values("number")
+        ids = ordered["course_id"].to_numpy()
+        for position in range(1, len(ids)):
+            count = rng.choice([0, 0, 1, 1, 2, 3])
+            if count:
+                chosen = rng.choice(ids[:position], size=min(count, position), replace=False)
+                prereqs.extend((ids[position], prereq_id) for prereq_id in chosen)
+    prereq = pd.DataFrame(prereqs, columns=["course_id", "prereq_id"])
+
+    n_instructors = sizes["instructors"]
+    instructors = pd.DataFrame({
+        "id": np.arange(10001, 10001 + n_instructors),
+        "name": _names(rng, n_instructors),
+        "dept_name": depts["dept_name"].to_numpy()[rng.integers(0, n_depts, n_instructors)],
+        "salary": (rng.normal(80000, 15000, n_instructors).clip(30000, 200000) // 100 * 100).astype(int),
+    })
+
+    # Sections: every course runs in a random subset of terms, popular courses
+    # with several sections per term
+    terms = [(semester, year) for year in range(first_year, first_year + sizes["years"]) for semester in SEMESTERS]
+    section_rows = []
+    for course_id, popularity in zip(courses["course_id"], courses["popularity"]):
+        offered = rng.random(len(terms)) < min(0.9, 0.25 + popularity / 10)
+        for (semester, year), runs in zip(terms, offered):
+            if runs:
+                for sec_id in range(1, 1 + min(6, max(1, int(popularity // 2)))):
+                    section_rows.append((course_id, str(sec_id), semester, year))
+    sections = pd.DataFrame(section_rows, columns=["course_id", "sec_id", "semester", "year"])
+    room_index = rng.integers(0, len(rooms), len(sections))
+    sections["building"] = rooms["building"].to_numpy()[room_index]
+    sections["room_number"] = rooms["room_number"].to_numpy()[room_index]
+    sections["time_slot_id"] = rng.choice(sorted(time_slots["time_slot_id"].unique()), len(sections))
+
+    # Teaches: one instructor per section, rarely two, from the course's department when possible
+    by_dept = instructors.groupby("dept_name")["id"].apply(np.array).to_dict()
+    course_dept_name = courses.set_index("course_id")["dept_name"]
+    teaches_rows = []
+    for row in sections.itertuples(index=False):
+        pool = by_dept.get(course_dept_name[row.course_id], instructors["id"].to_numpy())
+        count = 2 if rng.random() < 0.05 and len(pool) > 1 else 1
+        for instructor_id in rng.choice(pool, size=count, replace=False):
+            teaches_rows.append((int(instructor_id), row.course_id, row.sec_id, row.semester, row.year))
+    teaches = pd.DataFrame(teaches_rows, columns=["id", "course_id", "sec_id", "semester", "year"])
+
+    return {
+        "department": depts,
+        "classroom": rooms,
+        "time_slot": time_slots,
+        "course": courses[["course_id", "title", "dept_name", "credits"]],
+        "prereq": prereq,
+        "instructor": instructors,
+        "section": sections,
+        "teaches": teaches,
+        "_course_popularity": courses[["course_id", "popularity", "credits"]],
+    }
+
+
+# Generate one batch of students with their advisor and takes rows
+def generate_students(rng, reference, first_id, count, id_width, sizes, last_term):
+    depts = reference["department"]["dept_name"].to_numpy()
+    students = pd.DataFrame({
+        "id": [str(i).zfill(id_width) for i in range(first_id, first_id + count)],
+        "name": _names(rng, count),
+        "dept_name": rng.choice(depts, count),
+    })
+
+    instructors = reference["instructor"]
+    advisor = pd.DataFrame({
+        "s_id": students["id"],
+        "i_id": instructors["id"].to_numpy()[rng.integers(0, len(instructors), count)],
+    }).sample(frac=0.85, random_state=int(rng.integers(1 << 31)))
+
+    # Enrollments: sections drawn with probability proportional to their
+    # course's popularity, then de-duplicated per student, course and term
+    sections = reference["section"]
+    popularity = reference["_course_popularity"].set_index("course_id")
+    term_weight = sections["semester"].map(dict(zip(SEMESTERS, SEMESTER_WEIGHTS))).to_numpy()
+    weights = popularity.loc[sections["course_id"], "popularity"].to_numpy() * term_weight
+    weights = weights / weights.sum()
+    per_student = rng.poisson(sizes["enrollments_per_student"], count)
+    student_index = np.repeat(np.arange(count), per_student)
+    section_index = rng.choice(len(sections), size=len(student_index), p=weights)
+    takes = sections.iloc[section_index][["course_id", "sec_id", "semester", "year"]].reset_index(drop=True)
+    takes.insert(0, "id", students["id"].to_numpy()[student_index])
+    takes = takes.drop_duplicates(["id", "course_id", "semester", "year"], ignore_index=True)
+
+    # Past terms are graded, the most recent term is still in progress
+    in_progress = (takes["year"] == last_term[1]) & (takes["semester"] == last_term[0])
+    takes["grade"] = rng.choice(GRADES, len(takes), p=GRADE_WEIGHTS)
+    takes.loc[in_progress, "grade"] = None
+
+    credits = popularity["credits"]
+    passed = takes["grade"].notna() & (takes["grade"] != "F")
+    earned = takes.loc[passed].assign(credits=credits.loc[takes.loc[passed, "course_id"]].to_numpy())
+    students["tot_cred"] = students["id"].map(earned.groupby("id")["credits"].sum()).fillna(0).astype(int)
+    return students, advisor, takes
+
+
+# Insert a synthetic college of `students` students into empty tables inside
+# the caller's transaction; returns the row count per table
+def generate_into(conn, students=1000, seed=42, first_year=2017, progress=print):
+    rng = np.random.default_rng(seed)
+    sizes = scale(students)
+    reference = generate_reference(rng, sizes, first_year)
+    last_term = (SEMESTERS[-1], first_year + sizes["years"] - 1)
+    id_width = max(5, len(str(students)))
+    counts = {}
+    started = time.perf_counter()
+
+    with conn.cursor() as cursor:
+        for table in ("department", "classroom", "time_slot", "course", "prereq", "instructor", "section", "teaches"):
+            _copy(cursor, table, reference[table])
+            counts[table] = len(reference[table])
+            progress(f"{table}: {counts[table]} rows ({time.perf_counter() - started:.1f}s)")
+
+        for table in ("student", "advisor", "takes"):
+            counts[table] = 0
+        for first in range(0, students, STUDENT_BATCH_SIZE):
+            count = min(STUDENT_BATCH_SIZE, students - first)
+            batch = generate_students(rng, reference, first + 1, count, id_width, sizes, last_term)
+            for table, df in zip(("student", "advisor", "takes"), batch):
+                _copy(cursor, table, df)
+                counts[table] += len(df)
+            progress(f"students: {first + count}/{students} ({time.perf_counter() - started:.1f}s)")
+    return counts
+
+
+# Replace the database contents with a synthetic college (the "synthetic"
+# fixture set) and return the row count per table
+def load(conn, students=1000, seed=42):
+    counts = {}
+    seeding.seed(conn, "synthetic", analyze=True, students=students, seed=seed, counts=counts)
+    return counts
+
+
+def main(argv=None):
+    import db
+
+    parser = argparse.ArgumentParser(description="Load a synthetic large-college dataset.")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    conn = db.connect()
+    try:
+        counts = load(conn, args.students, args.seed)
+    finally:
+        conn.close()
+    print(", ".join(f"{table}: {count}" for table, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
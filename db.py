@@ -0,0 +1,211 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+# Connection settings, overridable from the environment
+DB_CONFIG = {
+    "dbname": os.environ.get("COLLEGE_DB_NAME", "assignment"),
+    "user": os.environ.get("COLLEGE_DB_USER", "postgres"),
+    "password": os.environ.get("COLLEGE_DB_PASSWORD", "1513"),
+    "host": os.environ.get("COLLEGE_DB_HOST", "localhost"),
+}
+
+# Optional streaming replica for read-only reports, e.g.
+# "host=replica.example dbname=assignment user=postgres password=..."
+REPLICA_DSN = os.environ.get("COLLEGE_DB_REPLICA_DSN")
+
+POOL_MAX_SIZE = int(os.environ.get("COLLEGE_DB_POOL_MAX", "20"))
+POOL_TIMEOUT = float(os.environ.get("COLLEGE_DB_POOL_TIMEOUT", "10"))
+# Idle connections older than this are pinged before being handed out
+HEALTH_CHECK_INTERVAL = float(os.environ.get("COLLEGE_DB_HEALTH_CHECK_INTERVAL", "30"))
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+# Plain (unpooled) connection, used by the command line tools. A dsn
+# replaces DB_CONFIG altogether, e.g. connect(dsn=REPLICA_DSN).
+def connect(dsn=None, **overrides):
+    if dsn:
+        conn = psycopg2.connect(dsn, **overrides)
+    else:
+        conn = psycopg2.connect(**{**DB_CONFIG, **overrides})
+    conn.autocommit = False
+    return conn
+
+
+# Thread-safe connection pool. Unlike psycopg2.pool.ThreadedConnectionPool it
+# blocks (up to a timeout) when exhausted instead of failing straight away,
+# checks idle connections before reuse and keeps size/wait metrics.
+class ConnectionPool:
+    def __init__(self, maxconn=POOL_MAX_SIZE, timeout=POOL_TIMEOUT,
+                 health_check_interval=HEALTH_CHECK_INTERVAL, **connect_kwargs):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.connect_kwargs = connect_kwargs
+        self._cond = threading.Condition()
+        self._idle = []  # (conn, returned_at), most recently returned last
+        self._in_use = set()
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._stats = {
+            "connections_created": 0,
+            "connections_discarded": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+        }
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise psycopg2.pool.PoolError("connection pool is closed")
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.maxconn:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"no database connection available after {timeout:.1f}s "
+                            f"(pool size {self.maxconn})"
+                        )
+                    waited = True
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(conn, returned_at):
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._in_use.add(conn)
+                self._stats["checkouts"] += 1
+                if waited:
+                    wait_time = time.monotonic() - started
+                    self._stats["waits"] += 1
+                    self._stats["wait_time_total"] += wait_time
+                    self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait_time)
+            return conn
+
+    def putconn(self, conn, close=False):
+        with self._cond:
+            if conn not in self._in_use:
+                return
+            self._in_use.discard(conn)
+
+        if close or self._closed or not self._reset(conn):
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(
+                size=self._size,
+                max_size=self.maxconn,
+                in_use=len(self._in_use),
+                idle=len(self._idle),
+                waiting=self._waiting,
+            )
+        return stats
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def _connect(self):
+        conn = connect(**self.connect_kwargs)
+        with self._cond:
+            self._stats["connections_created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats["connections_discarded"] += 1
+            self._cond.notify()
+
+    def _is_healthy(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._cond:
+                self._stats["health_check_failures"] += 1
+            return False
+
+    # Roll back whatever the borrower left open so the next session starts clean
+    def _reset(self, conn):
+        if conn.closed:
+            return False
+        try:
+            status = conn.info.transaction_status
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                return False
+            if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            if conn.autocommit:
+                conn.autocommit = False
+            return True
+        except psycopg2.Error:
+            return False
+
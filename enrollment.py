@@ -0,0 +1,433 @@
+import argparse
+import statistics
+import threading
+import time
+from collections import Counter, namedtuple
+
+import course_details
+
+# Enrollment engine. Every section has a row in section_seats (migration 5)
+# holding its capacity (from the classroom; NULL means unlimited) and the
+# number of students enrolled, so admitting a student is a primary key
+# lookup under a row lock instead of a COUNT(*) over takes. Students who find
+# a section full can join its waitlist and are promoted first come, first
+# served when a seat frees up.
+ENROLLED = "enrolled"
+WAITLISTED = "waitlisted"
+ALREADY_ENROLLED = "already enrolled"
+ALREADY_WAITLISTED = "already waitlisted"
+FULL = "full"
+NO_SECTION = "no such section"
+
+# One result per distinct request; position is the place on the waitlist
+Admission = namedtuple("Admission", ["student_id", "section", "status", "position"])
+
+SEATS_SELECT = """
+    SELECT s.course_id, s.sec_id, s.semester, s.year, c.capacity,
+           (SELECT COUNT(*) FROM takes t
+            WHERE t.course_id = s.course_id AND t.sec_id = s.sec_id AND t.semester = s.semester AND t.year = s.year)
+    FROM section s
+    LEFT JOIN classroom c ON c.building = s.building AND c.room_number = s.room_number
+"""
+
+_SECTION_KEYS = "SELECT * FROM unnest(%s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[])"
+
+
+def _columns(rows):
+    return [list(column) for column in zip(*rows)] if rows else [[], [], [], []]
+
+
+# Lock the seat rows of `sections` in key order (so concurrent batches never
+# deadlock) and return {section: [capacity, enrolled]}. Rows missing for a
+# section created after migration 5 are added on the way.
+def _lock_seats(cursor, sections):
+    def lock():
+        cursor.execute(f"""
+            SELECT course_id, sec_id, semester, year, capacity, enrolled
+            FROM section_seats
+            WHERE (course_id, sec_id, semester, year) IN ({_SECTION_KEYS})
+            ORDER BY course_id, sec_id, semester, year
+            FOR UPDATE
+        """, _columns(sections))
+        return {tuple(row[:4]): list(row[4:]) for row in cursor.fetchall()}
+
+    seats = lock()
+    if len(seats) < len(sections):
+        cursor.execute(f"""
+            INSERT INTO section_seats (course_id, sec_id, semester, year, capacity, enrolled)
+            {SEATS_SELECT}
+            WHERE (s.course_id, s.sec_id, s.semester, s.year) IN ({_SECTION_KEYS})
+            ON CONFLICT DO NOTHING
+        """, _columns([section for section in sections if section not in seats]))
+        seats = lock()
+    return seats
+
+
+def _existing(cursor, table, requests):
+    columns = [[request[0] for request in requests]] + _columns([request[1:] for request in requests])
+    cursor.execute(f"""
+        SELECT ID, course_id, sec_id, semester, year FROM {table}
+        WHERE (ID, course_id, sec_id, semester, year) IN (
+            SELECT * FROM unnest(%s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[])
+        )
+    """, columns)
+    return {tuple(row) for row in cursor.fetchall()}
+
+
+def _waitlist_positions(cursor, requests):
+    if not requests:
+        return {}
+    columns = [[request[0] for request in requests]] + _columns([request[1:] for request in requests])
+    cursor.execute("""
+        SELECT w.ID, w.course_id, w.sec_id, w.semester, w.year,
+               (SELECT COUNT(*) FROM waitlist ahead
+                WHERE ahead.course_id = w.course_id AND ahead.sec_id = w.sec_id AND ahead.semester = w.semester
+                  AND ahead.year = w.year AND (ahead.requested_at, ahead.ID) <= (w.requested_at, w.ID))
+        FROM waitlist w
+        WHERE (w.ID, w.course_id, w.sec_id, w.semester, w.year) IN (
+            SELECT * FROM unnest(%s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[])
+        )
+    """, columns)
+    return {tuple(row[:5]): row[5] for row in cursor.fetchall()}
+
+
+def _insert_takes(cursor, requests):
+    columns = [[request[0] for request in requests]] + _columns([request[1:] for request in requests])
+    cursor.execute("""
+        INSERT INTO takes (ID, course_id, sec_id, semester, year)
+        SELECT * FROM unnest(%s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[])
+        ON CONFLICT DO NOTHING
+        RETURNING ID, course_id, sec_id, semester, year
+    """, columns)
+    return [tuple(row) for row in cursor.fetchall()]
+
+
+def _add_enrolled(cursor, counts):
+    sections = sorted(counts)
+    columns = _columns(sections) + [[counts[section] for section in sections]]
+    cursor.execute("""
+        UPDATE section_seats ss SET enrolled = ss.enrolled + d.n
+        FROM unnest(%s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[], %s::INT[]) AS d(c, s, m, y, n)
+        WHERE (ss.course_id, ss.sec_id, ss.semester, ss.year) = (d.c, d.s, d.m, d.y)
+    """, columns)
+
+
+# Admit a batch of (student_id, course_id, sec_id, semester, year) requests
+# inside the caller's transaction. Seats are claimed per section with one
+# counter update, in request order; requests that find their section full
+# join its waitlist (or come back FULL with waitlist=False). Returns one
+# Admission per distinct request, in request order. Prerequisites are the
+# caller's business (prerequisites.missing_prerequisites).
+def enroll_many(conn, requests, waitlist=True):
+    requests = list(dict.fromkeys(tuple(request) for request in requests))
+    if not requests:
+        return []
+    sections = sorted({request[1:] for request in requests})
+    with conn.cursor() as cursor:
+        seats = _lock_seats(cursor, sections)
+        enrolled = _existing(cursor, "takes", requests)
+        waiting = _existing(cursor, "waitlist", requests) if waitlist else set()
+
+        free = {section: None if capacity is None else max(0, capacity - taken)
+                for section, (capacity, taken) in seats.items()}
+        statuses = {}
+        for request in requests:
+            section = request[1:]
+            if section not in seats:
+                statuses[request] = NO_SECTION
+            elif request in enrolled:
+                statuses[request] = ALREADY_ENROLLED
+            elif free[section] is None or free[section] > 0:
+                statuses[request] = ENROLLED
+                if free[section] is not None:
+                    free[section] -= 1
+            elif not waitlist:
+                statuses[request] = FULL
+            elif request in waiting:
+                statuses[request] = ALREADY_WAITLISTED
+            else:
+                statuses[request] = WAITLISTED
+
+        admitted = [request for request in requests if statuses[request] == ENROLLED]
+        queued = [request for request in requests if statuses[request] == WAITLISTED]
+        if admitted:
+            inserted = _insert_takes(cursor, admitted)
+            _add_enrolled(cursor, Counter(row[1:] for row in inserted))
+            if waiting:
+                _remove_from_waitlist(cursor, [request for request in admitted if request in waiting])
+        if queued:
+            columns = [[request[0] for request in queued]] + _columns([request[1:] for request in queued])
+            cursor.execute("""
+                INSERT INTO waitlist (ID, course_id, sec_id, semester, year)
+                SELECT * FROM unnest(%s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[])
+                ON CONFLICT DO NOTHING
+            """, columns)
+        positions = _waitlist_positions(cursor, [request for request in requests
+                                                 if statuses[request] in (WAITLISTED, ALREADY_WAITLISTED)])
+    if admitted:
+        course_details.refresh_sections(conn, {request[1:] for request in admitted})
+    return [Admission(request[0], request[1:], statuses[request], positions.get(request)) for request in requests]
+
+
+def enroll(conn, student_id, course_id, sec_id, semester, year, waitlist=True):
+    return enroll_many(conn, [(student_id, course_id, sec_id, semester, year)], waitlist)[0]
+
+
+def _remove_from_waitlist(cursor, requests):
+    if not requests:
+        return
+    columns = [[request[0] for request in requests]] + _columns([request[1:] for request in requests])
+    cursor.execute("""
+        DELETE FROM waitlist
+        WHERE (ID, course_id, sec_id, semester, year) IN (
+            SELECT * FROM unnest(%s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[])
+        )
+    """, columns)
+
+
+# Fill the free seats of a locked section from the head of its waitlist and
+# return the promoted student IDs
+def _promote(cursor, section, capacity, taken):
+    free = None if capacity is None else capacity - taken
+    if free is not None and free <= 0:
+        return []
+    cursor.execute("""
+        DELETE FROM waitlist
+        WHERE (course_id, sec_id, semester, year, ID) IN (
+            SELECT course_id, sec_id, semester, year, ID FROM waitlist
+            WHERE course_id = %s AND sec_id = %s AND semester = %s AND year = %s
+            ORDER BY requested_at, ID
+            LIMIT %s
+        )
+        RETURNING ID
+    """, (*section, free))
+    candidates = [row[0] for row in cursor.fetchall()]
+    if not candidates:
+        return []
+    promoted = [row[0] for row in _insert_takes(cursor, [(student_id, *section) for student_id in candidates])]
+    if promoted:
+        _add_enrolled(cursor, {section: len(promoted)})
+    return promoted
+
+
+# Drop a student from a section (or from its waitlist) inside the caller's
+# transaction and promote the next waitlisted students. Graded takes rows are
+# history and are never dropped. Returns (dropped, promoted_ids).
+def drop(conn, student_id, course_id, sec_id, semester, year):
+    section = (course_id, sec_id, semester, year)
+    with conn.cursor() as cursor:
+        seats = _lock_seats(cursor, [section])
+        if section not in seats:
+            return False, []
+        cursor.execute("""
+            DELETE FROM waitlist
+            WHERE ID = %s AND course_id = %s AND sec_id = %s AND semester = %s AND year = %s
+        """, (student_id, *section))
+        if cursor.rowcount:
+            return True, []
+        cursor.execute("""
+            DELETE FROM takes
+            WHERE ID = %s AND course_id = %s AND sec_id = %s AND semester = %s AND year = %s AND grade IS NULL
+        """, (student_id, *section))
+        if not cursor.rowcount:
+            return False, []
+        capacity, taken = seats[section]
+        cursor.execute("""
+            UPDATE section_seats SET enrolled = enrolled - 1
+            WHERE course_id = %s AND sec_id = %s AND semester = %s AND year = %s
+        """, section)
+        promoted = _promote(cursor, section, capacity, taken - 1)
+    course_details.refresh_sections(conn, [section])
+    return True, promoted
+
+
+# (capacity, enrolled, waiting) of one section, None if it has no seat row
+def seats(conn, course_id, sec_id, semester, year):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT ss.capacity, ss.enrolled,
+                   (SELECT COUNT(*) FROM waitlist w
+                    WHERE w.course_id = ss.course_id AND w.sec_id = ss.sec_id
+                      AND w.semester = ss.semester AND w.year = ss.year)
+            FROM section_seats ss
+            WHERE ss.course_id = %s AND ss.sec_id = %s AND ss.semester = %s AND ss.year = %s
+        """, (course_id, sec_id, semester, year))
+        return cursor.fetchone()
+
+
+# Recount the seat rows of the given sections from takes, e.g. after a bulk
+# import wrote takes directly (caller commits)
+def refresh_counts(conn, sections):
+    sections = sorted(set(sections))
+    if not sections:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO section_seats (course_id, sec_id, semester, year, capacity, enrolled)
+            {SEATS_SELECT}
+            WHERE (s.course_id, s.sec_id, s.semester, s.year) IN ({_SECTION_KEYS})
+            ORDER BY 1, 2, 3, 4
+            ON CONFLICT (course_id, sec_id, semester, year)
+            DO UPDATE SET capacity = EXCLUDED.capacity, enrolled = EXCLUDED.enrolled
+        """, _columns(sections))
+
+
+# Full rebuild inside the caller's transaction, e.g. after reseeding
+def rebuild(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("LOCK TABLE section_seats IN EXCLUSIVE MODE")
+        cursor.execute("DELETE FROM section_seats")
+        cursor.execute(f"INSERT INTO section_seats (course_id, sec_id, semester, year, capacity, enrolled) {SEATS_SELECT}")
+
+
+# Registration rush: `workers` threads, each with its own pooled connection,
+# enroll `student_ids` into one section, `batch_size` students per
+# transaction. Returns throughput, latency and status counts.
+def rush(pool, section, student_ids, workers=16, batch_size=1, waitlist=True):
+    batches = [student_ids[i:i + batch_size] for i in range(0, len(student_ids), batch_size)]
+    lock = threading.Lock()
+    latencies = []
+    statuses = Counter()
+
+    def worker():
+        with pool.connection() as conn:
+            while True:
+                with lock:
+                    if not batches:
+                        return
+                    batch = batches.pop()
+                started = time.perf_counter()
+                try:
+                    admissions = enroll_many(conn, [(student_id, *section) for student_id in batch], waitlist)
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    admissions = [Admission(student_id, section, f"error: {type(e).__name__}", None)
+                                  for student_id in batch]
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    statuses.update(admission.status for admission in admissions)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(student_ids),
+        "transactions": len(latencies),
+        "seconds": seconds,
+        "requests_per_second": len(student_ids) / seconds if seconds else 0.0,
+        "p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else 0.0,
+        "max_ms": latencies[-1] if latencies else 0.0,
+        "statuses": dict(statuses),
+    }
+
+
+# Counter, real enrollment and waitlist size of a section: the counter must
+# match COUNT(*) and never exceed the capacity
+def check_section(conn, section):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT ss.capacity, ss.enrolled,
+                   (SELECT COUNT(*) FROM takes t
+                    WHERE (t.course_id, t.sec_id, t.semester, t.year) = (ss.course_id, ss.sec_id, ss.semester, ss.year)),
+                   (SELECT COUNT(*) FROM waitlist w
+                    WHERE (w.course_id, w.sec_id, w.semester, w.year) = (ss.course_id, ss.sec_id, ss.semester, ss.year))
+            FROM section_seats ss
+            WHERE (ss.course_id, ss.sec_id, ss.semester, ss.year) = (%s, %s, %s, %s)
+        """, section)
+        row = cursor.fetchone()
+    conn.rollback()
+    return row
+
+
+def _rush_setup(conn, course_id, students):
+    with conn.cursor() as cursor:
+        if course_id:
+            cursor.execute("""
+                SELECT course_id, sec_id, semester, year FROM section_seats
+                WHERE course_id = %s ORDER BY year DESC, semester LIMIT 1
+            """, (course_id,))
+        else:
+            cursor.execute("""
+                SELECT course_id, sec_id, semester, year FROM section_seats
+                ORDER BY enrolled DESC, capacity NULLS LAST LIMIT 1
+            """)
+        section = cursor.fetchone()
+        if section is None:
+            raise SystemExit("No section to enroll into; run the migrations and seed the database first.")
+        cursor.execute("""
+            SELECT st.ID FROM student st
+            WHERE NOT EXISTS (
+                SELECT 1 FROM takes t
+                WHERE t.ID = st.ID AND (t.course_id, t.sec_id, t.semester, t.year) = (%s, %s, %s, %s)
+            )
+            ORDER BY random() LIMIT %s
+        """, (*section, students))
+        student_ids = [row[0] for row in cursor.fetchall()]
+    conn.rollback()
+    return tuple(section), student_ids
+
+
+# Remove what the rush added, so the load test can be repeated
+def _rush_cleanup(conn, section, student_ids):
+    with conn.cursor() as cursor:
+        for table in ("waitlist", "takes"):
+            cursor.execute(f"""
+                DELETE FROM {table}
+                WHERE course_id = %s AND sec_id = %s AND semester = %s AND year = %s AND ID = ANY(%s)
+            """, (*section, student_ids))
+    refresh_counts(conn, [section])
+    course_details.refresh_sections(conn, [section])
+    conn.commit()
+
+
+# python enrollment.py --students 2000 --workers 32
+# python enrollment.py --course CS-101 --batch 50 --keep
+def main(argv=None):
+    import db
+
+    parser = argparse.ArgumentParser(description="Simulate a registration rush on one section.")
+    parser.add_argument("--course", help="course to enroll into (default: the most popular section)")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--batch", type=int, default=1, help="students admitted per transaction")
+    parser.add_argument("--no-waitlist", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="keep the enrollments instead of removing them")
+    args = parser.parse_args(argv)
+
+    pool = db.ConnectionPool(maxconn=args.workers + 1)
+    try:
+        with pool.connection() as conn:
+            section, student_ids = _rush_setup(conn, args.course, args.students)
+        print(f"Section {' '.join(map(str, section))}: {len(student_ids)} students, "
+              f"{args.workers} workers, batches of {args.batch}")
+
+        report = rush(pool, section, student_ids, args.workers, args.batch, not args.no_waitlist)
+        print(f"{report['requests_per_second']:.0f} requests/s over {report['seconds']:.2f}s "
+              f"({report['transactions']} transactions)")
+        print(f"latency p50 {report['p50_ms']:.1f} ms, p95 {report['p95_ms']:.1f} ms, max {report['max_ms']:.1f} ms")
+        for status, count in sorted(report["statuses"].items()):
+            print(f"  {status}: {count}")
+
+        with pool.connection() as conn:
+            capacity, enrolled, counted, waiting = check_section(conn, section)
+            consistent = enrolled == counted and (capacity is None or enrolled <= capacity)
+            print(f"capacity {capacity}, counter {enrolled}, takes rows {counted}, waitlist {waiting}: "
+                  f"{'consistent' if consistent else 'INCONSISTENT'}")
+            if not args.keep:
+                _rush_cleanup(conn, section, student_ids)
+        if not consistent:
+            raise SystemExit(1)
+    finally:
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import argparse
+import csv
+import decimal
+import os
+import shlex
+import tempfile
+import uuid
+
+import streamlit as st
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+CHUNK_SIZE = 5000
+FORMATS = ["CSV", "Parquet"]
+# Largest export the web app serves: Streamlit holds a download in memory
+# until it is fetched, so bigger ones are left to the command line (main)
+WEB_EXPORT_MAX_BYTES = int(os.environ.get("COLLEGE_WEB_EXPORT_MAX_MB", "50")) * 1024 * 1024
+
+
+# Stream the rows of `query` from a server-side (named) cursor, chunk_size rows
+# per round-trip, so only one chunk is ever held in memory. Yields
+# (rows, cursor.description) per chunk.
+def iter_chunks(conn, query, params=None, chunk_size=CHUNK_SIZE):
+    with conn.cursor(name=f"export_{uuid.uuid4().hex}") as cursor:
+        cursor.itersize = chunk_size
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows, cursor.description
+
+
+def write_csv(conn, query, params, columns, fileobj, chunk_size=CHUNK_SIZE):
+    writer = csv.writer(fileobj)
+    writer.writerow(columns)
+    row_count = 0
+    try:
+        for rows, _ in iter_chunks(conn, query, params, chunk_size):
+            writer.writerows(rows)
+            row_count += len(rows)
+    finally:
+        conn.rollback()  # Close the read transaction holding the named cursor
+    return row_count
+
+
+# Postgres type OIDs -> Arrow types; anything else is written as text
+_ARROW_TYPES = {
+    16: "bool_",
+    20: "int64",
+    21: "int16",
+    23: "int32",
+    700: "float32",
+    701: "float64",
+    1700: "float64",  # NUMERIC, e.g. AVG(salary)
+}
+
+
+def _arrow_schema(columns, description):
+    fields = []
+    for name, column in zip(columns, description):
+        type_name = _ARROW_TYPES.get(column.type_code, "string")
+        fields.append(pa.field(name, getattr(pa, type_name)()))
+    return pa.schema(fields)
+
+
+def _arrow_value(value, arrow_type):
+    if value is None:
+        return None
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if pa.types.is_string(arrow_type) and not isinstance(value, str):
+        return str(value)
+    return value
+
+
+def write_parquet(conn, query, params, columns, path, chunk_size=CHUNK_SIZE):
+    if pq is None:
+        raise RuntimeError("Parquet export needs the pyarrow package (pip install pyarrow).")
+    writer = None
+    row_count = 0
+    try:
+        for rows, description in iter_chunks(conn, query, params, chunk_size):
+            if writer is None:
+                schema = _arrow_schema(columns, description)
+                writer = pq.ParquetWriter(path, schema)
+            arrays = [
+                pa.array([_arrow_value(value, field.type) for value in values], type=field.type)
+                for values, field in zip(zip(*rows), schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            row_count += len(rows)
+        if writer is None:  # No rows: still produce a valid file with the column names
+            schema = pa.schema([pa.field(name, pa.string()) for name in columns])
+            writer = pq.ParquetWriter(path, schema)
+    finally:
+        if writer is not None:
+            writer.close()
+        conn.rollback()
+    return row_count
+
+
+# Export to a file on disk in the given format; returns the row count
+def export_to_path(conn, query, params, columns, path, file_format):
+    if file_format == "Parquet":
+        return write_parquet(conn, query, params, columns, path)
+    with open(path, "w", newline="", encoding="utf-8") as fileobj:
+        return write_csv(conn, query, params, columns, fileobj)
+
+
+def _remove_export(exports, state_key):
+    prepared = exports.pop(state_key, None)
+    if prepared and os.path.exists(prepared["path"]):
+        os.remove(prepared["path"])
+
+
+# The command line equivalent of a web export, for results too big to serve
+def _cli_command(file_stem, suffix, params):
+    words = ["python", "export.py", file_stem, f"{file_stem}{suffix}"]
+    for param in params or ():
+        words += ["--param", str(param)]
+    return " ".join(shlex.quote(word) for word in words)
+
+
+# Export controls for a search result. The rows are streamed into a temporary
+# file rather than built up in memory. Files over WEB_EXPORT_MAX_BYTES are
+# dropped with a pointer to the CLI; the file of the session is deleted once
+# it is downloaded or a new export replaces it. export_rows is called like
+# export_to_path once "Prepare Export" is clicked, e.g. a version of it that
+# reads from a replica.
+def render_export(conn, state_key, query, params, columns, file_stem, export_rows=export_to_path):
+    file_format = st.radio("Export format", FORMATS, horizontal=True, key=f"{state_key}_export_format")
+    exports = st.session_state.setdefault("exports", {})
+    if st.button("Prepare Export", key=f"{state_key}_export"):
+        _remove_export(exports, state_key)
+        suffix = ".parquet" if file_format == "Parquet" else ".csv"
+        fd, path = tempfile.mkstemp(prefix=f"{file_stem}_", suffix=suffix)
+        os.close(fd)
+        try:
+            row_count = export_rows(conn, query, params, columns, path, file_format)
+        except Exception as e:
+            os.remove(path)
+            st.error(f"Error exporting {file_stem}: {e}")
+            return
+        size = os.path.getsize(path)
+        if size > WEB_EXPORT_MAX_BYTES:
+            os.remove(path)
+            st.warning(f"The export is {size / 1024 / 1024:.0f} MB ({row_count} rows), more than the "
+                       f"{WEB_EXPORT_MAX_BYTES // 1024 // 1024} MB the web app serves. Run it from the "
+                       f"command line instead:")
+            st.code(_cli_command(file_stem, suffix, params), language="bash")
+            return
+        exports[state_key] = {"path": path, "file_name": f"{file_stem}{suffix}", "rows": row_count}
+
+    prepared = exports.get(state_key)
+    if prepared and os.path.exists(prepared["path"]):
+        with open(prepared["path"], "rb") as fileobj:
+            data = fileobj.read()
+        # Streamlit keeps its own copy of data to serve, so the file can go
+        # as soon as the button is clicked
+        st.download_button(f"Download {prepared['file_name']} ({prepared['rows']} rows)", data,
+                           file_name=prepared["file_name"], key=f"{state_key}_download",
+                           on_click=_remove_export, args=(exports, state_key))
+
+
+# Command line export of a search, e.g.
+#   python export.py students-by-course out.csv --param CS-101
+#   python export.py instructors out.parquet --replica
+def main(argv=None):
+    import app
+    import db
+
+    exports = {spec.slug: spec for spec in app.SEARCH_EXPORTS.values()}
+    parser = argparse.ArgumentParser(description="Stream a search result to CSV or Parquet.")
+    parser.add_argument("search", choices=sorted(exports))
+    parser.add_argument("output", help="output file; .parquet writes Parquet, anything else CSV")
+    parser.add_argument("--param", action="append", default=[], help="search parameter (repeat in order)")
+    parser.add_argument("--replica", action="store_true", help="read from COLLEGE_DB_REPLICA_DSN")
+    args = parser.parse_args(argv)
+
+    spec = exports[args.search]
+    file_format = "Parquet" if args.output.endswith(".parquet") else "CSV"
+    if args.replica and not db.REPLICA_DSN:
+        parser.error("--replica needs COLLEGE_DB_REPLICA_DSN")
+    conn = db.connect(dsn=db.REPLICA_DSN if args.replica else None)
+    try:
+        row_count = export_to_path(conn, spec.query, tuple(args.param), spec.columns, args.output, file_format)
+    finally:
+        conn.close()
+    print(f"Exported {row_count} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
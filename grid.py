@@ -0,0 +1,22 @@
+import pandas as pd
+import streamlit as st
+
+# Result grid for every listing and search view. st.dataframe draws on a
+# canvas and only renders the rows inside its viewport, and it sorts (click a
+# column header) and searches the loaded rows in the browser, so showing a
+# result costs the same for 50 rows as for 50,000 - unlike st.table, which
+# emits every row as static HTML. Sorting and filtering the full set is done
+# in SQL by pagination.keyset_page.
+ROW_HEIGHT = 35  # px, st.dataframe's default row height
+MAX_HEIGHT = 600  # longer results scroll inside the grid
+
+
+def grid_height(row_count):
+    return min(MAX_HEIGHT, (row_count + 1) * ROW_HEIGHT + 3)
+
+
+# rows is a DataFrame, or row tuples named by columns
+def render_grid(rows, columns=None):
+    # Nullable dtypes, so an integer column with NULLs isn't shown as floats
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows, columns=columns).convert_dtypes()
+    st.dataframe(df, hide_index=True, use_container_width=True, height=grid_height(len(df)))
@@ -0,0 +1,113 @@
+import os
+import re
+import threading
+from collections import deque
+
+import cache
+
+# New IDs come from database sequences (migration 4) instead of
+# MAX(ID) + 1, so concurrent registrations never race or scan the table.
+# Each process can also reserve a block of values per round-trip; unused
+# values of a block are simply skipped when the process exits.
+BLOCK_SIZE = int(os.environ.get("COLLEGE_ID_BLOCK_SIZE", "1"))
+# Student IDs are zero-padded strings of this width
+STUDENT_ID_WIDTH = 10
+
+SEQUENCES = {
+    "student_id_seq": ("student", "ID", r"^[0-9]{1,18}$"),
+    "instructor_id_seq": ("instructor", "ID", None),
+}
+
+
+class IdAllocator:
+    def __init__(self, sequence, block_size=BLOCK_SIZE):
+        self.sequence = sequence
+        self.block_size = max(1, block_size)
+        self._block = deque()
+        self._lock = threading.Lock()
+
+    def next_id(self, conn):
+        with self._lock:
+            if not self._block:
+                with conn.cursor() as cursor:
+                    if self.block_size == 1:
+                        cursor.execute("SELECT nextval(%s)", (self.sequence,))
+                    else:
+                        cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)",
+                                       (self.sequence, self.block_size))
+                    self._block.extend(row[0] for row in cursor.fetchall())
+            return self._block.popleft()
+
+    # `count` IDs at once: what is left of the block, the rest in one round-trip
+    def next_ids(self, conn, count):
+        with self._lock:
+            taken = [self._block.popleft() for _ in range(min(count, len(self._block)))]
+            if len(taken) < count:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)",
+                                   (self.sequence, count - len(taken)))
+                    taken.extend(row[0] for row in cursor.fetchall())
+            return taken
+
+    # Forget the reserved block, e.g. after the sequence was moved by a reseed
+    def reset(self, table=None, **detail):
+        with self._lock:
+            self._block.clear()
+
+
+_student_ids = IdAllocator("student_id_seq")
+_instructor_ids = IdAllocator("instructor_id_seq")
+cache.subscribe(_student_ids.reset, "id_sequences")
+cache.subscribe(_instructor_ids.reset, "id_sequences")
+
+
+def next_student_id(conn):
+    return str(_student_ids.next_id(conn)).zfill(STUDENT_ID_WIDTH)
+
+
+def next_instructor_id(conn):
+    return _instructor_ids.next_id(conn)
+
+
+def next_student_ids(conn, count):
+    return [str(value).zfill(STUDENT_ID_WIDTH) for value in _student_ids.next_ids(conn, count)]
+
+
+def next_instructor_ids(conn, count):
+    return _instructor_ids.next_ids(conn, count)
+
+
+# Move student_id_seq past explicitly given student IDs that were just
+# inserted; unlike sync_sequences this needs no scan of student. IDs handed
+# out by the sequence (e.g. get_next_student_id on the Add Student form) are
+# already behind it: then nothing moves and the reserved blocks stay valid.
+def advance_student_sequence(conn, student_ids):
+    pattern = re.compile(SEQUENCES["student_id_seq"][2])
+    numbers = [int(student_id) for student_id in student_ids if pattern.match(student_id)]
+    if not numbers:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT setval('student_id_seq', %s)
+            FROM student_id_seq
+            WHERE last_value < %s
+        """, (max(numbers), max(numbers)))
+        moved = cursor.rowcount
+    if moved:
+        cache.invalidate("id_sequences")
+
+
+# Move every sequence past the highest ID in its table. Needed after rows
+# with explicit IDs were loaded (seeding, bulk imports); never moves back.
+def sync_sequences(conn):
+    with conn.cursor() as cursor:
+        for sequence, (table, column, pattern) in SEQUENCES.items():
+            value = f"{column}::BIGINT"
+            where = f"WHERE {column} ~ '{pattern}'" if pattern else ""
+            cursor.execute(f"""
+                SELECT setval('{sequence}', GREATEST(
+                    (SELECT last_value FROM {sequence}),
+                    (SELECT COALESCE(MAX({value}), 0) FROM {table} {where})
+                ))
+            """)
+    cache.invalidate("id_sequences")
@@ -0,0 +1,162 @@
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+
+import psycopg2.extensions
+
+logger = logging.getLogger("college.queries")
+
+BUFFER_SIZE = int(os.environ.get("COLLEGE_QUERY_LOG_SIZE", "5000"))
+# Statements slower than this are logged at WARNING level
+SLOW_QUERY_MS = float(os.environ.get("COLLEGE_SLOW_QUERY_MS", "200"))
+
+QueryRecord = namedtuple("QueryRecord", ["at", "function", "fingerprint", "sql", "ms", "rows", "error"])
+
+_records = deque(maxlen=BUFFER_SIZE)
+_lock = threading.Lock()
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_VALUE_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+
+# Generic helpers skipped when looking for the calling function, so a query
+# is attributed to the data-access function that asked for it
+_SKIPPED_MODULES = {"instrumentation.py", "cache.py", "pagination.py", "export.py", "contextlib.py"}
+
+
+# Normalize a statement so runs with different parameters share one
+# fingerprint: literals become ?, multi-row VALUES lists collapse, whitespace
+# is squeezed. Returns (fingerprint, normalized_sql).
+def fingerprint(query):
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    elif not isinstance(query, str):
+        query = str(query)
+    normalized = query.replace("%s", "?")
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _VALUE_LISTS.sub("(...)", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    return hashlib.md5(normalized.encode()).hexdigest()[:12], normalized
+
+
+def _calling_function():
+    frame = sys._getframe(2)
+    fallback = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if "psycopg2" not in filename:
+            if os.path.basename(filename) not in _SKIPPED_MODULES:
+                return frame.f_code.co_name
+            if fallback is None and os.path.basename(filename) != "instrumentation.py":
+                fallback = frame.f_code.co_name
+        frame = frame.f_back
+    return fallback or "<unknown>"
+
+
+def record(function, query, ms, rows, error=None):
+    key, normalized = fingerprint(query)
+    with _lock:
+        _records.append(QueryRecord(time.time(), function, key, normalized, ms, rows, error))
+    if ms >= SLOW_QUERY_MS:
+        logger.warning("slow query %.1f ms in %s (%s rows): %s", ms, function, rows, normalized[:500])
+
+
+# Cursor class that times every execute and records it in the ring buffer.
+# Installed as the connection's cursor_factory, so every data-access function
+# is covered without changes to the functions themselves.
+class TimedCursor(psycopg2.extensions.cursor):
+    def _timed(self, method, query, *args):
+        function = _calling_function()
+        started = time.perf_counter()
+        error = None
+        try:
+            return method(query, *args)
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            text = query.as_string(self) if hasattr(query, "as_string") else query
+            record(function, text, ms, self.rowcount, error)
+
+    def execute(self, query, vars=None):
+        return self._timed(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed(super().executemany, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._timed(super().copy_expert, sql, file, size)
+
+
+def recent(limit=None):
+    with _lock:
+        records = list(_records)
+    return records[-limit:] if limit else records
+
+
+def clear():
+    with _lock:
+        _records.clear()
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+# Per-function latency summary over the records in the buffer
+def summary():
+    by_function = {}
+    for entry in recent():
+        by_function.setdefault(entry.function, []).append(entry)
+    rows = []
+    for function, entries in by_function.items():
+        latencies = sorted(entry.ms for entry in entries)
+        rows.append({
+            "function": function,
+            "calls": len(entries),
+            "errors": sum(1 for entry in entries if entry.error),
+            "rows": sum(max(entry.rows, 0) for entry in entries),
+            "total_ms": sum(latencies),
+            "p50_ms": _percentile(latencies, 0.50),
+            "p95_ms": _percentile(latencies, 0.95),
+            "p99_ms": _percentile(latencies, 0.99),
+            "max_ms": latencies[-1],
+        })
+    return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+
+def slow_queries(threshold_ms=None):
+    threshold_ms = SLOW_QUERY_MS if threshold_ms is None else threshold_ms
+    return sorted((entry for entry in recent() if entry.ms >= threshold_ms), key=lambda entry: entry.ms, reverse=True)
+
+
+# Prometheus text exposition format of summary()
+def prometheus_text():
+    lines = [
+        "# HELP college_query_duration_ms Query latency per calling function (recent window).",
+        "# TYPE college_query_duration_ms summary",
+    ]
+    for row in summary():
+        label = row["function"].replace("\\", "\\\\").replace('"', '\\"')
+        for quantile in ("0.5", "0.95", "0.99"):
+            value = row[{"0.5": "p50_ms", "0.95": "p95_ms", "0.99": "p99_ms"}[quantile]]
+            lines.append(f'college_query_duration_ms{{function="{label}",quantile="{quantile}"}} {value:.3f}')
+        lines.append(f'college_query_duration_ms_sum{{function="{label}"}} {row["total_ms"]:.3f}')
+        lines.append(f'college_query_duration_ms_count{{function="{label}"}} {row["calls"]}')
+    lines.append("# HELP college_query_rows_total Rows returned or affected per calling function (recent window).")
+    lines.append("# TYPE college_query_rows_total gauge")
+    for row in summary():
+        label = row["function"].replace("\\", "\\\\").replace('"', '\\"')
+        lines.append(f'college_query_rows_total{{function="{label}"}} {row["rows"]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,665 @@
+import argparse
+from collections import namedtuple
+
+# Numbered schema migrations. Each one runs once per database and is recorded
+# in schema_migrations, so schema and performance changes can ship against a
+# live database without dropping data. Append new migrations at the end; never
+# edit or renumber one that has been released.
+Migration = namedtuple("Migration", ["version", "description", "steps", "transactional"])
+# CREATE INDEX CONCURRENTLY step; it cannot run inside a transaction
+Index = namedtuple("Index", ["name", "table", "columns", "method"], defaults=["btree"])
+
+# Arbitrary constant for pg_advisory_lock so two app processes never migrate at once
+MIGRATION_LOCK_ID = 72310001
+
+MIGRATIONS = [
+    Migration(1, "Base schema", ["""
+        CREATE TABLE IF NOT EXISTS classroom (
+            building VARCHAR(50),
+            room_number VARCHAR(10),
+            capacity INT,
+            PRIMARY KEY (building, room_number)
+        );
+
+        CREATE TABLE IF NOT EXISTS department (
+            dept_name VARCHAR(50),
+            building VARCHAR(50),
+            budget INT,
+            PRIMARY KEY (dept_name)
+        );
+
+        CREATE TABLE IF NOT EXISTS course (
+            course_id VARCHAR(10),
+            title VARCHAR(100),
+            dept_name VARCHAR(50),
+            credits INT,
+            PRIMARY KEY (course_id),
+            FOREIGN KEY (dept_name) REFERENCES department(dept_name)
+        );
+
+        CREATE TABLE IF NOT EXISTS instructor (
+            ID INT PRIMARY KEY,
+            name VARCHAR(50) NOT NULL,
+            dept_name VARCHAR(50) NOT NULL,
+            salary INT CHECK (salary >= 0),
+            FOREIGN KEY (dept_name) REFERENCES department(dept_name) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS section (
+            course_id VARCHAR(10),
+            sec_id VARCHAR(10),
+            semester VARCHAR(10),
+            year INT,
+            building VARCHAR(50),
+            room_number VARCHAR(10),
+            time_slot_id VARCHAR(5),
+            PRIMARY KEY (course_id, sec_id, semester, year),
+            FOREIGN KEY (course_id) REFERENCES course(course_id),
+            FOREIGN KEY (building, room_number) REFERENCES classroom(building, room_number)
+        );
+
+        CREATE TABLE IF NOT EXISTS teaches (
+            ID INT,
+            course_id VARCHAR(10),
+            sec_id VARCHAR(10),
+            semester VARCHAR(10),
+            year INT,
+            PRIMARY KEY (ID, course_id, sec_id, semester, year),
+            FOREIGN KEY (ID) REFERENCES instructor(ID),
+            FOREIGN KEY (course_id, sec_id, semester, year) REFERENCES section(course_id, sec_id, semester, year)
+        );
+
+        CREATE TABLE IF NOT EXISTS student (
+            ID VARCHAR(10),
+            name VARCHAR(50),
+            dept_name VARCHAR(50),
+            tot_cred INT,
+            PRIMARY KEY (ID),
+            FOREIGN KEY (dept_name) REFERENCES department(dept_name)
+        );
+
+        CREATE TABLE IF NOT EXISTS takes (
+            ID VARCHAR(10),
+            course_id VARCHAR(10),
+            sec_id VARCHAR(10),
+            semester VARCHAR(10),
+            year INT,
+            grade CHAR(2),
+            PRIMARY KEY (ID, course_id, sec_id, semester, year),
+            FOREIGN KEY (ID) REFERENCES student(ID),
+            FOREIGN KEY (course_id, sec_id, semester, year) REFERENCES section(course_id, sec_id, semester, year)
+        );
+
+        CREATE TABLE IF NOT EXISTS advisor (
+            s_ID VARCHAR(10),
+            i_ID INT,
+            PRIMARY KEY (s_ID),
+            FOREIGN KEY (s_ID) REFERENCES student(ID),
+            FOREIGN KEY (i_ID) REFERENCES instructor(ID)
+        );
+
+        CREATE TABLE IF NOT EXISTS time_slot (
+            time_slot_id VARCHAR(5),
+            day VARCHAR(1),
+            start_hour INT,
+            start_minute INT,
+            end_hour INT,
+            end_minute INT,
+            PRIMARY KEY (time_slot_id, day, start_hour, start_minute)
+        );
+
+        CREATE TABLE IF NOT EXISTS prereq (
+            course_id VARCHAR(10),
+            prereq_id VARCHAR(10),
+            PRIMARY KEY (course_id, prereq_id),
+            FOREIGN KEY (course_id) REFERENCES course(course_id),
+            FOREIGN KEY (prereq_id) REFERENCES course(course_id)
+        );
+    """], True),
+    # section(course_id) and time_slot(time_slot_id) are already served by the
+    # leading column of their primary keys, so they need no extra index.
+    Migration(2, "Secondary indexes for course, section and credit lookups", [
+        Index("takes_section_idx", "takes", ["course_id", "sec_id", "semester", "year"]),
+        Index("teaches_course_idx", "teaches", ["course_id", "sec_id", "semester", "year"]),
+        Index("student_tot_cred_idx", "student", ["tot_cred"]),
+    ], False),
+    Migration(3, "Precomputed course details summary", ["""
+        CREATE TABLE IF NOT EXISTS course_details_summary (
+            course_id VARCHAR(10),
+            sec_id VARCHAR(10),
+            semester VARCHAR(10),
+            year INT,
+            day VARCHAR(1),
+            start_hour INT,
+            start_minute INT,
+            course_title VARCHAR(100),
+            instructor_names TEXT,
+            end_hour INT,
+            end_minute INT,
+            enrolled_students TEXT,
+            PRIMARY KEY (course_id, sec_id, semester, year, day, start_hour, start_minute)
+        );
+
+        DELETE FROM course_details_summary;
+
+        INSERT INTO course_details_summary (
+            course_id, sec_id, semester, year, day, start_hour, start_minute,
+            course_title, instructor_names, end_hour, end_minute, enrolled_students
+        )
+        SELECT
+            s.course_id, s.sec_id, s.semester, s.year, ts.day, ts.start_hour, ts.start_minute,
+            c.title, ins.names, ts.end_hour, ts.end_minute, stu.names
+        FROM section s
+        JOIN course c ON c.course_id = s.course_id
+        JOIN time_slot ts ON ts.time_slot_id = s.time_slot_id
+        CROSS JOIN LATERAL (
+            SELECT STRING_AGG(DISTINCT i.name, ', ') AS names
+            FROM teaches t
+            JOIN instructor i ON t.ID = i.ID
+            WHERE t.course_id = s.course_id AND t.sec_id = s.sec_id AND t.semester = s.semester AND t.year = s.year
+        ) ins
+        CROSS JOIN LATERAL (
+            SELECT STRING_AGG(DISTINCT st.name, ', ') AS names
+            FROM takes tk
+            JOIN student st ON tk.ID = st.ID
+            WHERE tk.course_id = s.course_id AND tk.sec_id = s.sec_id AND tk.semester = s.semester AND tk.year = s.year
+        ) stu
+        WHERE ins.names IS NOT NULL;
+    """], True),
+    Migration(4, "Sequences for student and instructor IDs", ["""
+        CREATE SEQUENCE IF NOT EXISTS student_id_seq;
+        CREATE SEQUENCE IF NOT EXISTS instructor_id_seq;
+
+        SELECT setval('student_id_seq', COALESCE(
+            (SELECT MAX(ID::BIGINT) FROM student WHERE ID ~ '^[0-9]{1,18}$'), 0) + 1, false);
+        SELECT setval('instructor_id_seq', COALESCE((SELECT MAX(ID) FROM instructor), 0) + 1, false);
+    """], True),
+    Migration(5, "Section seat counters and waitlist", ["""
+        CREATE TABLE IF NOT EXISTS section_seats (
+            course_id VARCHAR(10),
+            sec_id VARCHAR(10),
+            semester VARCHAR(10),
+            year INT,
+            capacity INT,
+            enrolled INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (course_id, sec_id, semester, year),
+            FOREIGN KEY (course_id, sec_id, semester, year) REFERENCES section(course_id, sec_id, semester, year)
+                ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS waitlist (
+            course_id VARCHAR(10),
+            sec_id VARCHAR(10),
+            semester VARCHAR(10),
+            year INT,
+            ID VARCHAR(10),
+            requested_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+            PRIMARY KEY (course_id, sec_id, semester, year, ID),
+            FOREIGN KEY (ID) REFERENCES student(ID),
+            FOREIGN KEY (course_id, sec_id, semester, year) REFERENCES section(course_id, sec_id, semester, year)
+                ON DELETE CASCADE
+        );
+
+        CREATE INDEX IF NOT EXISTS waitlist_queue_idx ON waitlist (course_id, sec_id, semester, year, requested_at);
+
+        INSERT INTO section_seats (course_id, sec_id, semester, year, capacity, enrolled)
+        SELECT s.course_id, s.sec_id, s.semester, s.year, c.capacity,
+               (SELECT COUNT(*) FROM takes t
+                WHERE t.course_id = s.course_id AND t.sec_id = s.sec_id AND t.semester = s.semester AND t.year = s.year)
+        FROM section s
+        LEFT JOIN classroom c ON c.building = s.building AND c.room_number = s.room_number
+        ON CONFLICT DO NOTHING;
+    """], True),
+    # Statement-level triggers with transition tables: one set-based update
+    # per statement, however many takes rows it touched
+    Migration(6, "Maintain student.tot_cred from passing takes rows", ["""
+        CREATE OR REPLACE FUNCTION takes_tot_cred_sync() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE student st SET tot_cred = COALESCE(st.tot_cred, 0) + d.delta
+                FROM (
+                    SELECT n.ID, SUM(c.credits) AS delta
+                    FROM new_rows n JOIN course c ON c.course_id = n.course_id
+                    WHERE n.grade IS NOT NULL AND n.grade <> 'F'
+                    GROUP BY n.ID
+                ) d
+                WHERE st.ID = d.ID;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE student st SET tot_cred = COALESCE(st.tot_cred, 0) - d.delta
+                FROM (
+                    SELECT o.ID, SUM(c.credits) AS delta
+                    FROM old_rows o JOIN course c ON c.course_id = o.course_id
+                    WHERE o.grade IS NOT NULL AND o.grade <> 'F'
+                    GROUP BY o.ID
+                ) d
+                WHERE st.ID = d.ID;
+            ELSE
+                UPDATE student st SET tot_cred = COALESCE(st.tot_cred, 0) + d.delta
+                FROM (
+                    SELECT changed.ID, SUM(changed.credits) AS delta
+                    FROM (
+                        SELECT n.ID, c.credits
+                        FROM new_rows n JOIN course c ON c.course_id = n.course_id
+                        WHERE n.grade IS NOT NULL AND n.grade <> 'F'
+                        UNION ALL
+                        SELECT o.ID, -c.credits
+                        FROM old_rows o JOIN course c ON c.course_id = o.course_id
+                        WHERE o.grade IS NOT NULL AND o.grade <> 'F'
+                    ) changed
+                    GROUP BY changed.ID
+                    HAVING SUM(changed.credits) <> 0
+                ) d
+                WHERE st.ID = d.ID;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION course_credits_sync() RETURNS trigger AS $$
+        BEGIN
+            UPDATE student st SET tot_cred = COALESCE(st.tot_cred, 0) + d.delta
+            FROM (
+                SELECT t.ID, SUM(n.credits - o.credits) AS delta
+                FROM new_rows n
+                JOIN old_rows o ON o.course_id = n.course_id
+                JOIN takes t ON t.course_id = n.course_id
+                WHERE n.credits IS DISTINCT FROM o.credits AND t.grade IS NOT NULL AND t.grade <> 'F'
+                GROUP BY t.ID
+            ) d
+            WHERE st.ID = d.ID;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS takes_tot_cred_insert ON takes;
+        DROP TRIGGER IF EXISTS takes_tot_cred_update ON takes;
+        DROP TRIGGER IF EXISTS takes_tot_cred_delete ON takes;
+        DROP TRIGGER IF EXISTS course_credits_update ON course;
+
+        CREATE TRIGGER takes_tot_cred_insert AFTER INSERT ON takes
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE takes_tot_cred_sync();
+        CREATE TRIGGER takes_tot_cred_update AFTER UPDATE ON takes
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE takes_tot_cred_sync();
+        CREATE TRIGGER takes_tot_cred_delete AFTER DELETE ON takes
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE takes_tot_cred_sync();
+        CREATE TRIGGER course_credits_update AFTER UPDATE ON course
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE course_credits_sync();
+    """], True),
+    Migration(7, "Trigram and full-text search indexes", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        Index("student_name_trgm_idx", "student", ["name gin_trgm_ops"], "gin"),
+        Index("instructor_name_trgm_idx", "instructor", ["name gin_trgm_ops"], "gin"),
+        Index("course_title_trgm_idx", "course", ["title gin_trgm_ops"], "gin"),
+        Index("course_id_trgm_idx", "course", ["course_id gin_trgm_ops"], "gin"),
+        Index("course_title_fts_idx", "course", ["to_tsvector('english', title)"], "gin"),
+    ], False),
+    # Pre-aggregated rollups for the analytics dashboards. Enrollment and
+    # grade counts are additive and kept current by statement-level
+    # triggers; salary stats are recomputed per changed department; room
+    # utilization is refreshed on a schedule (python analytics.py refresh).
+    Migration(8, "Analytics rollup tables", ["""
+        CREATE TABLE IF NOT EXISTS dept_term_enrollment (
+            dept_name VARCHAR(50),
+            semester VARCHAR(10),
+            year INT,
+            enrollments INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (dept_name, semester, year)
+        );
+
+        CREATE TABLE IF NOT EXISTS course_grade_counts (
+            course_id VARCHAR(10),
+            semester VARCHAR(10),
+            year INT,
+            grade VARCHAR(2),
+            students INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (course_id, semester, year, grade)
+        );
+
+        CREATE TABLE IF NOT EXISTS dept_salary_stats (
+            dept_name VARCHAR(50) PRIMARY KEY,
+            instructors INT NOT NULL,
+            salaried INT NOT NULL,
+            total_salary BIGINT NOT NULL,
+            min_salary INT,
+            max_salary INT
+        );
+
+        CREATE TABLE IF NOT EXISTS room_utilization (
+            building VARCHAR(50),
+            room_number VARCHAR(10),
+            semester VARCHAR(10),
+            year INT,
+            capacity INT,
+            sections INT NOT NULL,
+            weekly_minutes INT NOT NULL,
+            seats_filled INT NOT NULL,
+            refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (building, room_number, semester, year)
+        );
+
+        -- Add delta (+1 or -1 per row) to the enrollment and grade counters
+        CREATE OR REPLACE FUNCTION takes_rollup_apply(
+            course_ids VARCHAR[], semesters VARCHAR[], years INT[], grades TEXT[], deltas INT[]
+        ) RETURNS void AS $$
+        BEGIN
+            INSERT INTO dept_term_enrollment AS r (dept_name, semester, year, enrollments)
+            SELECT c.dept_name, d.semester, d.year, SUM(d.delta)
+            FROM unnest(course_ids, semesters, years, deltas) AS d(course_id, semester, year, delta)
+            JOIN course c ON c.course_id = d.course_id
+            WHERE c.dept_name IS NOT NULL
+            GROUP BY c.dept_name, d.semester, d.year
+            HAVING SUM(d.delta) <> 0
+            ORDER BY c.dept_name, d.semester, d.year
+            ON CONFLICT (dept_name, semester, year) DO UPDATE SET enrollments = r.enrollments + EXCLUDED.enrollments;
+
+            INSERT INTO course_grade_counts AS r (course_id, semester, year, grade, students)
+            SELECT d.course_id, d.semester, d.year, d.grade, SUM(d.delta)
+            FROM unnest(course_ids, semesters, years, grades, deltas) AS d(course_id, semester, year, grade, delta)
+            WHERE d.grade IS NOT NULL
+            GROUP BY d.course_id, d.semester, d.year, d.grade
+            HAVING SUM(d.delta) <> 0
+            ORDER BY d.course_id, d.semester, d.year, d.grade
+            ON CONFLICT (course_id, semester, year, grade) DO UPDATE SET students = r.students + EXCLUDED.students;
+        END
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION takes_rollup_sync() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM takes_rollup_apply(array_agg(course_id), array_agg(semester), array_agg(year),
+                                           array_agg(TRIM(grade)), array_agg(1))
+                FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM takes_rollup_apply(array_agg(course_id), array_agg(semester), array_agg(year),
+                                           array_agg(TRIM(grade)), array_agg(-1))
+                FROM old_rows;
+            ELSE
+                PERFORM takes_rollup_apply(array_agg(course_id), array_agg(semester), array_agg(year),
+                                           array_agg(grade), array_agg(delta))
+                FROM (
+                    SELECT course_id, semester, year, TRIM(grade) AS grade, 1 AS delta FROM new_rows
+                    UNION ALL
+                    SELECT course_id, semester, year, TRIM(grade), -1 FROM old_rows
+                ) changed;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+
+        -- A course moving to another department takes its enrollments along
+        CREATE OR REPLACE FUNCTION course_dept_rollup_sync() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO dept_term_enrollment AS r (dept_name, semester, year, enrollments)
+            SELECT moved.dept_name, t.semester, t.year, SUM(moved.delta)
+            FROM (
+                SELECT n.course_id, n.dept_name, 1 AS delta
+                FROM new_rows n JOIN old_rows o ON o.course_id = n.course_id
+                WHERE n.dept_name IS DISTINCT FROM o.dept_name AND n.dept_name IS NOT NULL
+                UNION ALL
+                SELECT o.course_id, o.dept_name, -1
+                FROM new_rows n JOIN old_rows o ON o.course_id = n.course_id
+                WHERE n.dept_name IS DISTINCT FROM o.dept_name AND o.dept_name IS NOT NULL
+            ) moved
+            JOIN takes t ON t.course_id = moved.course_id
+            GROUP BY moved.dept_name, t.semester, t.year
+            ORDER BY moved.dept_name, t.semester, t.year
+            ON CONFLICT (dept_name, semester, year) DO UPDATE SET enrollments = r.enrollments + EXCLUDED.enrollments;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+
+        -- MIN and MAX are not additive, so the touched departments are
+        -- recomputed; the per-department advisory locks make concurrent
+        -- writers recompute one after the other from committed rows
+        CREATE OR REPLACE FUNCTION dept_salary_stats_refresh(depts VARCHAR[]) RETURNS void AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock(hashtext(concat_ws('|', 'dept_salary_stats', d)))
+            FROM (SELECT DISTINCT d FROM unnest(depts) AS d WHERE d IS NOT NULL ORDER BY d) locked;
+            DELETE FROM dept_salary_stats WHERE dept_name = ANY(depts);
+            INSERT INTO dept_salary_stats (dept_name, instructors, salaried, total_salary, min_salary, max_salary)
+            SELECT dept_name, COUNT(*), COUNT(salary), COALESCE(SUM(salary), 0), MIN(salary), MAX(salary)
+            FROM instructor
+            WHERE dept_name = ANY(depts)
+            GROUP BY dept_name;
+        END
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION instructor_salary_sync() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM dept_salary_stats_refresh(array_agg(dept_name)) FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM dept_salary_stats_refresh(array_agg(dept_name)) FROM old_rows;
+            ELSE
+                PERFORM dept_salary_stats_refresh(array_agg(dept_name))
+                FROM (SELECT dept_name FROM new_rows UNION SELECT dept_name FROM old_rows) changed;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS takes_rollup_insert ON takes;
+        DROP TRIGGER IF EXISTS takes_rollup_update ON takes;
+        DROP TRIGGER IF EXISTS takes_rollup_delete ON takes;
+        DROP TRIGGER IF EXISTS course_dept_rollup_update ON course;
+        DROP TRIGGER IF EXISTS instructor_salary_insert ON instructor;
+        DROP TRIGGER IF EXISTS instructor_salary_update ON instructor;
+        DROP TRIGGER IF EXISTS instructor_salary_delete ON instructor;
+
+        CREATE TRIGGER takes_rollup_insert AFTER INSERT ON takes
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE takes_rollup_sync();
+        CREATE TRIGGER takes_rollup_update AFTER UPDATE ON takes
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE takes_rollup_sync();
+        CREATE TRIGGER takes_rollup_delete AFTER DELETE ON takes
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE takes_rollup_sync();
+        CREATE TRIGGER course_dept_rollup_update AFTER UPDATE ON course
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE course_dept_rollup_sync();
+        CREATE TRIGGER instructor_salary_insert AFTER INSERT ON instructor
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE instructor_salary_sync();
+        CREATE TRIGGER instructor_salary_update AFTER UPDATE ON instructor
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE instructor_salary_sync();
+        CREATE TRIGGER instructor_salary_delete AFTER DELETE ON instructor
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE instructor_salary_sync();
+
+        DELETE FROM dept_term_enrollment;
+        INSERT INTO dept_term_enrollment (dept_name, semester, year, enrollments)
+        SELECT c.dept_name, t.semester, t.year, COUNT(*)
+        FROM takes t
+        JOIN course c ON c.course_id = t.course_id
+        WHERE c.dept_name IS NOT NULL
+        GROUP BY c.dept_name, t.semester, t.year;
+
+        DELETE FROM course_grade_counts;
+        INSERT INTO course_grade_counts (course_id, semester, year, grade, students)
+        SELECT course_id, semester, year, TRIM(grade), COUNT(*)
+        FROM takes
+        WHERE grade IS NOT NULL
+        GROUP BY course_id, semester, year, TRIM(grade);
+
+        DELETE FROM dept_salary_stats;
+        INSERT INTO dept_salary_stats (dept_name, instructors, salaried, total_salary, min_salary, max_salary)
+        SELECT dept_name, COUNT(*), COUNT(salary), COALESCE(SUM(salary), 0), MIN(salary), MAX(salary)
+        FROM instructor
+        GROUP BY dept_name;
+    """], True),
+    # Sorted student listings (pagination.keyset_page with a view) seek on
+    # (column NULLS FIRST, id) in either direction; course and instructor
+    # are small enough to sort on the fly
+    Migration(9, "Indexes for sorted student listings", [
+        Index("student_name_sort_idx", "student", ["name NULLS FIRST", "id"]),
+        Index("student_dept_sort_idx", "student", ["dept_name NULLS FIRST", "id"]),
+        Index("student_tot_cred_sort_idx", "student", ["tot_cred NULLS FIRST", "id"]),
+    ], False),
+    # Credits earned elsewhere (transfer credits, fixture values) live in
+    # transfer_cred, so tot_cred = transfer_cred + passed courses always holds
+    # and credits.rebuild can repair drift without losing them. A new student
+    # has no takes rows yet, so the tot_cred it is inserted with is all
+    # transfer credit.
+    Migration(10, "Keep credits earned elsewhere in student.transfer_cred", ["""
+        ALTER TABLE student ADD COLUMN IF NOT EXISTS transfer_cred INT NOT NULL DEFAULT 0;
+
+        UPDATE student st SET transfer_cred = GREATEST(COALESCE(st.tot_cred, 0) - COALESCE(e.earned, 0), 0)
+        FROM student s
+        LEFT JOIN (
+            SELECT t.ID, SUM(c.credits) AS earned
+            FROM takes t JOIN course c ON c.course_id = t.course_id
+            WHERE t.grade IS NOT NULL AND t.grade <> 'F'
+            GROUP BY t.ID
+        ) e ON e.ID = s.ID
+        WHERE st.ID = s.ID;
+
+        CREATE OR REPLACE FUNCTION student_transfer_cred_init() RETURNS trigger AS $$
+        BEGIN
+            UPDATE student st SET transfer_cred = COALESCE(n.tot_cred, 0)
+            FROM new_rows n
+            WHERE st.ID = n.ID;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS student_transfer_cred_insert ON student;
+        CREATE TRIGGER student_transfer_cred_insert AFTER INSERT ON student
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE student_transfer_cred_init();
+    """], True),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _ensure_version_table(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """)
+    conn.commit()
+
+
+# Highest applied migration, 0 for an empty database
+def current_version(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+        if not cursor.fetchone()[0]:
+            conn.rollback()
+            return 0
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        version = cursor.fetchone()[0]
+    conn.rollback()
+    return version
+
+
+# (version, description, applied_at) for every migration, applied_at None if pending
+def status(conn):
+    applied = {}
+    if current_version(conn):
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT version, applied_at FROM schema_migrations")
+            applied = dict(cursor.fetchall())
+        conn.rollback()
+    return [(m.version, m.description, applied.get(m.version)) for m in MIGRATIONS]
+
+
+def _create_index_concurrently(cursor, index):
+    # A failed concurrent build leaves an INVALID index behind, which
+    # IF NOT EXISTS would then happily skip; drop it and build again.
+    cursor.execute("""
+        SELECT NOT i.indisvalid
+        FROM pg_index i
+        WHERE i.indexrelid = to_regclass(%s)
+    """, (index.name,))
+    row = cursor.fetchone()
+    if row and row[0]:
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}")
+    cursor.execute(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index.name} ON {index.table} "
+        f"USING {index.method} ({', '.join(index.columns)})"
+    )
+
+
+def _apply(conn, migration):
+    with conn.cursor() as cursor:
+        if migration.transactional:
+            for step in migration.steps:
+                cursor.execute(step)
+        else:
+            conn.autocommit = True
+            try:
+                for step in migration.steps:
+                    if isinstance(step, Index):
+                        _create_index_concurrently(cursor, step)
+                    else:
+                        cursor.execute(step)
+            finally:
+                conn.autocommit = False
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+            (migration.version, migration.description),
+        )
+    conn.commit()
+
+
+# Apply every pending migration up to `target` (default: all) in order and
+# return the list of versions applied. Holds an advisory lock meanwhile.
+def migrate(conn, target=None):
+    target = LATEST_VERSION if target is None else target
+    conn.rollback()
+    _ensure_version_table(conn)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+    conn.commit()
+    applied = []
+    try:
+        version = current_version(conn)
+        for migration in MIGRATIONS:
+            if version < migration.version <= target:
+                try:
+                    _apply(conn, migration)
+                except Exception:
+                    conn.rollback()
+                    raise
+                applied.append(migration.version)
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+        conn.commit()
+    return applied
+
+
+# python migrations.py [status | migrate [--target N]]
+def main(argv=None):
+    import db
+
+    parser = argparse.ArgumentParser(description="Apply or inspect schema migrations.")
+    parser.add_argument("command", choices=["status", "migrate"], nargs="?", default="status")
+    parser.add_argument("--target", type=int, help="migrate up to this version only")
+    args = parser.parse_args(argv)
+
+    conn = db.connect()
+    try:
+        if args.command == "migrate":
+            applied = migrate(conn, args.target)
+            print(f"Applied: {', '.join(map(str, applied))}" if applied else "Nothing to apply.")
+        print(f"Current schema version: {current_version(conn)} (latest {LATEST_VERSION})")
+        for version, description, applied_at in status(conn):
+            print(f"{version:>4}  {'applied ' + str(applied_at) if applied_at else 'pending':<40} {description}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+from collections import namedtuple
+
+import streamlit as st
+from psycopg2 import sql
+
+import grid
+
+PAGE_SIZES = [25, 50, 100, 250]
+DEFAULT_PAGE_SIZE = 50
+# Below this many (estimated) rows an exact COUNT(*) is cheap enough
+EXACT_COUNT_THRESHOLD = 10000
+
+# One page of rows; last_key is the key of the last row, to seek past it
+Page = namedtuple("Page", ["rows", "last_key", "has_more"])
+
+
+# Sort and filter of a listing, pushed down to SQL: sort is a column (None
+# for the key order) and filters are (column, text) pairs, each matching rows
+# whose column contains the text
+GridView = namedtuple("GridView", ["sort", "descending", "filters"])
+
+
+def escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# A query as a relation keyset_page can page through, its output columns
+# renamed to `columns`; the query's %s parameters go in keyset_page's params
+def subquery(query, columns):
+    return sql.SQL("({query}) AS results ({columns})").format(
+        query=sql.SQL(query), columns=sql.SQL(", ").join(sql.Identifier(column) for column in columns))
+
+
+# Keyset (seek) pagination: fetch the rows of `table` that sort after `after`
+# on `key_columns`, which must end in a unique key so the order is total.
+# Only page_size + 1 rows are read (the extra one tells whether there is a
+# next page), so the cost no longer depends on the table size.
+#
+# With a view, rows are filtered and ordered by (view.sort, *key_columns);
+# after is then (sort value, *key values). NULLs sort first ascending and
+# last descending, the order a btree on (sort column NULLS FIRST, key) gives
+# in both directions, so one index serves both.
+#
+# table is a table name or a subquery(); params are the subquery's.
+def keyset_page(conn, table, columns, key_columns, after=None, page_size=DEFAULT_PAGE_SIZE, view=None, params=()):
+    view = view or GridView(None, False, ())
+    # Sorting on the leading key is the key order itself; any other column,
+    # trailing key columns included, is sorted on first
+    sort = view.sort if view.sort != key_columns[0] else None
+    operator = sql.SQL("<" if view.descending else ">")
+    direction = sql.SQL(" DESC" if view.descending else "")
+    keys = sql.SQL(", ").join(sql.Identifier(column) for column in key_columns)
+    ordered_keys = sql.SQL(", ").join(sql.Identifier(column) + direction for column in key_columns)
+    values = sql.SQL(", ").join(sql.Placeholder() * len(key_columns))
+    query = sql.SQL("SELECT {columns} FROM {table}").format(
+        columns=sql.SQL(", ").join(sql.Identifier(column) for column in columns),
+        table=sql.Identifier(table) if isinstance(table, str) else table,
+    )
+    conditions = []
+    params = list(params)
+    for column, text in view.filters:
+        conditions.append(sql.SQL("CAST({} AS TEXT) ILIKE %s").format(sql.Identifier(column)))
+        params.append(f"%{escape_like(text)}%")
+    if after is not None and sort is None:
+        conditions.append(sql.SQL("({keys}) {op} ({values})").format(keys=keys, op=operator, values=values))
+        params.extend(after)
+    elif after is not None:
+        seek = {
+            # Past the NULLs (first ascending): a plain row comparison, which
+            # leaves the NULLs out by itself
+            (False, False): "({keys}) > ({values})",
+            (False, True): "(({keys}) < ({values}) OR {sort} IS NULL)",
+            # Still inside the NULLs
+            (True, False): "(({sort} IS NULL AND ({tail}) > ({tail_values})) OR {sort} IS NOT NULL)",
+            (True, True): "({sort} IS NULL AND ({tail}) < ({tail_values}))",
+        }[(after[0] is None, view.descending)]
+        conditions.append(sql.SQL(seek).format(
+            keys=sql.SQL(", ").join(sql.Identifier(column) for column in [sort, *key_columns]),
+            values=sql.SQL(", ").join(sql.Placeholder() * (len(key_columns) + 1)),
+            sort=sql.Identifier(sort),
+            tail=keys,
+            tail_values=values,
+        ))
+        params.extend(after if after[0] is not None else after[1:])
+    if conditions:
+        query += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions)
+    order = ordered_keys
+    if sort is not None:
+        nulls = sql.SQL(" DESC NULLS LAST" if view.descending else " NULLS FIRST")
+        order = sql.SQL("{sort}{nulls}, {keys}").format(sort=sql.Identifier(sort), nulls=nulls, keys=ordered_keys)
+    query += sql.SQL(" ORDER BY {order} LIMIT %s").format(order=order)
+    params.append(page_size + 1)
+
+    with conn.cursor() as cursor:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    key_positions = [columns.index(column) for column in ([sort] if sort is not None else []) + key_columns]
+    last_key = tuple(rows[-1][i] for i in key_positions) if rows else None
+    return Page(rows, last_key, has_more)
+
+
+# Row count for the pager: the planner's estimate from pg_class for big tables,
+# an exact COUNT(*) for small or never-analyzed ones. Returns (count, is_estimate).
+def estimate_row_count(conn, table):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT reltuples::BIGINT FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+        row = cursor.fetchone()
+        estimate = row[0] if row else None
+        if estimate is not None and estimate >= EXACT_COUNT_THRESHOLD:
+            return estimate, True
+        cursor.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(sql.Identifier(table)))
+        return cursor.fetchone()[0], False
+
+
+DEFAULT_ORDER = "Default order"
+
+
+# Sort and filter controls of a listing, in a form so typing a filter does
+# not rerun the page; sort_columns is {column label: column name}
+def view_controls(state_key, sort_columns):
+    labels = list(sort_columns)
+    with st.form(f"{state_key}_view"):
+        sort_col, direction_col, filter_column_col, filter_text_col = st.columns([3, 2, 3, 4])
+        sort_label = sort_col.selectbox("Sort by", [DEFAULT_ORDER] + labels)
+        descending = direction_col.radio("Order", ["Ascending", "Descending"]) == "Descending"
+        filter_label = filter_column_col.selectbox("Filter on", labels)
+        filter_text = filter_text_col.text_input("Contains")
+        st.form_submit_button("Apply")
+    filters = ((sort_columns[filter_label], filter_text.strip()),) if filter_text.strip() else ()
+    return GridView(sort_columns.get(sort_label), descending, filters)
+
+
+# Render one page of a keyset-paginated listing with Previous/Next controls.
+# fetch_page(after, page_size) returns a Page, count_rows() returns
+# (count, is_estimate) or None; the page-start keys are kept in session state.
+# With sort_columns, the listing gets sort and filter controls and is fetched
+# as fetch_page(after, page_size, view); filtered listings show no total.
+# The pager restarts from the first page when the page size, the view or
+# `params` (e.g. the query a listing was fetched for) change.
+def render_paged_table(state_key, fetch_page, count_rows, columns, empty_message="No rows found.",
+                       sort_columns=None, params=None):
+    view = view_controls(state_key, sort_columns) if sort_columns else None
+    page_size = st.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                             key=f"{state_key}_page_size")
+    state = st.session_state.setdefault(f"{state_key}_pager",
+                                        {"page_size": page_size, "view": view, "params": params, "starts": [None]})
+    if state["page_size"] != page_size or state.get("view") != view or state.get("params") != params:
+        state.update(page_size=page_size, view=view, params=params, starts=[None])
+
+    after = state["starts"][-1]
+    page = fetch_page(after, page_size) if view is None else fetch_page(after, page_size, view)
+    if page is None:
+        return
+    if not page.rows and len(state["starts"]) == 1:
+        st.write(empty_message)
+        return
+
+    page_number = len(state["starts"])
+    first_row = (page_number - 1) * page_size + 1
+    total = count_rows() if view is None or not view.filters else None
+    if total is not None:
+        count, is_estimate = total
+        st.caption(f"Rows {first_row}-{first_row + len(page.rows) - 1} of {'~' if is_estimate else ''}{count}")
+    else:
+        st.caption(f"Rows {first_row}-{first_row + len(page.rows) - 1}")
+
+    grid.render_grid(page.rows, columns)
+
+    previous_col, next_col = st.columns(2)
+    if previous_col.button("Previous", key=f"{state_key}_previous", disabled=page_number == 1):
+        state["starts"].pop()
+        st.rerun()
+    if next_col.button("Next", key=f"{state_key}_next", disabled=not page.has_more):
+        state["starts"].append(page.last_key)
+        st.rerun()
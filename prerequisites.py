@@ -0,0 +1,187 @@
+import heapq
+from collections import defaultdict
+
+import pandas as pd
+
+import cache
+
+# A takes row satisfies a prerequisite once it has a grade that is not a fail
+PASSING_GRADE_SQL = "grade IS NOT NULL AND grade <> 'F'"
+
+
+# Missing prerequisites for many (student_id, course_id) pairs in a single
+# round-trip: the pairs are unnested server-side and prereq is anti-joined
+# against the student's passing takes rows. Returns {pair: [prereq_id, ...]},
+# an empty list meaning the student may take the course.
+def missing_prerequisites(conn, pairs):
+    pairs = list(dict.fromkeys(pairs))
+    missing = {pair: [] for pair in pairs}
+    if not pairs:
+        return missing
+    student_ids, course_ids = zip(*pairs)
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT r.student_id, r.course_id, p.prereq_id
+            FROM unnest(%s::VARCHAR[], %s::VARCHAR[]) AS r(student_id, course_id)
+            JOIN prereq p ON p.course_id = r.course_id
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM takes t
+                WHERE t.ID = r.student_id AND t.course_id = p.prereq_id AND t.{PASSING_GRADE_SQL}
+            )
+            ORDER BY r.student_id, r.course_id, p.prereq_id
+        """, (list(student_ids), list(course_ids)))
+        for student_id, course_id, prereq_id in cursor.fetchall():
+            missing[(student_id, course_id)].append(prereq_id)
+    return missing
+
+
+# Bulk enrollment validator: flag rows whose student lacks a prerequisite
+def validate_enrollments(conn, df, errors):
+    rows = df[["id", "course_id"]].dropna()
+    missing = missing_prerequisites(conn, rows.itertuples(index=False, name=None))
+    blocked = pd.DataFrame(
+        [(student_id, course_id, ", ".join(prereqs)) for (student_id, course_id), prereqs in missing.items() if prereqs],
+        columns=["id", "course_id", "_missing"],
+    )
+    merged = df[["id", "course_id"]].merge(blocked, how="left", on=["id", "course_id"])
+    messages = pd.Series(merged["_missing"].to_numpy(), index=df.index)
+    mask = messages.notna()
+    if mask.any():
+        current = errors[mask]
+        errors[mask] = current.where(current == "", current + "; ") + "missing prerequisite(s): " + messages[mask]
+
+
+class PrerequisiteCycleError(ValueError):
+    pass
+
+
+# In-memory prerequisite DAG. requires maps a course to its direct
+# prerequisites and unlocks is the reverse; transitive closures are memoized
+# per course, so repeated "everything before X" questions cost a lookup.
+class PrereqGraph:
+    def __init__(self, rows):
+        self.requires = defaultdict(set)
+        self.unlocks = defaultdict(set)
+        for course_id, prereq_id in rows:
+            self.requires[course_id].add(prereq_id)
+            self.unlocks[prereq_id].add(course_id)
+        self._closures = {}
+
+    # Every direct and indirect prerequisite of course_id
+    def closure(self, course_id):
+        closure = self._closures.get(course_id)
+        if closure is None:
+            found = set()
+            stack = list(self.requires.get(course_id, ()))
+            while stack:
+                prereq_id = stack.pop()
+                if prereq_id in found:
+                    continue
+                found.add(prereq_id)
+                known = self._closures.get(prereq_id)
+                if known is not None:
+                    found |= known
+                else:
+                    stack.extend(self.requires.get(prereq_id, ()))
+            closure = self._closures[course_id] = frozenset(found)
+        return closure
+
+    # `courses` (default: every course in the graph) ordered so that each
+    # prerequisite comes before the courses needing it, ties alphabetical
+    def topological_order(self, courses=None):
+        nodes = set(courses) if courses is not None else set(self.requires) | set(self.unlocks)
+        waiting = {course_id: len(self.requires.get(course_id, set()) & nodes) for course_id in nodes}
+        ready = [course_id for course_id, count in waiting.items() if count == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            course_id = heapq.heappop(ready)
+            order.append(course_id)
+            for unlocked in self.unlocks.get(course_id, ()):
+                if unlocked in waiting:
+                    waiting[unlocked] -= 1
+                    if waiting[unlocked] == 0:
+                        heapq.heappush(ready, unlocked)
+        if len(order) < len(nodes):
+            cycle = sorted(course_id for course_id, count in waiting.items() if count > 0)
+            raise PrerequisiteCycleError(f"prerequisite cycle among: {', '.join(cycle)}")
+        return order
+
+    # Would "course_id requires prereq_id" close a cycle?
+    def would_create_cycle(self, course_id, prereq_id):
+        return course_id == prereq_id or course_id in self.closure(prereq_id)
+
+
+@cache.cached("prereq")
+def _load_graph(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT course_id, prereq_id FROM prereq")
+        return PrereqGraph(cursor.fetchall())
+
+
+# The shared graph, rebuilt after cache.invalidate("prereq")
+def graph(conn):
+    return _load_graph(conn)
+
+
+# Insert a prereq row inside the caller's transaction, refusing cycles. The
+# table is locked and re-read so two concurrent inserts cannot each close
+# half of a cycle.
+def add_prerequisite(conn, course_id, prereq_id):
+    with conn.cursor() as cursor:
+        cursor.execute("LOCK TABLE prereq IN SHARE ROW EXCLUSIVE MODE")
+        cursor.execute("SELECT course_id, prereq_id FROM prereq")
+        if PrereqGraph(cursor.fetchall()).would_create_cycle(course_id, prereq_id):
+            raise PrerequisiteCycleError(f"{course_id} is itself a prerequisite of {prereq_id}")
+        cursor.execute("""
+            INSERT INTO prereq (course_id, prereq_id) VALUES (%s, %s) ON CONFLICT DO NOTHING
+        """, (course_id, prereq_id))
+
+
+# {student_id: (passed courses, courses taken in semester/year)} for the given
+# students, or every student with a takes row when student_ids is None
+def _course_sets(conn, student_ids, semester=None, year=None):
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT t.ID,
+                   COALESCE(array_agg(DISTINCT t.course_id) FILTER (WHERE t.{PASSING_GRADE_SQL}), '{{}}'),
+                   COALESCE(array_agg(DISTINCT t.course_id) FILTER (WHERE t.semester = %s AND t.year = %s), '{{}}')
+            FROM takes t
+            WHERE %s::VARCHAR[] IS NULL OR t.ID = ANY(%s::VARCHAR[])
+            GROUP BY t.ID
+        """, (semester, year, student_ids, student_ids))
+        return {student_id: (set(passed), set(current)) for student_id, passed, current in cursor.fetchall()}
+
+
+# What each student still has to pass before course_id, in an order they
+# can be taken: {student_id: [course_id, ...]}. One query for any number of
+# students; student_ids=None covers every student with a takes row.
+def remaining_prerequisites(conn, student_ids, course_id):
+    prereq_graph = graph(conn)
+    order = prereq_graph.topological_order(prereq_graph.closure(course_id))
+    student_ids = None if student_ids is None else list(student_ids)
+    sets = _course_sets(conn, student_ids)
+    students = sets if student_ids is None else student_ids
+    return {student_id: [prereq_id for prereq_id in order if prereq_id not in sets.get(student_id, (set(),))[0]]
+            for student_id in students}
+
+
+# Courses each student becomes eligible for once they pass what they take in
+# semester/year: {student_id: [course_id, ...]}, students with nothing newly
+# unlocked left out
+def unlocked_after(conn, student_ids, semester, year):
+    prereq_graph = graph(conn)
+    student_ids = None if student_ids is None else list(student_ids)
+    unlocked = {}
+    for student_id, (passed, current) in _course_sets(conn, student_ids, semester, year).items():
+        after = passed | current
+        candidates = {course_id for taken in current for course_id in prereq_graph.unlocks.get(taken, ())}
+        courses = sorted(
+            course_id for course_id in candidates - after
+            if prereq_graph.requires.get(course_id, set()) <= after
+            and not prereq_graph.requires.get(course_id, set()) <= passed
+        )
+        if courses:
+            unlocked[student_id] = courses
+    return unlocked
@@ -0,0 +1,57 @@
+import cache
+import migrations
+import seeding
+
+# Cached reference data for the app's dropdowns and page data. Streamlit
+# re-executes app.py on every interaction, so loaders defined there would get
+# a fresh, empty store (and another invalidation listener) on each rerun;
+# defined in an imported module they exist once per process. The loaders
+# raise on error, so failures are never cached.
+
+
+@cache.cached("schema_migrations")
+def schema_version(conn):
+    return migrations.current_version(conn)
+
+
+@cache.cached("course")
+def courses(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT * FROM course")
+        return cursor.fetchall()
+
+
+@cache.cached("department")
+def departments(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT dept_name FROM department")
+        return [row[0] for row in cursor.fetchall()]
+
+
+# (sec_id, semester, year) of every section of course_id
+@cache.cached("section")
+def sections_for_course(conn, course_id):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT sec_id, semester, year
+            FROM section
+            WHERE course_id = %s
+        """, (course_id,))
+        return cursor.fetchall()
+
+
+# Bumped on every invalidation of a base table or the analytics rollups, i.e.
+# every write made through the app. The app's per-session page data is keyed
+# on it, so a write in one rerun reaches the memo of every later one.
+_data_generation = [0]
+
+
+def _on_data_change(table=None, **detail):
+    _data_generation[0] += 1
+
+
+cache.subscribe(_on_data_change, *seeding.TABLE_ORDER, "analytics")
+
+
+def data_generation():
+    return _data_generation[0]
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+# Read/write routing between the primary and an optional streaming replica
+# (db.REPLICA_DSN). Writes always run on the primary; read-only reports are
+# sent to the replica unless
+#   - no replica is configured, or it cannot be reached,
+#   - its replay lags the primary by more than MAX_REPLICA_LAG seconds, or
+#   - the reader has written to the primary and the replica has not replayed
+#     that write yet (read-your-writes), see write_position().
+# The replica's position is checked at most every REPLICA_CHECK_INTERVAL
+# seconds and shared by all readers of the process.
+MAX_REPLICA_LAG = float(os.environ.get("COLLEGE_DB_MAX_REPLICA_LAG", "5"))
+REPLICA_CHECK_INTERVAL = float(os.environ.get("COLLEGE_DB_REPLICA_CHECK_INTERVAL", "1"))
+
+# Lag is zero while the replica has replayed everything it received; the
+# replay timestamp alone would make an idle primary look like a lagging one
+REPLICA_STATUS_SQL = """
+    SELECT pg_is_in_recovery(),
+           pg_last_wal_replay_lsn()::TEXT,
+           CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END
+"""
+
+
+# "16/B374D848" -> comparable integer
+def parse_lsn(lsn):
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+class Router:
+    def __init__(self, replica_pool=None, max_lag=MAX_REPLICA_LAG, check_interval=REPLICA_CHECK_INTERVAL):
+        self.replica_pool = replica_pool
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._status = None  # (checked_at, reachable, replay_lsn, lag)
+        self._stats = {
+            "replica_reads": 0,
+            "primary_reads": 0,
+            "replica_lagging": 0,
+            "read_your_writes": 0,
+            "replica_unavailable": 0,
+            "replica_lag": None,
+        }
+
+    # The primary's WAL position after a write committed on conn, or None
+    # without a replica. Readers pass it back to reading() so they see their
+    # own write even before the replica has replayed it.
+    def write_position(self, conn):
+        if self.replica_pool is None or conn.closed:
+            return None
+        idle = conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_current_wal_lsn()::TEXT")
+                lsn = parse_lsn(cursor.fetchone()[0])
+        except psycopg2.Error:
+            conn.rollback()
+            return None
+        if idle:
+            conn.rollback()  # Don't leave the read transaction open
+        return lsn
+
+    # (reachable, replay_lsn, lag) of the replica; replay_lsn is None when the
+    # replica DSN points at a server that is not in recovery (always current)
+    def _replica_status(self):
+        with self._lock:
+            status = self._status
+        if status is not None and time.monotonic() - status[0] < self.check_interval:
+            return status[1:]
+        try:
+            with self.replica_pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(REPLICA_STATUS_SQL)
+                    in_recovery, replay_lsn, lag = cursor.fetchone()
+            status = (time.monotonic(), True, parse_lsn(replay_lsn) if in_recovery and replay_lsn else None,
+                      float(lag))
+        except psycopg2.Error:
+            status = (time.monotonic(), False, None, None)
+        with self._lock:
+            self._status = status
+            self._stats["replica_lag"] = status[3]
+        return status[1:]
+
+    def _use_replica(self, written_lsn):
+        if self.replica_pool is None:
+            return False
+        reachable, replay_lsn, lag = self._replica_status()
+        reason = None
+        if not reachable:
+            reason = "replica_unavailable"
+        elif lag > self.max_lag:
+            reason = "replica_lagging"
+        elif written_lsn is not None and replay_lsn is not None and replay_lsn < written_lsn:
+            reason = "read_your_writes"
+        if reason is not None:
+            with self._lock:
+                self._stats[reason] += 1
+        return reason is None
+
+    # Connection a read-only helper should use: a pooled replica connection
+    # when it is usable for a reader that last wrote at written_lsn, conn
+    # (the primary) otherwise
+    @contextmanager
+    def reading(self, conn, written_lsn=None):
+        replica = None
+        if self._use_replica(written_lsn):
+            try:
+                replica = self.replica_pool.getconn()
+            except psycopg2.Error:
+                with self._lock:
+                    self._stats["replica_unavailable"] += 1
+                    self._status = (time.monotonic(), False, None, None)
+        with self._lock:
+            self._stats["replica_reads" if replica is not None else "primary_reads"] += 1
+        if replica is None:
+            yield conn
+            return
+        try:
+            yield replica
+        finally:
+            self.replica_pool.putconn(replica)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["replica_configured"] = self.replica_pool is not None
+        if self.replica_pool is not None:
+            stats["replica_pool"] = self.replica_pool.stats()
+        return stats
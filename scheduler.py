@@ -0,0 +1,273 @@
+import argparse
+import math
+import time
+from bisect import bisect_left
+from collections import Counter, namedtuple
+
+import cache
+import course_details
+import enrollment
+import timetable
+
+# Automatic room and time-slot assignment for one term. A greedy
+# most-constrained-first heuristic: sections are placed largest first (fewest
+# rooms fit them), each into the least busy time slot where all its
+# instructors are free, in the smallest free classroom that holds its
+# expected enrollment. Sections that cannot be placed, including those larger
+# than every classroom, are reported and keep their current room and slot,
+# which no other section is placed into. Slot overlaps come from time_slot,
+# so two slots that share a meeting time block each other. Every lookup is a set test or a
+# bisect, which keeps thousands of sections well within seconds.
+
+# One section to place; instructors are the IDs teaching it this term
+SectionNeed = namedtuple("SectionNeed", ["section", "expected", "instructors", "room", "time_slot_id"])
+# Where a section ended up; over_capacity is set when no room was big enough
+# (only with allow_over_capacity)
+Placement = namedtuple("Placement", ["section", "building", "room_number", "time_slot_id", "capacity", "expected",
+                                     "over_capacity"])
+# unscheduled: needs with no free room and slot; oversized: needs larger than
+# every classroom; conflicts: those of them whose current room or instructors
+# were already double-booked before scheduling. None of them is written back.
+Schedule = namedtuple("Schedule", ["placements", "unscheduled", "oversized", "conflicts"])
+
+
+# {slot: set of slots sharing a meeting time with it, itself included}
+def slot_conflicts(slots):
+    conflicts = {slot: {slot} for slot in slots}
+    ids = sorted(slots)
+    for i, first in enumerate(ids):
+        for second in ids[i + 1:]:
+            if any(start < other_end and other_start < end
+                   for start, end in slots[first] for other_start, other_end in slots[second]):
+                conflicts[first].add(second)
+                conflicts[second].add(first)
+    return conflicts
+
+
+# Place `needs` into `rooms` ((building, room_number, capacity) tuples) and
+# `slots` ({time_slot_id: weekly intervals}). The sections in `fixed` keep
+# their current room and slot and are booked first, as are the sections too
+# large for any room. With allow_over_capacity those are put into the largest
+# free room instead.
+#
+# A section the greedy pass cannot place stays where it is. If an earlier
+# placement of the same pass took its room or one of its instructors' time,
+# the pass is repeated with that section pinned to its current spot (booked
+# up front like the fixed ones), until no placement collides with a section
+# that stays put.
+def solve(needs, rooms, slots, fixed=(), allow_over_capacity=False):
+    pinned = []
+    while True:
+        placements, unscheduled, oversized, blocked = _solve_pass(needs, rooms, slots, fixed, pinned,
+                                                                  allow_over_capacity)
+        new = [need for need in blocked if need not in pinned and need not in oversized]
+        if not new:
+            return Schedule(placements, unscheduled, oversized, blocked)
+        pinned.extend(new)
+
+
+# One greedy pass; returns (placements, unscheduled, oversized, blocked),
+# blocked being the unplaced sections whose current spot is taken
+def _solve_pass(needs, rooms, slots, fixed, pinned, allow_over_capacity):
+    conflicts = slot_conflicts(slots)
+    # Per slot, the rooms still free at that time as sorted (capacity, room)
+    free_rooms = {slot: sorted((capacity or 0, (building, room_number)) for building, room_number, capacity in rooms)
+                  for slot in slots}
+    capacities = {(building, room_number): capacity or 0 for building, room_number, capacity in rooms}
+    busy = {}  # instructor -> booked slots
+    usage = Counter()
+
+    def position(room, slot):
+        entry = (capacities[room], room)
+        index = bisect_left(free_rooms[slot], entry)
+        return index if index < len(free_rooms[slot]) and free_rooms[slot][index] == entry else None
+
+    def book(room, slot, instructors):
+        for other in conflicts[slot]:
+            index = position(room, other)
+            if index is not None:
+                del free_rooms[other][index]
+        for instructor in instructors:
+            busy.setdefault(instructor, set()).add(slot)
+        usage[slot] += 1
+
+    def available(instructors, slot):
+        return all(busy.get(instructor, set()).isdisjoint(conflicts[slot]) for instructor in instructors)
+
+    def smallest_fitting(slot, size):
+        index = bisect_left(free_rooms[slot], (size,))
+        return free_rooms[slot][index][1] if index < len(free_rooms[slot]) else None
+
+    # Book a section that is not being moved where it is; False if that room
+    # or one of its instructors is already booked then
+    def keep_current(need):
+        if need.room not in capacities or need.time_slot_id not in slots:
+            return True  # no current spot to keep
+        if position(need.room, need.time_slot_id) is None or not available(need.instructors, need.time_slot_id):
+            return False
+        book(need.room, need.time_slot_id, need.instructors)
+        return True
+
+    oversized = []
+    if not allow_over_capacity:
+        largest = max(capacities.values(), default=0)
+        oversized = [need for need in needs if need.expected > largest]
+        needs = [need for need in needs if need.expected <= largest]
+    for need in fixed:
+        if need.room in capacities and need.time_slot_id in slots:
+            book(need.room, need.time_slot_id, need.instructors)
+    blocked = [need for need in oversized + pinned if not keep_current(need)]
+
+    placements = []
+    unscheduled = list(pinned)
+    for need in sorted((need for need in needs if need not in pinned), key=lambda need: (-need.expected, -len(need.instructors), need.section)):
+        candidates = sorted(slots, key=lambda slot: (slot != need.time_slot_id, usage[slot], slot))
+        candidates = [slot for slot in candidates if available(need.instructors, slot)]
+        choice = None
+        for slot in candidates:
+            if (slot == need.time_slot_id and need.room in capacities and capacities[need.room] >= need.expected
+                    and position(need.room, slot) is not None):
+                choice = (need.room, slot)  # keep the current placement when it still works
+                break
+            room = smallest_fitting(slot, need.expected)
+            if room is not None:
+                choice = (room, slot)
+                break
+        over_capacity = False
+        if choice is None and allow_over_capacity:
+            # Nothing big enough anywhere: take the largest free room
+            best = max(((free_rooms[slot][-1], slot) for slot in candidates if free_rooms[slot]), default=None)
+            if best is not None:
+                choice, over_capacity = (best[0][1], best[1]), True
+        if choice is None:
+            unscheduled.append(need)
+            if not keep_current(need):
+                blocked.append(need)
+            continue
+        room, slot = choice
+        book(room, slot, need.instructors)
+        placements.append(Placement(need.section, room[0], room[1], slot, capacities[room], need.expected,
+                                    over_capacity))
+    return placements, unscheduled, oversized, blocked
+
+
+def load(conn, semester, year):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT time_slot_id, day, start_hour, start_minute, end_hour, end_minute FROM time_slot")
+        slots = timetable.weekly_intervals(cursor.fetchall())
+        cursor.execute("SELECT building, room_number, capacity FROM classroom")
+        rooms = cursor.fetchall()
+        cursor.execute("""
+            SELECT ID, course_id, sec_id FROM teaches WHERE semester = %s AND year = %s
+        """, (semester, year))
+        instructors = {}
+        for instructor_id, course_id, sec_id in cursor.fetchall():
+            instructors.setdefault((course_id, sec_id), []).append(instructor_id)
+        # Expected enrollment: who is enrolled or waiting now, or the
+        # course's average over its other offerings if that is more
+        cursor.execute("""
+            SELECT s.course_id, s.sec_id, s.building, s.room_number, s.time_slot_id,
+                   COALESCE(ss.enrolled, 0) + (
+                       SELECT COUNT(*) FROM waitlist w
+                       WHERE (w.course_id, w.sec_id, w.semester, w.year) = (s.course_id, s.sec_id, s.semester, s.year)
+                   ),
+                   (SELECT AVG(past.enrolled) FROM section_seats past
+                    WHERE past.course_id = s.course_id AND (past.semester, past.year) <> (s.semester, s.year))
+            FROM section s
+            LEFT JOIN section_seats ss
+                ON (ss.course_id, ss.sec_id, ss.semester, ss.year) = (s.course_id, s.sec_id, s.semester, s.year)
+            WHERE s.semester = %s AND s.year = %s
+        """, (semester, year))
+        needs = [
+            SectionNeed((course_id, sec_id, semester, year), max(current, math.ceil(typical or 0)),
+                        instructors.get((course_id, sec_id), []), (building, room_number), time_slot_id)
+            for course_id, sec_id, building, room_number, time_slot_id, current, typical in cursor.fetchall()
+        ]
+    conn.rollback()
+    return needs, rooms, slots
+
+
+# Write the placements back in one transaction; unscheduled and oversized
+# sections are left as they are
+def apply(conn, schedule):
+    rows = [(*placement.section, placement.building, placement.room_number, placement.time_slot_id)
+            for placement in schedule.placements]
+    if not rows:
+        return
+    columns = [list(column) for column in zip(*rows)]
+    sections = [row[:4] for row in rows]
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE section s SET building = u.building, room_number = u.room_number, time_slot_id = u.time_slot_id
+                FROM unnest(%s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[], %s::INT[],
+                            %s::VARCHAR[], %s::VARCHAR[], %s::VARCHAR[])
+                    AS u(course_id, sec_id, semester, year, building, room_number, time_slot_id)
+                WHERE (s.course_id, s.sec_id, s.semester, s.year) = (u.course_id, u.sec_id, u.semester, u.year)
+            """, columns)
+        enrollment.refresh_counts(conn, sections)
+        course_details.refresh_sections(conn, sections)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    cache.invalidate("section")
+
+
+# Schedule a whole term; with only_unscheduled, sections that already have a
+# room and slot keep them and only the others are placed
+def schedule_term(conn, semester, year, only_unscheduled=False, allow_over_capacity=False):
+    needs, rooms, slots = load(conn, semester, year)
+    fixed = []
+    if only_unscheduled:
+        fixed = [need for need in needs if None not in need.room and need.time_slot_id is not None]
+        needs = [need for need in needs if need not in fixed]
+    return solve(needs, rooms, slots, fixed, allow_over_capacity)
+
+
+# python scheduler.py Fall 2024 --dry-run
+# python scheduler.py Spring 2025 --only-unscheduled
+# python scheduler.py Fall 2024 --allow-over-capacity
+def main(argv=None):
+    import db
+
+    parser = argparse.ArgumentParser(description="Assign a term's sections to classrooms and time slots.")
+    parser.add_argument("semester")
+    parser.add_argument("year", type=int)
+    parser.add_argument("--only-unscheduled", action="store_true",
+                        help="keep existing placements and only place sections without a room or slot")
+    parser.add_argument("--allow-over-capacity", action="store_true",
+                        help="put sections larger than every classroom into the largest free room")
+    parser.add_argument("--dry-run", action="store_true", help="print the result without writing it")
+    args = parser.parse_args(argv)
+
+    conn = db.connect()
+    try:
+        started = time.perf_counter()
+        schedule = schedule_term(conn, args.semester, args.year, args.only_unscheduled, args.allow_over_capacity)
+        solved = time.perf_counter() - started
+        placements, unscheduled, oversized, conflicts = schedule
+        moved = len(placements)
+        print(f"Placed {moved} section(s) in {solved:.2f}s")
+        for placement in placements:
+            if placement.over_capacity:
+                print(f"  over capacity: {placement.section[0]}-{placement.section[1]} expects {placement.expected}, "
+                      f"{placement.building} {placement.room_number} holds {placement.capacity}")
+        for need in oversized:
+            print(f"  no room large enough: {need.section[0]}-{need.section[1]} expects {need.expected} "
+                  f"(left in place)")
+        for need in unscheduled:
+            print(f"  unscheduled: {need.section[0]}-{need.section[1]} (instructors {need.instructors or 'none'}, "
+                  f"left in place)")
+        for need in conflicts:
+            print(f"  already double-booked: {need.section[0]}-{need.section[1]} in {need.room[0]} {need.room[1]} "
+                  f"at {need.time_slot_id}")
+        if not args.dry_run:
+            apply(conn, schedule)
+            print(f"Written in {time.perf_counter() - started - solved:.2f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
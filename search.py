@@ -0,0 +1,81 @@
+from collections import namedtuple
+
+import pagination
+
+# Ranked name/title search over students, instructors and courses, served by
+# the pg_trgm and full-text indexes of migration 7. Substring matches
+# (ILIKE '%...%') and fuzzy word matches (<%) both use the trigram indexes;
+# course titles also match by words through to_tsvector. Results are ordered
+# by score and paginated by keyset on (score, key), like the other listings.
+MIN_QUERY_LENGTH = 3  # shorter patterns have no trigram to look up
+
+# match and score are SQL over the parameters q, contains ('%q%'), prefix
+# ('q%') and number (q as an integer, or NULL)
+SearchSpec = namedtuple("SearchSpec", ["table", "key", "columns", "match", "score"])
+
+SEARCHES = {
+    "students": SearchSpec(
+        "student", "id", ["id", "name", "dept_name", "tot_cred"],
+        "id = %(q)s OR name ILIKE %(contains)s OR %(q)s <%% name",
+        """CASE WHEN id = %(q)s THEN 2 ELSE 0 END
+           + CASE WHEN name ILIKE %(prefix)s THEN 1 ELSE 0 END
+           + word_similarity(%(q)s, name)""",
+    ),
+    "instructors": SearchSpec(
+        "instructor", "id", ["id", "name", "dept_name"],
+        "id = %(number)s OR name ILIKE %(contains)s OR %(q)s <%% name",
+        """CASE WHEN id = %(number)s THEN 2 ELSE 0 END
+           + CASE WHEN name ILIKE %(prefix)s THEN 1 ELSE 0 END
+           + word_similarity(%(q)s, name)""",
+    ),
+    "courses": SearchSpec(
+        "course", "course_id", ["course_id", "title", "dept_name", "credits"],
+        """course_id ILIKE %(prefix)s OR title ILIKE %(contains)s OR %(q)s <%% title
+           OR to_tsvector('english', title) @@ plainto_tsquery('english', %(q)s)""",
+        """CASE WHEN course_id ILIKE %(prefix)s THEN 2 ELSE 0 END
+           + ts_rank(to_tsvector('english', title), plainto_tsquery('english', %(q)s))
+           + word_similarity(%(q)s, title)""",
+    ),
+}
+
+
+# One page of `kind` matching `query`, best first. after is the last_key of
+# the previous page, (score, key).
+def search(conn, kind, query, after=None, page_size=pagination.DEFAULT_PAGE_SIZE):
+    spec = SEARCHES[kind]
+    query = query.strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        return pagination.Page([], None, False)
+    escaped = pagination.escape_like(query)
+    params = {
+        "q": query,
+        "contains": f"%{escaped}%",
+        "prefix": f"{escaped}%",
+        "number": int(query) if query.isdigit() and len(query) < 10 else None,
+        "limit": page_size + 1,
+    }
+    seek = ""
+    if after is not None:
+        # score descending, key ascending as one row comparison
+        seek = f"WHERE (-score, {spec.key}) > (-%(after_score)s::FLOAT8, %(after_key)s)"
+        params.update(after_score=after[0], after_key=after[1])
+    columns = ", ".join(spec.columns)
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {columns}, score
+            FROM (
+                SELECT {columns}, ({spec.score})::FLOAT8 AS score
+                FROM {spec.table}
+                WHERE {spec.match}
+            ) ranked
+            {seek}
+            ORDER BY score DESC, {spec.key}
+            LIMIT %(limit)s
+        """, params)
+        rows = cursor.fetchall()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    key_position = spec.columns.index(spec.key)
+    last_key = (rows[-1][-1], rows[-1][key_position]) if rows else None
+    return pagination.Page([row[:-1] for row in rows], last_key, has_more)
@@ -0,0 +1,182 @@
+import argparse
+import csv
+import os
+import time
+
+import analytics
+import cache
+import course_details
+import credits
+import enrollment
+import ids
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Base tables in foreign-key dependency order: loading follows this order,
+# and truncating all of them in one statement needs no particular order
+TABLE_ORDER = [
+    "classroom", "department", "course", "instructor", "section", "teaches",
+    "student", "takes", "advisor", "time_slot", "prereq", "waitlist",
+]
+# Tables derived from the base tables, rebuilt after every reseed
+DERIVED_TABLES = ["course_details_summary", "section_seats"] + analytics.ROLLUP_TABLES
+
+
+# Empty every base and derived table with a single TRUNCATE: no per-row
+# foreign key checks and no dead tuples, unlike DELETE
+def truncate_all(cursor):
+    cursor.execute(f"TRUNCATE {', '.join(reversed(TABLE_ORDER + DERIVED_TABLES))}")
+
+
+# Turn the user triggers of every base table off or on inside the current
+# transaction. They maintain derived columns and tables (tot_cred and the
+# analytics rollups) per statement; fixture tot_cred values are split into
+# transfer and earned credits and the rollups are rebuilt afterwards.
+def set_user_triggers(cursor, enabled):
+    action = "ENABLE" if enabled else "DISABLE"
+    for table in TABLE_ORDER:
+        cursor.execute(f"ALTER TABLE {table} {action} TRIGGER USER")
+
+
+# Recompute every derived table from the base tables and move the ID
+# sequences past the loaded IDs (caller commits)
+def rebuild_derived(conn):
+    credits.derive_transfer(conn)
+    course_details.rebuild(conn)
+    enrollment.rebuild(conn)
+    analytics.rebuild(conn)  # after section_seats, which room utilization reads
+    ids.sync_sequences(conn)
+
+
+def copy_csv(cursor, table, path):
+    with open(path, newline="", encoding="utf-8") as fileobj:
+        columns = next(csv.reader(fileobj))
+        fileobj.seek(0)
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, HEADER true)", fileobj
+        )
+
+
+# Fixture loader for a directory holding one <table>.csv (with a header row)
+# per table; tables without a file are left empty
+def directory_fixture(path):
+    def load(conn, **options):
+        directory = options.get("path") or path
+        if not directory or not os.path.isdir(directory):
+            raise FileNotFoundError(f"Fixture directory not found: {directory}")
+        with conn.cursor() as cursor:
+            for table in TABLE_ORDER:
+                file_path = os.path.join(directory, f"{table}.csv")
+                if os.path.exists(file_path):
+                    copy_csv(cursor, table, file_path)
+    return load
+
+
+def _synthetic_fixture(conn, students=1000, seed=42, counts=None, **options):
+    import datagen
+
+    generated = datagen.generate_into(conn, students, seed)
+    if counts is not None:
+        counts.update(generated)
+
+
+# Pluggable fixture sets: name -> loader(conn, **options). The loader only
+# inserts rows; seed() truncates before and rebuilds derived tables after.
+FIXTURES = {
+    "textbook": directory_fixture(os.path.join(FIXTURE_DIR, "textbook")),
+    "synthetic": _synthetic_fixture,
+    "snapshot": directory_fixture(os.environ.get("COLLEGE_SNAPSHOT_DIR")),
+}
+
+
+def register_fixture(name, loader):
+    FIXTURES[name] = loader
+
+
+# Replace the database contents with a fixture set in one transaction
+def seed(conn, fixture="textbook", analyze=False, **options):
+    loader = FIXTURES[fixture]
+    try:
+        with conn.cursor() as cursor:
+            truncate_all(cursor)
+            set_user_triggers(cursor, False)
+        loader(conn, **options)
+        with conn.cursor() as cursor:
+            set_user_triggers(cursor, True)
+        rebuild_derived(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    cache.invalidate()
+
+    if analyze:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        finally:
+            conn.autocommit = False
+
+
+# Anonymized copies of the personal columns, used by export_snapshot
+SNAPSHOT_QUERIES = {
+    "student": "SELECT ID, 'Student ' || substr(md5(ID), 1, 8) AS name, dept_name, tot_cred FROM student",
+    "instructor": """
+        SELECT ID, 'Instructor ' || substr(md5(ID::TEXT), 1, 8) AS name, dept_name,
+               (round(salary / 5000.0) * 5000)::INT AS salary
+        FROM instructor
+    """,
+}
+
+
+# Dump every base table to <path>/<table>.csv with COPY, ready to be loaded
+# again as the "snapshot" fixture. Names are pseudonymized and salaries
+# rounded unless anonymize=False.
+def export_snapshot(conn, path, anonymize=True):
+    os.makedirs(path, exist_ok=True)
+    with conn.cursor() as cursor:
+        for table in TABLE_ORDER:
+            query = SNAPSHOT_QUERIES.get(table) if anonymize else None
+            source = f"({query})" if query else table
+            with open(os.path.join(path, f"{table}.csv"), "w", newline="", encoding="utf-8") as fileobj:
+                cursor.copy_expert(f"COPY {source} TO STDOUT WITH (FORMAT csv, HEADER true)", fileobj)
+    conn.rollback()
+
+
+# python seeding.py textbook
+# python seeding.py synthetic --students 100000
+# python seeding.py snapshot --path snapshots/2024-fall
+# python seeding.py export-snapshot snapshots/2024-fall
+def main(argv=None):
+    import db
+
+    parser = argparse.ArgumentParser(description="Reseed the database from a fixture set.")
+    parser.add_argument("fixture", choices=sorted(FIXTURES) + ["export-snapshot"])
+    parser.add_argument("path", nargs="?", help="directory for export-snapshot")
+    parser.add_argument("--path", dest="fixture_path", help="fixture directory for the snapshot fixture")
+    parser.add_argument("--students", type=int, default=1000, help="size of the synthetic fixture")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-anonymize", action="store_true")
+    args = parser.parse_args(argv)
+
+    conn = db.connect()
+    try:
+        started = time.perf_counter()
+        if args.fixture == "export-snapshot":
+            if not args.path:
+                parser.error("export-snapshot needs a target directory")
+            export_snapshot(conn, args.path, anonymize=not args.no_anonymize)
+            print(f"Snapshot written to {args.path} in {time.perf_counter() - started:.2f}s")
+            return
+        options = {"students": args.students, "seed": args.seed} if args.fixture == "synthetic" else {}
+        if args.fixture_path:
+            options["path"] = args.fixture_path
+        seed(conn, args.fixture, analyze=args.fixture != "textbook", **options)
+        print(f"Seeded '{args.fixture}' in {time.perf_counter() - started:.2f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
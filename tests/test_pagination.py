@@ -0,0 +1,86 @@
+import pytest
+
+sql = pytest.importorskip("psycopg2.sql")
+pytest.importorskip("streamlit")
+
+import pagination
+
+COLUMNS = ["course_id", "sec_id", "semester", "year", "room_number"]
+KEY_COLUMNS = ["course_id", "sec_id", "semester", "year"]
+ROWS = [
+    ("CS-101", "1", "Fall", 2009, "101"),
+    ("CS-190", "1", "Spring", 2009, "3128"),
+    ("CS-101", "2", "Spring", 2010, "101"),
+]
+
+
+# Records the executed query (as plain text) and returns canned rows
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.executed.append((render(query), list(params or [])))
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.cursor_ = FakeCursor(rows)
+
+    def cursor(self):
+        return self.cursor_
+
+
+# Composed SQL as text without a server connection to quote against
+def render(composable):
+    if isinstance(composable, sql.Composed):
+        return "".join(render(part) for part in composable.seq)
+    if isinstance(composable, sql.Identifier):
+        return ".".join('"%s"' % string for string in composable.strings)
+    if isinstance(composable, sql.Placeholder):
+        return "%s"
+    return composable.string
+
+
+def test_sort_on_trailing_key_column_is_kept():
+    conn = FakeConnection(ROWS)
+    view = pagination.GridView("sec_id", False, ())
+    page = pagination.keyset_page(conn, "section", COLUMNS, KEY_COLUMNS, page_size=2, view=view)
+
+    query, params = conn.cursor_.executed[0]
+    assert 'ORDER BY "sec_id" NULLS FIRST, "course_id", "sec_id", "semester", "year"' in query
+    assert params == [3]
+    assert page.rows == ROWS[:2]
+    assert page.has_more
+    assert page.last_key == ("1", "CS-190", "1", "Spring", 2009)
+
+
+def test_seek_after_trailing_key_sort_uses_sort_then_keys():
+    conn = FakeConnection(ROWS[2:])
+    view = pagination.GridView("sec_id", False, ())
+    after = ("1", "CS-190", "1", "Spring", 2009)
+    pagination.keyset_page(conn, "section", COLUMNS, KEY_COLUMNS, after=after, page_size=2, view=view)
+
+    query, params = conn.cursor_.executed[0]
+    assert '("sec_id", "course_id", "sec_id", "semester", "year") > (%s, %s, %s, %s, %s)' in query
+    assert params == [*after, 3]
+
+
+def test_sort_on_leading_key_column_is_the_key_order():
+    conn = FakeConnection(ROWS)
+    view = pagination.GridView("course_id", True, ())
+    page = pagination.keyset_page(conn, "section", COLUMNS, KEY_COLUMNS, page_size=2, view=view)
+
+    query, params = conn.cursor_.executed[0]
+    assert 'ORDER BY "course_id" DESC, "sec_id" DESC, "semester" DESC, "year" DESC' in query
+    assert page.last_key == ("CS-190", "1", "Spring", 2009)
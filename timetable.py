@@ -0,0 +1,251 @@
+import argparse
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict, namedtuple
+
+import pandas as pd
+
+import cache
+
+# Timetable clash detection. Every time slot is turned into weekly intervals
+# (minutes since Monday 00:00), and per term an interval index is kept in
+# memory for every student, instructor and room, so "does this clash?" is a
+# dictionary lookup plus a bisect instead of a query. The indexes are built
+# per term on first use, patched in place by writes made through this app
+# (cache.invalidate("takes", added=..., removed=...)) and rebuilt after
+# cache.DEFAULT_TTL to pick up writes from other processes.
+DAYS = "MTWRFSU"
+MINUTES_PER_DAY = 24 * 60
+
+STUDENT = "student"
+INSTRUCTOR = "instructor"
+ROOM = "room"
+
+# One overlap: resource is the student ID, instructor ID or (building,
+# room_number); start and end are minutes of the week
+Clash = namedtuple("Clash", ["kind", "resource", "section", "other", "start", "end"])
+
+
+def format_minute(minute):
+    day, minute = divmod(minute, MINUTES_PER_DAY)
+    return f"{DAYS[day]} {minute // 60:02d}:{minute % 60:02d}"
+
+
+# {time_slot_id: [(start, end), ...]} from time_slot rows
+def weekly_intervals(slot_rows):
+    intervals = defaultdict(list)
+    for time_slot_id, day, start_hour, start_minute, end_hour, end_minute in slot_rows:
+        day_index = DAYS.find(day or "")
+        if day_index < 0:
+            continue
+        offset = day_index * MINUTES_PER_DAY
+        start = offset + start_hour * 60 + start_minute
+        end = offset + end_hour * 60 + end_minute
+        if end > start:
+            intervals[time_slot_id].append((start, end))
+    return {time_slot_id: sorted(slots) for time_slot_id, slots in intervals.items()}
+
+
+# Sorted (start, end, section) intervals of one resource. Anything overlapping
+# [start, end) starts after start - longest, so a lookup only scans that window.
+class IntervalIndex:
+    def __init__(self):
+        self._intervals = []
+        self._longest = 0
+
+    def add(self, start, end, section):
+        insort(self._intervals, (start, end, section))
+        self._longest = max(self._longest, end - start)
+
+    def remove(self, section):
+        self._intervals = [interval for interval in self._intervals if interval[2] != section]
+
+    def overlapping(self, start, end):
+        low = bisect_left(self._intervals, (start - self._longest,))
+        high = bisect_left(self._intervals, (end,))
+        return [interval for interval in self._intervals[low:high] if interval[1] > start]
+
+    def __iter__(self):
+        return iter(self._intervals)
+
+
+# Interval indexes of one (semester, year)
+class TermSchedule:
+    def __init__(self, slots, section_rows, teaches_rows, takes_rows):
+        self.section_intervals = {}
+        self.indexes = defaultdict(IntervalIndex)
+        for course_id, sec_id, semester, year, building, room_number, time_slot_id in section_rows:
+            section = (course_id, sec_id, semester, year)
+            self.section_intervals[section] = slots.get(time_slot_id, [])
+            if building is not None and room_number is not None:
+                self.add(ROOM, (building, room_number), section)
+        for instructor_id, *section in teaches_rows:
+            self.add(INSTRUCTOR, instructor_id, tuple(section))
+        for student_id, *section in takes_rows:
+            self.add(STUDENT, student_id, tuple(section))
+
+    def add(self, kind, resource, section):
+        index = self.indexes[(kind, resource)]
+        for start, end in self.section_intervals.get(section, ()):
+            index.add(start, end, section)
+
+    def remove(self, kind, resource, section):
+        index = self.indexes.get((kind, resource))
+        if index is not None:
+            index.remove(section)
+
+    # Meetings of `resource` that overlap `section` (the section itself excluded)
+    def clashes(self, kind, resource, section):
+        index = self.indexes.get((kind, resource))
+        if index is None:
+            return []
+        found = []
+        for start, end in self.section_intervals.get(section, ()):
+            for other_start, other_end, other in index.overlapping(start, end):
+                if other != section:
+                    found.append(Clash(kind, resource, section, other, max(start, other_start), min(end, other_end)))
+        return found
+
+    # Every pair of overlapping sections of every resource, by a sweep over
+    # each index; one Clash per resource and section pair
+    def audit(self):
+        found = []
+        for (kind, resource), index in self.indexes.items():
+            active = []
+            seen = set()
+            for start, end, section in index:
+                active = [interval for interval in active if interval[1] > start]
+                for other_start, other_end, other in active:
+                    pair = tuple(sorted((section, other)))
+                    if other != section and pair not in seen:
+                        seen.add(pair)
+                        found.append(Clash(kind, resource, pair[0], pair[1], start, min(end, other_end)))
+                active.append((start, end, section))
+        return sorted(found, key=lambda clash: (clash.kind, str(clash.resource), clash.start))
+
+
+_terms = {}  # (semester, year) -> (built_at, TermSchedule)
+_lock = threading.Lock()
+_generation = [0]
+
+
+def _load(conn, semester, year):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT time_slot_id, day, start_hour, start_minute, end_hour, end_minute FROM time_slot")
+        slots = weekly_intervals(cursor.fetchall())
+        cursor.execute("""
+            SELECT course_id, sec_id, semester, year, building, room_number, time_slot_id
+            FROM section WHERE semester = %s AND year = %s
+        """, (semester, year))
+        section_rows = cursor.fetchall()
+        cursor.execute("""
+            SELECT ID, course_id, sec_id, semester, year FROM teaches WHERE semester = %s AND year = %s
+        """, (semester, year))
+        teaches_rows = cursor.fetchall()
+        cursor.execute("""
+            SELECT ID, course_id, sec_id, semester, year FROM takes WHERE semester = %s AND year = %s
+        """, (semester, year))
+        takes_rows = cursor.fetchall()
+    return TermSchedule(slots, section_rows, teaches_rows, takes_rows)
+
+
+def term_schedule(conn, semester, year):
+    key = (semester, year)
+    with _lock:
+        entry = _terms.get(key)
+        if entry is not None and entry[0] + cache.DEFAULT_TTL > time.monotonic():
+            return entry[1]
+        seen_generation = _generation[0]
+    schedule = _load(conn, semester, year)
+    with _lock:
+        # Don't keep indexes read before a concurrent write was announced
+        if _generation[0] == seen_generation:
+            _terms[key] = (time.monotonic(), schedule)
+    return schedule
+
+
+# Keep the loaded terms in step with writes: added/removed rows of takes or
+# teaches, (ID, course_id, sec_id, semester, year), are applied in place;
+# grade changes are irrelevant; anything else drops the indexes so they are
+# rebuilt on next use
+def _on_change(table, added=(), removed=(), grades=(), **detail):
+    kind = {"takes": STUDENT, "teaches": INSTRUCTOR}.get(table)
+    with _lock:
+        _generation[0] += 1
+        if kind is None or not (added or removed or grades):
+            _terms.clear()
+            return
+        for rows, apply in ((removed, TermSchedule.remove), (added, TermSchedule.add)):
+            for resource, *section in rows:
+                entry = _terms.get(tuple(section[2:]))
+                if entry is not None:
+                    apply(entry[1], kind, resource, tuple(section))
+
+
+cache.subscribe(_on_change, "takes", "teaches", "section", "time_slot")
+
+
+def clashes(conn, kind, resource, course_id, sec_id, semester, year):
+    section = (course_id, sec_id, semester, year)
+    return term_schedule(conn, semester, year).clashes(kind, resource, section)
+
+
+def audit(conn, semester, year):
+    return term_schedule(conn, semester, year).audit()
+
+
+# Bulk enrollment validator: flag rows that clash with the student's current
+# timetable or with an earlier row of the same file
+def validate_enrollments(conn, df, errors):
+    rows = df[["id", "course_id", "sec_id", "semester", "year"]].dropna()
+    in_file = defaultdict(IntervalIndex)
+    for index, student_id, course_id, sec_id, semester, year in rows.itertuples(name=None):
+        section = (course_id, sec_id, semester, int(year))
+        schedule = term_schedule(conn, semester, int(year))
+        found = [clash.other for clash in schedule.clashes(STUDENT, student_id, section)]
+        intervals = schedule.section_intervals.get(section, ())
+        file_index = in_file[(student_id, semester, int(year))]
+        for start, end in intervals:
+            found.extend(other for _, _, other in file_index.overlapping(start, end) if other != section)
+        if found:
+            others = ", ".join(sorted({f"{other[0]}-{other[1]}" for other in found}))
+            message = f"timetable clash with {others}"
+            errors[index] = f"{errors[index]}; {message}" if errors[index] else message
+        elif errors[index] == "":
+            for start, end in intervals:
+                file_index.add(start, end, section)
+
+
+def audit_frame(clashes):
+    return pd.DataFrame(
+        [(clash.kind, clash.resource if not isinstance(clash.resource, tuple) else " ".join(clash.resource),
+          f"{clash.section[0]}-{clash.section[1]}", f"{clash.other[0]}-{clash.other[1]}",
+          format_minute(clash.start), format_minute(clash.end)) for clash in clashes],
+        columns=["Kind", "Resource", "Section", "Clashes With", "From", "To"],
+    )
+
+
+# python timetable.py Fall 2017
+def main(argv=None):
+    import db
+
+    parser = argparse.ArgumentParser(description="Audit a term's timetable for clashes.")
+    parser.add_argument("semester")
+    parser.add_argument("year", type=int)
+    args = parser.parse_args(argv)
+
+    conn = db.connect()
+    try:
+        started = time.perf_counter()
+        found = audit(conn, args.semester, args.year)
+        elapsed = time.perf_counter() - started
+    finally:
+        conn.close()
+    if found:
+        print(audit_frame(found).to_string(index=False))
+    print(f"{len(found)} clash(es) in {args.semester} {args.year}, audited in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
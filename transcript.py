@@ -0,0 +1,176 @@
+import argparse
+import threading
+import time
+
+import pandas as pd
+
+import cache
+
+# Letter grades on the usual 4-point scale. Grades not listed here (e.g. an
+# incomplete) count neither towards credits attempted nor towards the GPA.
+GRADE_POINTS = {
+    "A+": 4.0, "A": 4.0, "A-": 3.7,
+    "B+": 3.3, "B": 3.0, "B-": 2.7,
+    "C+": 2.3, "C": 2.0, "C-": 1.7,
+    "D+": 1.3, "D": 1.0, "D-": 0.7,
+    "F": 0.0,
+}
+# Order of the semesters within a year
+SEMESTER_ORDER = {"Winter": 0, "Spring": 1, "Summer": 2, "Fall": 3}
+
+TAKES_COLUMNS = ["id", "semester", "year", "grade", "credits"]
+
+# GPAs for the whole student body are computed with pandas from one bulk
+# fetch of the graded takes rows. Per-term credit and grade-point totals are
+# cached; a grade change drops only its own term (cache.invalidate("takes",
+# grades=[(ID, course_id, sec_id, semester, year), ...])), which is then
+# re-read on its own before the cumulative figures are recomputed.
+_terms = {}  # (semester, year) -> per-student totals of that term
+_state = {"loaded_at": None, "stale": set(), "table": None}
+_lock = threading.Lock()
+
+
+# Per student and term: credits attempted and quality points (points x credits)
+def term_totals(df):
+    points = df["grade"].str.strip().map(GRADE_POINTS)
+    graded = df.assign(points=points).dropna(subset=["points", "credits"])
+    graded = graded.assign(quality=graded["points"] * graded["credits"])
+    return graded.groupby(["id", "semester", "year"], as_index=False)[["credits", "quality"]].sum()
+
+
+# Term and cumulative GPA from term_totals() rows, terms in calendar order
+def gpa_table(totals):
+    totals = totals.assign(term_rank=totals["year"] * 10 + totals["semester"].map(SEMESTER_ORDER).fillna(9))
+    totals = totals.sort_values(["id", "term_rank"], ignore_index=True)
+    grouped = totals.groupby("id")
+    totals["cumulative_credits"] = grouped["credits"].cumsum()
+    cumulative_quality = grouped["quality"].cumsum()
+    totals["gpa"] = (totals["quality"] / totals["credits"]).where(totals["credits"] > 0).round(2)
+    totals["cumulative_gpa"] = (cumulative_quality / totals["cumulative_credits"]).where(
+        totals["cumulative_credits"] > 0).round(2)
+    return totals[["id", "semester", "year", "credits", "gpa", "cumulative_credits", "cumulative_gpa"]]
+
+
+def _fetch(conn, terms=None):
+    with conn.cursor() as cursor:
+        query = """
+            SELECT t.ID, t.semester, t.year, t.grade, c.credits
+            FROM takes t
+            JOIN course c ON c.course_id = t.course_id
+            WHERE t.grade IS NOT NULL
+        """
+        if terms is None:
+            cursor.execute(query)
+        else:
+            semesters, years = zip(*terms)
+            cursor.execute(query + """
+                AND (t.semester, t.year) IN (SELECT * FROM unnest(%s::VARCHAR[], %s::INT[]))
+            """, (list(semesters), list(years)))
+        return pd.DataFrame(cursor.fetchall(), columns=TAKES_COLUMNS)
+
+
+# Term and cumulative GPA of every student with a graded course, rebuilt
+# from the cached term totals when something changed
+def all_gpas(conn):
+    with _lock:
+        expired = _state["loaded_at"] is None or _state["loaded_at"] + cache.DEFAULT_TTL < time.monotonic()
+        stale = set(_state["stale"])
+        table = _state["table"]
+        cached_frames = dict(_terms)
+    if not expired and not stale and table is not None:
+        return table
+
+    if expired:
+        totals = term_totals(_fetch(conn))
+        frames = {term: frame for term, frame in totals.groupby(["semester", "year"])}
+    else:
+        frames = {}
+        if stale:
+            totals = term_totals(_fetch(conn, sorted(stale)))
+            frames = {term: frame for term, frame in totals.groupby(["semester", "year"])}
+        frames.update({term: frame for term, frame in cached_frames.items() if term not in stale and term not in frames})
+    columns = ["id", "semester", "year", "credits", "quality"]
+    table = gpa_table(pd.concat(frames.values(), ignore_index=True) if frames else pd.DataFrame(columns=columns))
+    with _lock:
+        # A change announced meanwhile stays stale and is picked up next time
+        if _state["stale"] == stale:
+            _terms.clear()
+            _terms.update(frames)
+            _state.update(loaded_at=time.monotonic() if expired else _state["loaded_at"], stale=set(), table=table)
+    return table
+
+
+def _on_change(table, grades=(), **detail):
+    with _lock:
+        if table == "takes" and (grades or detail.get("added") or detail.get("removed")):
+            # Rows added or removed through the enrollment engine are ungraded
+            _state["stale"].update(tuple(row[3:5]) for row in grades)
+            if grades:
+                _state["table"] = None
+        else:
+            _state.update(loaded_at=None, stale=set(), table=None)
+            _terms.clear()
+
+
+cache.subscribe(_on_change, "takes", "course")
+
+
+def student_gpa(conn, student_id):
+    table = all_gpas(conn)
+    return table[table["id"] == student_id].reset_index(drop=True)
+
+
+# Every course a student took, graded or not, in calendar order
+def transcript(conn, student_id):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT t.course_id, c.title, t.sec_id, t.semester, t.year, c.credits, t.grade
+            FROM takes t
+            JOIN course c ON c.course_id = t.course_id
+            WHERE t.ID = %s
+        """, (student_id,))
+        rows = pd.DataFrame(cursor.fetchall(),
+                            columns=["course_id", "title", "sec_id", "semester", "year", "credits", "grade"])
+    rows["grade"] = rows["grade"].str.strip()
+    rows["points"] = rows["grade"].map(GRADE_POINTS)
+    rows["term_rank"] = rows["year"] * 10 + rows["semester"].map(SEMESTER_ORDER).fillna(9)
+    return rows.sort_values(["term_rank", "course_id"], ignore_index=True).drop(columns="term_rank")
+
+
+# Record (or clear, with grade None) a grade inside the caller's transaction;
+# the tot_cred triggers of migration 6 adjust the student's credits
+def set_grade(conn, student_id, course_id, sec_id, semester, year, grade):
+    if grade is not None and grade not in GRADE_POINTS:
+        raise ValueError(f"unknown grade {grade!r}")
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE takes SET grade = %s
+            WHERE ID = %s AND course_id = %s AND sec_id = %s AND semester = %s AND year = %s
+        """, (grade, student_id, course_id, sec_id, semester, year))
+        return cursor.rowcount == 1
+
+
+# python transcript.py
+def main(argv=None):
+    import db
+
+    parser = argparse.ArgumentParser(description="Compute term and cumulative GPAs for every student.")
+    parser.add_argument("--top", type=int, default=10, help="show the students with the best cumulative GPA")
+    args = parser.parse_args(argv)
+
+    conn = db.connect()
+    try:
+        started = time.perf_counter()
+        table = all_gpas(conn)
+        elapsed = time.perf_counter() - started
+    finally:
+        conn.close()
+    latest = table.groupby("id").tail(1)
+    print(f"{len(table)} term GPAs for {len(latest)} students in {elapsed:.2f}s")
+    if args.top:
+        best = latest.sort_values(["cumulative_gpa", "cumulative_credits"], ascending=False).head(args.top)
+        print(best[["id", "cumulative_credits", "cumulative_gpa"]].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()